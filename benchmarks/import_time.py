@@ -0,0 +1,62 @@
+"""
+    Benchmark of the cold start of GitMe - measures the import time of the entry points in fresh interpreters
+    and reports which heavy dependencies were loaded by each of them.
+
+    Usage: python benchmarks/import_time.py [--runs N]
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "gitme.cli",
+    "gitme.runner",
+    "gitme.llm.setup",
+    "gitme.llm.providers.google",
+]
+HEAVY_MODULES = [
+    "pandas",
+    "github",
+    "pydantic",
+    "tenacity",
+    "google.generativeai",
+]
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+
+MEASUREMENT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {heavy_modules!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    completed_process = subprocess.run(
+        [sys.executable, "-c", MEASUREMENT_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)],
+        capture_output=True,
+        check=True,
+        cwd=REPOSITORY_ROOT,
+        text=True,
+    )
+    return json.loads(completed_process.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts per entry point")
+    arguments = parser.parse_args()
+
+    print(f"{'module':<32}{'median [ms]':>12}{'min [ms]':>10}  heavy modules loaded")
+    for module in ENTRY_POINTS:
+        measurements = [measure(module) for _ in range(arguments.runs)]
+        timings = [measurement["elapsed"] * 1000 for measurement in measurements]
+        print(f"{module:<32}{statistics.median(timings):>12.1f}{min(timings):>10.1f}  {', '.join(measurements[0]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,5 +10,8 @@ export GITME__OUTPUT_FILE="output.csv"
 # export GITME__EXTRA_REPOS="repo1,repo2,repo3"
 # export GITME__ONLY_THOSE_REPOS="repo1,repo2,repo3"
 
-python \
-    run.py
+# Name of the LLM provider to use (defaults to G1HF)
+
+# export GITME__LLM_PROVIDER="G1P"
+
+gitme
@@ -0,0 +1,256 @@
+from __future__ import annotations
+import base64
+import collections
+import contextlib
+import dataclasses
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import typing
+import urllib.parse
+
+import requests
+import requests.adapters
+import requests.structures
+import requests.utils
+import urllib3.response
+
+# Record and replay of the HTTP traffic - all of the exchanges made through requests (PyGithub, GraphQL and REST adapters,
+# the example context cleaner and the LLM provider using the REST transport) are captured into a compact cassette
+# (gzipped JSON lines) and can be served back offline, at full speed or with the originally recorded latencies.
+# Credentials are never stored - request headers are left out and secret query parameters are stripped from the URLs.
+# Response bodies are recorded as they are read by the client (streamed ones are not buffered upfront), up to a size limit.
+
+RECORD = 'record'
+REPLAY = 'replay'
+SECRET_QUERY_PARAMETERS = {'key', 'api_key', 'access_token', 'token', 'client_secret'}
+SKIPPED_RESPONSE_HEADERS = {'set-cookie', 'content-encoding', 'content-length', 'transfer-encoding'}  # Bodies are stored decoded
+MAX_RECORDED_BODY_BYTES = 16 * 1024 * 1024  # Longer bodies are passed to the client whole, but recorded (and replayed) truncated
+VOLATILE_PATHS = [  # Paths randomized between the runs, e.g. the file created by the check of the token permissions
+    (re.compile(r'^(/repos/[^/]+/[^/]+/contents/)[A-Za-z0-9]{10}$'), r'\1<random>'),
+]
+
+_active_cassette: Cassette | None = None
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """
+        Raised in the replay mode for requests, which were not recorded in the cassette.
+    """
+
+
+def strip_secrets(url: str) -> str:
+    split_url = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode([
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(split_url.query, keep_blank_values=True)
+        if name.lower() not in SECRET_QUERY_PARAMETERS
+    ])
+    return urllib.parse.urlunsplit(split_url._replace(query=query))
+
+
+def hash_body(body: bytes | str | None) -> str | None:
+    if body is None:
+        return None
+    return hashlib.sha256(body.encode('utf-8') if isinstance(body, str) else body).hexdigest()
+
+
+def is_active() -> bool:
+    return _active_cassette is not None
+
+
+class RecordingStream:
+    """
+        Raw stream of the recorded response, which keeps the body as it is read by the client (up to MAX_RECORDED_BODY_BYTES)
+        and passes it on, once the body is read whole or the response is closed - so that the unread rest of a streamed body
+        (e.g. of an archive, which reading stopped early) is neither downloaded nor recorded.
+
+        Only read is provided (not stream), so that requests reads the body through it in iter_content as well.
+    """
+
+    def __init__(self, raw: typing.Any, on_finished: typing.Callable[[bytes, bool], None]) -> None:
+        self._raw = raw
+        self._on_finished = on_finished
+        self._recorded = bytearray()
+        self._truncated = False
+        self._finished = False
+
+    def read(self, amt: int | None = None, *_, **__) -> bytes:
+        if isinstance(self._raw, urllib3.response.HTTPResponse):
+            data = self._raw.read(amt, decode_content=True)  # Content-Encoding header is not recorded
+        else:
+            data = self._raw.read(amt)
+        if (room := MAX_RECORDED_BODY_BYTES - len(self._recorded)) < len(data):
+            self._truncated = True
+        self._recorded += data[:max(room, 0)]
+        if not data or amt is None:
+            self.finish()
+        return data
+
+    def finish(self) -> None:
+        if not self._finished:
+            self._finished = True
+            self._on_finished(bytes(self._recorded), self._truncated)
+            self._recorded = bytearray()
+
+    def close(self) -> None:
+        self.finish()
+        self._raw.close()
+
+    def release_conn(self) -> None:
+        if release_conn := getattr(self._raw, 'release_conn', None):
+            release_conn()
+
+
+@dataclasses.dataclass
+class Cassette:
+    """
+        Cassette of the HTTP exchanges, which patches the requests transport while it is active.
+
+        Responses are written to the cassette once their bodies are read (or the responses are closed), and bodies longer
+        than MAX_RECORDED_BODY_BYTES are recorded truncated (marked in the exchange) - they are replayed as recorded.
+        Replayed requests are matched by their method, URL and body (in the order of recording, if the same request was made several times).
+        Requests that differ between the runs only in their query or body (or in the known randomized paths, see VOLATILE_PATHS)
+        fall back to the earliest unplayed exchange with the same method, host and path - other requests raise CassetteMissError.
+
+        path: str - Path of the cassette file
+        mode: str - record or replay
+        replay_latency: bool - Whether the replayed responses are delayed by their recorded latencies
+    """
+    path: str
+    mode: str = REPLAY
+    replay_latency: bool = False
+    sleep: typing.Callable[[float], None] = dataclasses.field(default=time.sleep, repr=False)
+
+    _lock: threading.Lock = dataclasses.field(init=False, repr=False, default_factory=threading.Lock)
+    _cassette_file: typing.TextIO | None = dataclasses.field(init=False, repr=False, default=None)
+    _recording: set[RecordingStream] = dataclasses.field(init=False, repr=False, default_factory=set)
+    _exchanges: list[dict[str, typing.Any]] = dataclasses.field(init=False, repr=False, default_factory=list)
+    _unplayed: dict[tuple[str, str, str | None], collections.deque[int]] = dataclasses.field(init=False, repr=False, default_factory=dict)
+    _played: set[int] = dataclasses.field(init=False, repr=False, default_factory=set)
+
+    def __post_init__(self) -> None:
+        if self.mode not in (RECORD, REPLAY):
+            raise ValueError(f'Unknown cassette mode: {self.mode}, expected {RECORD} or {REPLAY}')
+
+    @contextlib.contextmanager
+    def activate(self) -> typing.Generator[Cassette, None, None]:
+        global _active_cassette  # pylint: disable=global-statement
+
+        if _active_cassette is not None:
+            raise RuntimeError(f'Another cassette is already active: {_active_cassette.path}')
+        if self.mode == RECORD:
+            self._cassette_file = gzip.open(self.path, 'wt', encoding='utf-8')
+        else:
+            self.load()
+        original_send = requests.adapters.HTTPAdapter.send
+        cassette = self
+
+        def send(adapter: requests.adapters.HTTPAdapter, request: requests.PreparedRequest, *args, **kwargs) -> requests.Response:
+            if cassette.mode == REPLAY:
+                return cassette.replay(request)
+            request_start = time.perf_counter()
+            response = original_send(adapter, request, *args, **kwargs)
+            return cassette.record(request, response, request_start)
+
+        requests.adapters.HTTPAdapter.send = send  # type: ignore
+        _active_cassette = self
+        try:
+            yield self
+        finally:
+            requests.adapters.HTTPAdapter.send = original_send  # type: ignore
+            _active_cassette = None
+            for recording_stream in list(self._recording):  # Responses, which were neither read whole nor closed
+                recording_stream.finish()
+            if self._cassette_file:
+                self._cassette_file.close()
+                self._cassette_file = None
+
+    def load(self) -> None:
+        with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+            self._exchanges = [json.loads(line) for line in cassette_file if line.strip()]
+        self._unplayed = {}
+        self._played = set()
+        for index, exchange in enumerate(self._exchanges):
+            self._unplayed.setdefault(self._key(exchange['method'], exchange['url'], exchange['body_hash']), collections.deque()).append(index)
+
+    @staticmethod
+    def _key(method: str, url: str, body_hash: str | None) -> tuple[str, str, str | None]:
+        return method.upper(), url, body_hash
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response, request_start: float) -> requests.Response:
+        elapsed = time.perf_counter() - request_start  # Time until the response headers (set by the session only after the transport)
+        exchange = {
+            'method': request.method,
+            'url': strip_secrets(request.url or ''),
+            'body_hash': hash_body(request.body),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in SKIPPED_RESPONSE_HEADERS
+            },
+            'elapsed': round(elapsed, 6),
+        }
+
+        def write_exchange(body: bytes, truncated: bool) -> None:
+            exchange['body'] = base64.b64encode(body).decode('ascii')
+            if truncated:
+                exchange['truncated'] = True
+            with self._lock:
+                self._recording.discard(recording_stream)
+                if self._cassette_file:
+                    self._cassette_file.write(json.dumps(exchange, separators=(',', ':')) + '\n')
+
+        recording_stream = RecordingStream(response.raw, on_finished=write_exchange)
+        with self._lock:
+            self._recording.add(recording_stream)
+        response.raw = recording_stream
+        return response
+
+    def replay(self, request: requests.PreparedRequest) -> requests.Response:
+        url = strip_secrets(request.url or '')
+        with self._lock:
+            exchange_index = self._next_exchange(request.method or '', url, hash_body(request.body))
+            self._played.add(exchange_index)
+        exchange = self._exchanges[exchange_index]
+        if self.replay_latency:
+            self.sleep(exchange['elapsed'])
+
+        content = base64.b64decode(exchange['body'])
+        response = requests.Response()
+        response.status_code = exchange['status']
+        response.reason = exchange['reason']
+        response.headers = requests.structures.CaseInsensitiveDict(exchange['headers'])
+        response._content = content  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        response.raw = io.BytesIO(content)
+        response.url = request.url or ''
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.elapsed = datetime.timedelta(seconds=exchange['elapsed'])
+        return response
+
+    @staticmethod
+    def _fallback_key(method: str, url: str) -> tuple[str, str, str]:
+        split_url = urllib.parse.urlsplit(url)
+        path = split_url.path
+        for volatile_path, replacement in VOLATILE_PATHS:
+            path = volatile_path.sub(replacement, path)
+        return method.upper(), split_url.netloc, path
+
+    def _next_exchange(self, method: str, url: str, body_hash: str | None) -> int:
+        if unplayed_exchanges := self._unplayed.get(self._key(method, url, body_hash)):
+            return unplayed_exchanges.popleft()
+        fallback_key = self._fallback_key(method, url)
+        for index, exchange in enumerate(self._exchanges):
+            if index not in self._played and self._fallback_key(exchange['method'], exchange['url']) == fallback_key:
+                self._unplayed[self._key(exchange['method'], exchange['url'], exchange['body_hash'])].remove(index)
+                return index
+        raise CassetteMissError(f'Request {method} {url} was not recorded in the cassette {self.path}')
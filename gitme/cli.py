@@ -0,0 +1,292 @@
+from __future__ import annotations
+import argparse
+import contextlib
+import json
+import os
+import sys
+import typing
+
+if typing.TYPE_CHECKING:
+    import gitme.config
+
+# The CLI module is kept free of heavy imports - the runner (and with it pandas, PyGithub and the provider SDK)
+# is imported only after the arguments are parsed and the configuration is assembled
+
+DEFAULT_LLM_PROVIDER = "G1HF"
+DEFAULT_RETRY_DELAY = 5
+DEFAULT_RETRY_ATTEMPTS = 3
+
+
+COMMANDS = ("run", "serve", "webhooks", "search", "shard")
+DEFAULT_COMMAND = "run"
+DEFAULT_SERVICE_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8000
+DEFAULT_SEARCH_RESULTS = 10
+SHARD_ACTIONS = ("enqueue", "work", "merge")
+DEFAULT_LEASE_SECONDS = 600
+
+
+def build_parser() -> argparse.ArgumentParser:
+    configuration_parser = argparse.ArgumentParser(add_help=False)
+    configuration_parser.add_argument(
+        "-c", "--config",
+        help="Path to the JSON configuration file (see config.schema.json)",
+    )
+    configuration_parser.add_argument(
+        "-u", "--username",
+        default=os.getenv("GITME__GITHUB_USERNAME"),
+        help="GitHub username (GITME__GITHUB_USERNAME)",
+    )
+    configuration_parser.add_argument(
+        "--only",
+        default=os.getenv("GITME__ONLY_THOSE_REPOS"),
+        help="Comma-separated list of exclusive repositories to analyze (GITME__ONLY_THOSE_REPOS)",
+    )
+    configuration_parser.add_argument(
+        "--add",
+        default=os.getenv("GITME__EXTRA_REPOS"),
+        help="Comma-separated list of additional repositories to analyze (GITME__EXTRA_REPOS)",
+    )
+    configuration_parser.add_argument(
+        "-p", "--provider",
+        default=os.getenv("GITME__LLM_PROVIDER"),
+        help=f"Name of the LLM provider (GITME__LLM_PROVIDER, default: {DEFAULT_LLM_PROVIDER})",
+    )
+    configuration_parser.add_argument(
+        "-o", "--output",
+        default=os.getenv("GITME__OUTPUT_FILE"),
+        help="Output file name (GITME__OUTPUT_FILE)",
+    )
+    cassette_options = configuration_parser.add_mutually_exclusive_group()
+    cassette_options.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        help="Record all of the HTTP exchanges (GitHub and LLM provider) into the cassette file, e.g. run.cassette.gz",
+    )
+    cassette_options.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        help="Serve the HTTP exchanges back from the recorded cassette file, without any network traffic",
+    )
+    configuration_parser.add_argument(
+        "--replay-latency",
+        action="store_true",
+        help="Delay the replayed responses by their originally recorded latencies",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="gitme",
+        description="Summarize Your GitHub repositories with generative AI and dump the results to a CSV file.",
+        epilog=f"Options not given explicitly are read from the GITME__* environment variables. The default command is '{DEFAULT_COMMAND}'.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser(
+        "run",
+        parents=[configuration_parser],
+        help="Summarize the repositories once and dump the results to the output file",
+    )
+    run_parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry-run - report the projected token use, number of requests and duration for the limits of the provider, without querying it",
+    )
+    listener_parser = argparse.ArgumentParser(add_help=False)
+    listener_parser.add_argument(
+        "--host",
+        default=os.getenv("GITME__SERVICE_HOST", DEFAULT_SERVICE_HOST),
+        help=f"Address to listen on (GITME__SERVICE_HOST, default: {DEFAULT_SERVICE_HOST})",
+    )
+    listener_parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("GITME__SERVICE_PORT", DEFAULT_SERVICE_PORT)),
+        help=f"Port to listen on (GITME__SERVICE_PORT, default: {DEFAULT_SERVICE_PORT})",
+    )
+    commands.add_parser(
+        "serve",
+        parents=[configuration_parser, listener_parser],
+        help="Start a local HTTP service accepting summarization jobs, which keeps the clients warm between jobs",
+    )
+    commands.add_parser(
+        "webhooks",
+        parents=[configuration_parser, listener_parser],
+        help="Receive GitHub push and repository webhooks and refresh the changed rows of the output (GITME__WEBHOOK_SECRET)",
+    )
+    search_parser = commands.add_parser(
+        "search",
+        parents=[configuration_parser],
+        help="Find the repositories with the summaries most similar to the query, using the embedding index of the output",
+    )
+    search_parser.add_argument(
+        "query",
+        help="Text to search for, e.g. 'command line tools for data processing'",
+    )
+    search_parser.add_argument(
+        "-k", "--top",
+        type=int,
+        default=DEFAULT_SEARCH_RESULTS,
+        help=f"Number of repositories to return (default: {DEFAULT_SEARCH_RESULTS})",
+    )
+    shard_parser = commands.add_parser(
+        "shard",
+        parents=[configuration_parser],
+        help="Sharded execution - enqueue the repositories (coordinator), summarize them in any number of workers and merge the results",
+    )
+    shard_parser.add_argument(
+        "action",
+        choices=SHARD_ACTIONS,
+        help="Step of the sharded execution",
+    )
+    shard_parser.add_argument(
+        "--queue",
+        default=os.getenv("GITME__QUEUE_FILE"),
+        help="Path of the work queue (SQLite database) shared by the workers (GITME__QUEUE_FILE, default: <output>.queue.db)",
+    )
+    shard_parser.add_argument(
+        "--worker",
+        default=os.getenv("GITME__WORKER_ID"),
+        help="Identifier of the worker (GITME__WORKER_ID, default: <hostname>-<pid>)",
+    )
+    shard_parser.add_argument(
+        "--lease",
+        type=float,
+        default=float(os.getenv("GITME__LEASE_SECONDS", DEFAULT_LEASE_SECONDS)),
+        help=f"Number of seconds, after which a repository claimed by a worker can be claimed again (GITME__LEASE_SECONDS, default: {DEFAULT_LEASE_SECONDS})",
+    )
+    return parser
+
+
+def load_config(arguments: argparse.Namespace) -> gitme.config.RunnerConfigDictionary:
+    """
+        Assembles the runner configuration from the optional JSON file, command line arguments and environment variables.
+
+        Values given on the command line (or through the environment) take precedence over the ones from the file.
+        Secrets (tokens and API keys) are read only from the file or the environment.
+    """
+    file_config: dict[str, typing.Any] = {}
+    if arguments.config:
+        with open(arguments.config, encoding="utf-8") as config_file:
+            file_config = json.load(config_file)
+
+    llm_section = file_config.get("llm", {})
+    github_section = file_config.get("github", {})
+    llm_connection = llm_section.get("connection", {})
+    if llm_api_key := os.getenv("GITME__LLM_PROVIDER_API_KEY"):
+        llm_connection = llm_connection | {"api_key": llm_api_key}
+
+    config: dict[str, typing.Any] = file_config | {
+        "llm": llm_section | {
+            "name": arguments.provider or llm_section.get("name") or DEFAULT_LLM_PROVIDER,
+            "connection": llm_connection,
+            "retry": llm_section.get("retry", {
+                "delay": DEFAULT_RETRY_DELAY,
+                "attempts": DEFAULT_RETRY_ATTEMPTS,
+            }),
+        },
+        "github": github_section | {
+            "username": arguments.username or github_section.get("username"),
+            "token": os.getenv("GITME__GITHUB_TOKEN") or github_section.get("token"),
+            "only": arguments.only or github_section.get("only"),
+            "add": arguments.add or github_section.get("add"),
+        },
+        "output": arguments.output or file_config.get("output"),
+    }
+    if webhook_secret := os.getenv("GITME__WEBHOOK_SECRET"):
+        config["webhooks"] = config.get("webhooks", {}) | {"secret": webhook_secret}
+
+    searching = arguments.command == "search"  # Search uses only the output (and the provider, if its embeddings are used)
+    missing_options = [
+        option
+        for option, value in {
+            "GitHub username (GITME__GITHUB_USERNAME)": config["github"]["username"] or searching,
+            "GitHub token (GITME__GITHUB_TOKEN)": config["github"]["token"] or searching,
+            "LLM provider API key (GITME__LLM_PROVIDER_API_KEY)": config["llm"]["connection"] or getattr(arguments, "plan", False) or searching or (
+                getattr(arguments, "action", None) == "enqueue"
+            ),
+            "output file (GITME__OUTPUT_FILE)": config["output"] or arguments.command == "serve" or getattr(arguments, "plan", False),
+        }.items()
+        if not value
+    ]
+    if missing_options:
+        raise ValueError(f"Please provide: {', '.join(missing_options)}")
+    return typing.cast("gitme.config.RunnerConfigDictionary", config)
+
+
+def main(argv: typing.Sequence[str] | None = None) -> None:
+    parser = build_parser()
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if (not argv or argv[0] not in COMMANDS) and not {"-h", "--help"} & set(argv):
+        argv.insert(0, DEFAULT_COMMAND)
+    arguments = parser.parse_args(argv)
+    try:
+        config = load_config(arguments)
+    except ValueError as missing_options_error:
+        parser.error(str(missing_options_error))
+
+    with open_cassette(arguments):
+        run_command(parser, arguments, config)
+
+
+def open_cassette(arguments: argparse.Namespace) -> typing.ContextManager[typing.Any]:
+    """
+        Activates the cassette capturing (or serving back) all of the HTTP traffic, if it is requested.
+    """
+    if not (cassette_path := arguments.record or arguments.replay):
+        return contextlib.nullcontext()
+    import gitme.cassette  # pylint: disable=import-outside-toplevel
+
+    return gitme.cassette.Cassette(
+        path=cassette_path,
+        mode=gitme.cassette.RECORD if arguments.record else gitme.cassette.REPLAY,
+        replay_latency=arguments.replay_latency,
+    ).activate()
+
+
+def run_command(parser: argparse.ArgumentParser, arguments: argparse.Namespace, config: gitme.config.RunnerConfigDictionary) -> None:
+    if arguments.command == "search":
+        import gitme.embeddings  # pylint: disable=import-outside-toplevel
+
+        for name, similarity in gitme.embeddings.search_output(config, arguments.query, k=arguments.top):
+            print(f"{similarity:.3f}\t{name}")
+        return
+
+    from gitme.runner import GitMeRunner  # pylint: disable=import-outside-toplevel
+
+    runner = GitMeRunner(dict(config))
+    if arguments.command == "serve":
+        import gitme.service  # pylint: disable=import-outside-toplevel
+
+        gitme.service.serve(runner, host=arguments.host, port=arguments.port)
+        return
+    if arguments.command == "webhooks":
+        import gitme.webhooks  # pylint: disable=import-outside-toplevel
+
+        try:
+            gitme.webhooks.serve(runner, host=arguments.host, port=arguments.port)
+        except ValueError as missing_secret_error:
+            parser.error(str(missing_secret_error))
+        return
+    if arguments.command == "shard":
+        import gitme.sharding  # pylint: disable=import-outside-toplevel
+
+        queue = gitme.sharding.WorkQueue(arguments.queue or f"{config['output']}{gitme.sharding.QUEUE_SUFFIX}")
+        if arguments.action == "enqueue":
+            runner.enqueue(queue)
+        elif arguments.action == "work":
+            runner.work(queue, worker=arguments.worker or gitme.sharding.default_worker_id(), lease_seconds=arguments.lease)
+        else:
+            runner.connect()
+            try:
+                runner.dump(runner.merge(queue))
+            except ValueError as unfinished_queue_error:
+                parser.error(str(unfinished_queue_error))
+        return
+    if arguments.plan:
+        print(runner.plan().describe())
+        return
+    analyzed_data = runner.run()
+    runner.dump(analyzed_data)
+
+
+if __name__ == "__main__":
+    main()
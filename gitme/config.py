@@ -1,9 +1,12 @@
 from __future__ import annotations
 import dataclasses
+import datetime
 import typing
 
 import pydantic
-import tenacity
+
+if typing.TYPE_CHECKING:
+    import tenacity
 
 #     Here are the dictionaries that need to be defined by the used as
 #     configuration for the RunnerConfig class:
@@ -19,9 +22,42 @@ import tenacity
 #             "username": ...,
 #             "token": ...,
 #             "only": ...,  <- optional
-#             "add": ...  <- optional
+#             "add": ...,  <- optional
+#             "discover": {  <- optional
+#                 "owner": ...,
+#                 ...filters
+#             }
+#         },
+#         "output": ...,
+#         "deduplicate": {  <- optional
+#             "threshold": ...,
+#             "permutations": ...
+#         },
+#         "context": {  <- optional
+#             "patterns": ...,
+#             "max_file_bytes": ...,
+#             "max_total_bytes": ...
+#         },
+#         "webhooks": {  <- optional
+#             "secret": ...,
+#             "quiet_period": ...,
+#             "max_delay": ...
 #         },
-#         "output": ...
+#         "readme": {  <- optional
+#             "column": ...,
+#             "max_chars": ...,
+#             "spill_bytes": ...,
+#             "max_bytes": ...
+#         },
+#         "embeddings": {  <- optional
+#             "embedder": ...,
+#             "dimensions": ...,
+#             "batch_size": ...
+#         },
+#         "rollup": {  <- optional
+#             "group_by": ...,
+#             "max_children": ...
+#         }
 #     }
 
 
@@ -38,6 +74,27 @@ class LLMConfigDictionary(typing.TypedDict):
     retry: dict[str, int | None]
 
 
+class DiscoveryConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration for the server-side repository discovery in the form of a dictionary
+
+        owner: str - Login of the user or organization owning the repositories
+        forks: bool - Whether to include forked repositories
+        archived: bool - Whether to include archived repositories
+        topics: list[str] - Topics that all of the repositories need to have
+        languages: list[str] - Languages of which any needs to be the main language of the repositories
+        min_stars: int - Minimal number of stars
+        pushed_after: str - ISO date (YYYY-MM-DD) after which the repositories must have been pushed to
+    """
+    owner: typing.Required[str]
+    forks: bool
+    archived: bool
+    topics: list[str]
+    languages: list[str]
+    min_stars: int
+    pushed_after: str
+
+
 class GithubConfigDictionary(typing.TypedDict):
     """
         Configuration for the GitHub profile in the form of a dictionary
@@ -46,11 +103,89 @@ class GithubConfigDictionary(typing.TypedDict):
         token: str - GitHub read-only token
         only: str - Comma-separated list of exclusive repositories to analyze
         add: str - Comma-separated list of additional repositories to analyze
+        discover: DiscoveryConfigDictionary - Filters for discovering repositories of a user or an organization
     """
     username: str
     token: str
     only: typing.Optional[str]
     add: typing.Optional[str]
+    discover: typing.NotRequired[DiscoveryConfigDictionary]
+
+
+class DeduplicationConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration for skipping the summarization of near-duplicate READMEs in the form of a dictionary
+
+        threshold: float - Minimal estimated similarity of READMEs considered to be duplicates
+        permutations: int - Length of the MinHash signatures of READMEs
+    """
+    threshold: float
+    permutations: int
+
+
+class ContextConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration for the extraction of additional context files from the repository archive in the form of a dictionary
+
+        patterns: list[str] - Glob patterns of the files (relative to the repository root) to include in the prompt
+        max_file_bytes: int - Files larger than that are skipped
+        max_total_bytes: int - Maximal size of all of the files included in the prompt
+    """
+    patterns: list[str]
+    max_file_bytes: int
+    max_total_bytes: int
+
+
+class WebhooksConfigDictionary(typing.TypedDict):
+    """
+        Configuration for the webhook-driven refresh in the form of a dictionary
+
+        secret: str - Secret used to sign the webhook payloads
+        quiet_period: int - Number of seconds without new events after which the repository is refreshed
+        max_delay: int - Maximal number of seconds between the first event and the refresh of the repository
+    """
+    secret: str
+    quiet_period: typing.NotRequired[int]
+    max_delay: typing.NotRequired[int]
+
+
+class ReadmeConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration of the README handling in the form of a dictionary
+
+        column: str - Representation of the README in the output (full, truncated, omitted or compressed)
+        max_chars: int - Number of characters kept in the truncated README column
+        spill_bytes: int - READMEs larger than that are kept in temporary files instead of the memory
+        max_bytes: int - Maximal number of bytes of the README fetched from GitHub
+    """
+    column: typing.Literal['full', 'truncated', 'omitted', 'compressed']
+    max_chars: int
+    spill_bytes: typing.Optional[int]
+    max_bytes: int
+
+
+class EmbeddingsConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration of the embedding index of the summaries in the form of a dictionary
+
+        embedder: str - Embedder of the summaries (local - works offline, or provider - embedding model of the LLM provider)
+        dimensions: int - Dimension of the local embeddings
+        batch_size: int - Number of summaries embedded by the provider in a single request
+    """
+    embedder: typing.Literal['local', 'provider']
+    dimensions: int
+    batch_size: int
+
+
+class RollupConfigDictionary(typing.TypedDict, total=False):
+    """
+        Configuration of the hierarchical rollup of the summaries in the form of a dictionary
+
+        group_by: str - Grouping of the repositories (language - primary language, or technology - each of the technologies)
+        max_children: int - Maximal number of summaries in a single prompt
+    """
+    group_by: typing.Literal['language', 'technology']
+    max_children: int
 
 
 class RunnerConfigDictionary(typing.TypedDict):
@@ -60,10 +195,22 @@ class RunnerConfigDictionary(typing.TypedDict):
         llm: LLMConfigDictionary - Configuration for the LLM provider
         github: GithubConfigDictionary - Configuration for the GitHub profile adapter
         output: str - Output file name
+        deduplicate: DeduplicationConfigDictionary - Configuration of the near-duplicate README detection
+        context: ContextConfigDictionary - Configuration of the extraction of additional context files
+        webhooks: WebhooksConfigDictionary - Configuration of the webhook-driven refresh
+        readme: ReadmeConfigDictionary - Configuration of the README handling
+        embeddings: EmbeddingsConfigDictionary - Configuration of the embedding index of the summaries
+        rollup: RollupConfigDictionary - Configuration of the hierarchical rollup of the summaries
     """
     llm: LLMConfigDictionary
     github: GithubConfigDictionary
     output: str
+    deduplicate: typing.NotRequired[DeduplicationConfigDictionary]
+    context: typing.NotRequired[ContextConfigDictionary]
+    webhooks: typing.NotRequired[WebhooksConfigDictionary]
+    readme: typing.NotRequired[ReadmeConfigDictionary]
+    embeddings: typing.NotRequired[EmbeddingsConfigDictionary]
+    rollup: typing.NotRequired[RollupConfigDictionary]
 
 
 # Below here are actual config classes that are used to parse the dictionaries
@@ -88,6 +235,13 @@ class RunnerConfig:
     _github: GithubProfileConfig = dataclasses.field(init=False)
     _only_repos: str = dataclasses.field(init=False)
     _add_repos: str = dataclasses.field(init=False)
+    _discovery: RepositoryFilters | None = dataclasses.field(init=False)
+    _deduplication: DeduplicationConfig | None = dataclasses.field(init=False)
+    _context: ContextConfig | None = dataclasses.field(init=False)
+    _webhooks: WebhooksConfig | None = dataclasses.field(init=False)
+    _readme: ReadmeConfig = dataclasses.field(init=False)
+    _embeddings: EmbeddingsConfig | None = dataclasses.field(init=False)
+    _rollup: RollupConfig | None = dataclasses.field(init=False)
 
     def __post_init__(self):
         self.output = self.config["output"]
@@ -102,8 +256,27 @@ class RunnerConfig:
         self._add_repos = self.split_and_check_repos(
             github_section.get("add", "")
         )
+        self._discovery = RepositoryFilters(**discovery_section) if (
+            discovery_section := github_section.get("discover")
+        ) else None
 
         self._llm = LLMProviderConfig(**self.config["llm"])
+        self._deduplication = DeduplicationConfig(**deduplication_section) if (
+            deduplication_section := self.config.get("deduplicate")
+        ) is not None else None
+        self._context = ContextConfig(**context_section) if (
+            context_section := self.config.get("context")
+        ) is not None else None
+        self._webhooks = WebhooksConfig(**webhooks_section) if (
+            webhooks_section := self.config.get("webhooks")
+        ) else None
+        self._readme = ReadmeConfig(**self.config.get("readme", {}))
+        self._embeddings = EmbeddingsConfig(**embeddings_section) if (
+            embeddings_section := self.config.get("embeddings")
+        ) is not None else None
+        self._rollup = RollupConfig(**rollup_section) if (
+            rollup_section := self.config.get("rollup")
+        ) is not None else None
         self.config = {}
 
     def split_and_check_repos(self, repos_list: str) -> list[str]:
@@ -141,6 +314,218 @@ class GithubProfileConfig(pydantic.BaseModel):
     )
 
 
+class RepositoryFilters(pydantic.BaseModel):
+    """
+        Filters used to discover the repositories of a user or an organization, which are translated
+        into a GitHub search query, so that the filtering happens on the server side.
+
+        owner: str - Login of the user or organization owning the repositories
+        forks: bool - Whether to include forked repositories
+        archived: bool - Whether to include archived repositories
+        topics: list[str] - Topics that all of the repositories need to have
+        languages: list[str] - Languages of which any needs to be the main language of the repositories
+        min_stars: int - Minimal number of stars
+        pushed_after: datetime.date - Date after which the repositories must have been pushed to
+    """
+    owner: str = pydantic.Field(
+        title="Owner",
+        description="Login of the user or organization owning the repositories",
+        min_length=1,
+    )
+    forks: bool = pydantic.Field(
+        default=False,
+        title="Forks",
+        description="Whether to include forked repositories",
+    )
+    archived: bool = pydantic.Field(
+        default=False,
+        title="Archived",
+        description="Whether to include archived repositories",
+    )
+    topics: list[str] = pydantic.Field(
+        default_factory=list,
+        title="Topics",
+        description="Topics that all of the repositories need to have",
+    )
+    languages: list[str] = pydantic.Field(
+        default_factory=list,
+        title="Languages",
+        description="Languages of which any needs to be the main language of the repositories",
+    )
+    min_stars: int | None = pydantic.Field(
+        default=None,
+        title="Minimal stars",
+        description="Minimal number of stars",
+        ge=0,
+    )
+    pushed_after: datetime.date | None = pydantic.Field(
+        default=None,
+        title="Pushed after",
+        description="Date after which the repositories must have been pushed to",
+    )
+
+
+class DeduplicationConfig(pydantic.BaseModel):
+    """
+        Configuration of the near-duplicate README detection, which allows to summarize
+        only one representative of each cluster of similar READMEs (e.g. forks, templates and mirrors).
+
+        threshold: float - Minimal estimated similarity of READMEs considered to be duplicates
+        permutations: int - Length of the MinHash signatures of READMEs
+    """
+    threshold: float = pydantic.Field(
+        default=0.9,
+        title="Threshold",
+        description="Minimal estimated similarity of READMEs considered to be duplicates",
+        gt=0,
+        le=1,
+    )
+    permutations: int = pydantic.Field(
+        default=128,
+        title="Permutations",
+        description="Length of the MinHash signatures of READMEs",
+        ge=16,
+    )
+
+
+class ContextConfig(pydantic.BaseModel):
+    """
+        Configuration of the extraction of additional context files (docs, manifests) from a single archive of the repository.
+
+        patterns: list[str] - Glob patterns of the files (relative to the repository root) to include in the prompt
+        max_file_bytes: int - Files larger than that are skipped
+        max_total_bytes: int - Maximal size of all of the files included in the prompt
+    """
+    patterns: list[str] | None = pydantic.Field(
+        default=None,
+        title="Patterns",
+        description="Glob patterns of the files (relative to the repository root) to include in the prompt",
+    )
+    max_file_bytes: int = pydantic.Field(
+        default=16 * 1024,
+        title="Maximal file size",
+        description="Files larger than that are skipped",
+        gt=0,
+    )
+    max_total_bytes: int = pydantic.Field(
+        default=48 * 1024,
+        title="Maximal context size",
+        description="Maximal size of all of the files included in the prompt",
+        gt=0,
+    )
+
+
+class WebhooksConfig(pydantic.BaseModel):
+    """
+        Configuration of the webhook-driven refresh, in which bursts of events are coalesced per repository.
+
+        secret: str - Secret used to sign the webhook payloads
+        quiet_period: int - Number of seconds without new events after which the repository is refreshed
+        max_delay: int - Maximal number of seconds between the first event and the refresh of the repository
+    """
+    secret: str = pydantic.Field(
+        title="Secret",
+        description="Secret used to sign the webhook payloads",
+        min_length=1,
+        repr=False,
+    )
+    quiet_period: int = pydantic.Field(
+        default=30,
+        title="Quiet period",
+        description="Number of seconds without new events after which the repository is refreshed",
+        ge=0,
+    )
+    max_delay: int = pydantic.Field(
+        default=300,
+        title="Maximal delay",
+        description="Maximal number of seconds between the first event and the refresh of the repository",
+        ge=0,
+    )
+
+
+class ReadmeConfig(pydantic.BaseModel):
+    """
+        Configuration of the README handling - how the README is kept in the memory and represented in the output.
+
+        column: str - Representation of the README in the output (full, truncated, omitted or compressed)
+        max_chars: int - Number of characters kept in the truncated README column
+        spill_bytes: int | None - READMEs larger than that are kept in temporary files instead of the memory (None, to keep all in the memory)
+        max_bytes: int - Maximal number of bytes of the README fetched from GitHub - larger READMEs are cut (and their changes detected by the content)
+    """
+    column: typing.Literal['full', 'truncated', 'omitted', 'compressed'] = pydantic.Field(
+        default='full',
+        title="README column",
+        description="Representation of the README in the output (full, truncated, omitted or compressed)",
+    )
+    max_chars: int = pydantic.Field(
+        default=2000,
+        title="Maximal README length",
+        description="Number of characters kept in the truncated README column",
+        gt=0,
+    )
+    spill_bytes: int | None = pydantic.Field(
+        default=None,
+        title="Spill threshold",
+        description="READMEs larger than that (in bytes) are kept in temporary files instead of the memory",
+        ge=0,
+    )
+    max_bytes: int = pydantic.Field(
+        default=1024 * 1024,
+        title="Maximal README size",
+        description="Maximal number of bytes of the README fetched from GitHub - larger READMEs are cut",
+        gt=0,
+    )
+
+
+class EmbeddingsConfig(pydantic.BaseModel):
+    """
+        Configuration of the embedding index of the summaries, which is stored next to the output and used by the search.
+
+        embedder: str - Embedder of the summaries (local - works offline, or provider - embedding model of the LLM provider)
+        dimensions: int - Dimension of the local embeddings
+        batch_size: int - Number of summaries embedded by the provider in a single request
+    """
+    embedder: typing.Literal['local', 'provider'] = pydantic.Field(
+        default='local',
+        title="Embedder",
+        description="Embedder of the summaries (local - works offline, or provider - embedding model of the LLM provider)",
+    )
+    dimensions: int = pydantic.Field(
+        default=256,
+        title="Dimensions",
+        description="Dimension of the local embeddings",
+        gt=0,
+    )
+    batch_size: int = pydantic.Field(
+        default=64,
+        title="Batch size",
+        description="Number of summaries embedded by the provider in a single request",
+        gt=0,
+        le=100,
+    )
+
+
+class RollupConfig(pydantic.BaseModel):
+    """
+        Configuration of the hierarchical rollup, in which the summaries of the repositories are summarized per group
+        and then into the overview of the whole profile.
+
+        group_by: str - Grouping of the repositories (language - primary language, or technology - each of the technologies)
+        max_children: int - Maximal number of summaries in a single prompt
+    """
+    group_by: typing.Literal['language', 'technology'] = pydantic.Field(
+        default='language',
+        title="Grouping",
+        description="Grouping of the repositories (language - primary language, or technology - each of the technologies)",
+    )
+    max_children: int = pydantic.Field(
+        default=20,
+        title="Maximal number of children",
+        description="Maximal number of summaries in a single prompt - larger groups are split into parts, which are summarized first",
+        ge=2,
+    )
+
+
 class LLMProviderConfig(pydantic.BaseModel):
     """
         Configuration for the LLM provider in the form of a Pydantic model for quick validation and parsing.
@@ -199,6 +584,8 @@ class RetryConfig():
     _stop: tenacity.stop.StopBaseT = dataclasses.field(init=False)
 
     def __post_init__(self):
+        import tenacity  # pylint: disable=import-outside-toplevel
+
         self._wait = tenacity.wait_fixed(self.delay)
         self._stop = tenacity.stop_after_attempt(self.attempts)
 
@@ -0,0 +1,93 @@
+from __future__ import annotations
+import dataclasses
+import fnmatch
+import tarfile
+import typing
+
+if typing.TYPE_CHECKING:
+    import gitme.gh
+
+# Extraction of additional context (docs, manifests of the project) from a single archive of the repository.
+# The tarball is streamed and decompressed on the fly - members are read into memory only if they match the patterns
+# and fit into the size limits, and the download is interrupted as soon as the context budget is used up
+# (or is too small for any useful file) or too much of the archive was read without filling it.
+
+DEFAULT_CONTEXT_PATTERNS = [
+    'pyproject.toml',
+    'setup.cfg',
+    'package.json',
+    'Cargo.toml',
+    'go.mod',
+    'pom.xml',
+    'build.gradle',
+    'build.gradle.kts',
+    'Gemfile',
+    'composer.json',
+    'Dockerfile',
+    'docs/*.md',
+    'docs/*.rst',
+]
+DEFAULT_MAX_FILE_BYTES = 16 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 48 * 1024
+DEFAULT_MAX_ARCHIVE_BYTES = 64 * 1024 * 1024
+MIN_USEFUL_FILE_BYTES = 256  # Smaller remainders of the budget are not worth reading the rest of the archive
+
+TARBALL_MEDIA_TYPE = 'application/vnd.github+json'
+
+
+def is_text(data: bytes) -> bool:
+    return b'\x00' not in data[:1024]
+
+
+@dataclasses.dataclass
+class ContextExtractor:
+    """
+        Extracts a size-bounded bundle of repository files, selected by the glob patterns (relative to the repository root),
+        using a single request for the repository tarball.
+
+        patterns: list[str] - Glob patterns of the files to include in the context (wildcards do not cross directories)
+        max_file_bytes: int - Files larger than that are skipped
+        max_total_bytes: int - Maximal size of all of the files in the context
+        max_archive_bytes: int - Reading of the (decompressed) archive stops after that many bytes, even if the budget is not used up
+    """
+    rest: gitme.gh.GithubRESTAdapter
+    patterns: list[str] = dataclasses.field(default_factory=lambda: list(DEFAULT_CONTEXT_PATTERNS))
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES
+    max_archive_bytes: int = DEFAULT_MAX_ARCHIVE_BYTES
+
+    def matches(self, path: str) -> bool:
+        path_parts = path.split('/')
+        return any(
+            len(pattern_parts := pattern.split('/')) == len(path_parts) and all(
+                fnmatch.fnmatchcase(path_part, pattern_part)
+                for path_part, pattern_part in zip(path_parts, pattern_parts)
+            )
+            for pattern in self.patterns
+        )
+
+    def extract(self, full_name: str) -> dict[str, str]:
+        with self.rest.stream(f'/repos/{full_name}/tarball', accept=TARBALL_MEDIA_TYPE) as response:
+            return self.extract_from_stream(response.raw)
+
+    def extract_from_stream(self, stream: typing.BinaryIO) -> dict[str, str]:
+        context: dict[str, str] = {}
+        remaining_bytes = self.max_total_bytes
+        with tarfile.open(fileobj=stream, mode='r|gz') as archive:
+            for member in archive:
+                if member.offset_data > self.max_archive_bytes:
+                    break
+                if not member.isfile() or '/' not in member.name:
+                    continue
+                path = member.name.split('/', 1)[1]  # Archive members are prefixed with the <owner>-<repo>-<sha> directory
+                if member.size > min(self.max_file_bytes, remaining_bytes) or not self.matches(path):
+                    continue
+                if not (member_file := archive.extractfile(member)):
+                    continue
+                if not is_text(data := member_file.read()):
+                    continue
+                context[path] = data.decode('utf-8', errors='replace')
+                remaining_bytes -= len(data)
+                if remaining_bytes < min(MIN_USEFUL_FILE_BYTES, self.max_file_bytes):
+                    break
+        return context
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import dataclasses
+import random
+import re
+import typing
+import zlib
+
+if typing.TYPE_CHECKING:
+    import numpy
+
+# Near-duplicate detection of README files based on MinHash signatures of word shingles,
+# which are bucketed with Locality Sensitive Hashing (LSH), so that only texts sharing at least
+# one band of their signatures are compared with each other (no pairwise comparisons of all texts).
+
+SHINGLE_SIZE = 5
+HASH_PRIME = 4_294_967_291  # Largest prime below 2^32, so that a * x + b fits into uint64
+SIGNATURE_CHUNK_SIZE = 4096
+
+MARKDOWN_NOISE_PATTERNS = [
+    re.compile(r'```.*?```', flags=re.DOTALL),  # Code blocks
+    re.compile(r'<[^>]+>'),  # HTML tags
+    re.compile(r'!\[[^\]]*\]\([^)]*\)'),  # Images and badges
+    re.compile(r'https?://\S+'),  # Raw links
+]
+LINK_PATTERN = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def preprocess_readme(readme: str) -> list[str]:
+    """
+        Strips the Markdown noise (code blocks, HTML, badges and links targets) that differs
+        between forks and mirrors, and returns the lowercased words of the remaining text.
+    """
+    for pattern in MARKDOWN_NOISE_PATTERNS:
+        readme = pattern.sub(' ', readme)
+    readme = LINK_PATTERN.sub(r'\1', readme)
+    return WORD_PATTERN.findall(readme.lower())
+
+
+def shingle(words: list[str], size: int = SHINGLE_SIZE) -> set[int]:
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode())} if words else set()
+    return {
+        zlib.crc32(' '.join(words[index:index + size]).encode())
+        for index in range(len(words) - size + 1)
+    }
+
+
+def choose_bands(permutations: int, threshold: float) -> tuple[int, int]:
+    """
+        Chooses the number of bands and rows per band, for which the similarity at which
+        two texts become LSH candidates - approximately (1 / bands) ^ (1 / rows) - is the closest to the threshold.
+    """
+    return min(
+        (
+            (permutations // rows, rows)
+            for rows in range(1, permutations + 1)
+        ),
+        key=lambda bands_and_rows: abs((1 / bands_and_rows[0]) ** (1 / bands_and_rows[1]) - threshold)
+    )
+
+
+@dataclasses.dataclass
+class MinHasher:
+    """
+        Computes MinHash signatures of texts using universal hashing of their shingles.
+
+        permutations: int - Length of the signatures
+        seed: int - Seed of the hashing functions parameters
+    """
+    permutations: int = 128
+    seed: int = 1
+
+    _coefficients: numpy.ndarray = dataclasses.field(init=False, repr=False)
+    _intercepts: numpy.ndarray = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self):
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        generator = random.Random(self.seed)
+        self._coefficients = numpy.array(
+            [generator.randrange(1, HASH_PRIME) for _ in range(self.permutations)],
+            dtype=numpy.uint64,
+        )
+        self._intercepts = numpy.array(
+            [generator.randrange(0, HASH_PRIME) for _ in range(self.permutations)],
+            dtype=numpy.uint64,
+        )
+
+    def signature(self, shingles: set[int]) -> numpy.ndarray | None:
+        if not shingles:
+            return None
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        hashes = numpy.fromiter(shingles, dtype=numpy.uint64, count=len(shingles)) % HASH_PRIME
+        signature = numpy.full(self.permutations, HASH_PRIME, dtype=numpy.uint64)
+        for chunk_start in range(0, len(hashes), SIGNATURE_CHUNK_SIZE):  # Bounds the memory used for long READMEs
+            chunk = hashes[chunk_start:chunk_start + SIGNATURE_CHUNK_SIZE]
+            numpy.minimum(
+                signature,
+                ((numpy.outer(self._coefficients, chunk) + self._intercepts[:, None]) % HASH_PRIME).min(axis=1),
+                out=signature,
+            )
+        return signature
+
+
+def estimate_similarity(first_signature: numpy.ndarray, second_signature: numpy.ndarray) -> float:
+    return float((first_signature == second_signature).mean())
+
+
+def cluster_near_duplicates(
+    texts: typing.Sequence[str],
+    threshold: float = 0.9,
+    permutations: int = 128,
+) -> list[int]:
+    """
+        Clusters near-duplicate texts and returns the index of the cluster representative (its first text) for each of the texts.
+
+        Texts become candidates for merging if they share a band of their MinHash signatures.
+        Each candidate is then compared only with the first text that landed in the shared bucket and merged
+        into its cluster if their estimated Jaccard similarity is at least equal to the threshold.
+        Texts without any words are never treated as duplicates.
+    """
+    hasher = MinHasher(permutations=permutations)
+    bands, rows = choose_bands(permutations, threshold)
+    parents = list(range(len(texts)))
+
+    def find_root(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    signatures: list[numpy.ndarray | None] = []
+    buckets: dict[tuple[int, bytes], int] = {}
+    for index, text in enumerate(texts):
+        signature = hasher.signature(shingle(preprocess_readme(text)))
+        signatures.append(signature)
+        if signature is None:
+            continue
+        for band in range(bands):
+            bucket_key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            if (bucket_owner := buckets.setdefault(bucket_key, index)) == index:
+                continue
+            owner_root, index_root = find_root(bucket_owner), find_root(index)
+            if owner_root == index_root:
+                continue
+            if estimate_similarity(signatures[bucket_owner], signature) >= threshold:  # type: ignore
+                parents[max(owner_root, index_root)] = min(owner_root, index_root)
+
+    return [
+        find_root(index)
+        for index in range(len(texts))
+    ]
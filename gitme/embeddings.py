@@ -0,0 +1,286 @@
+from __future__ import annotations
+import abc
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import tempfile
+import typing
+import zlib
+
+if typing.TYPE_CHECKING:
+    import numpy
+
+    import gitme.config
+    import gitme.llm.base
+
+# Embedding index of the summaries, which allows to search the profile (e.g. "which repositories are about X")
+# without sending all of the summaries to the LLM. Vectors are stored in a memory-mapped NumPy array next to the output,
+# along with the JSON metadata holding the hashes of the embedded summaries - only new and changed summaries are embedded again.
+
+LOCAL_EMBEDDER = 'local'
+PROVIDER_EMBEDDER = 'provider'
+EMBEDDERS = (LOCAL_EMBEDDER, PROVIDER_EMBEDDER)
+DEFAULT_DIMENSIONS = 256
+DEFAULT_BATCH_SIZE = 64
+SEARCH_CHUNK_SIZE = 65_536  # Rows of the memory-mapped vectors compared with the query at once
+
+VECTORS_SUFFIX = '.embeddings.npy'
+METADATA_SUFFIX = '.embeddings.json'
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize(vectors: numpy.ndarray) -> numpy.ndarray:
+    import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    return numpy.divide(vectors, norms, out=numpy.zeros_like(vectors), where=norms > 0)
+
+
+def hash_summary(summary: str) -> str:
+    return hashlib.sha256(summary.encode('utf-8')).hexdigest()
+
+
+class Embedder(abc.ABC):
+    """
+        Maps texts to vectors of a fixed dimension, which are compared with the cosine similarity.
+    """
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str:
+        """
+            Identifier of the embedder stored in the index - vectors of different embedders are not comparable.
+        """
+
+    @abc.abstractmethod
+    def embed(self, texts: list[str], query: bool = False) -> numpy.ndarray:
+        pass
+
+
+@dataclasses.dataclass
+class HashingEmbedder(Embedder):
+    """
+        Local embedder, which works offline - words and pairs of consecutive words are hashed
+        into a vector of the given dimension (with a hashed sign, so that the collisions cancel out on average).
+    """
+    dimensions: int = DEFAULT_DIMENSIONS
+
+    @property
+    def name(self) -> str:
+        return f'{LOCAL_EMBEDDER}:hashing-{self.dimensions}'
+
+    def embed(self, texts: list[str], query: bool = False) -> numpy.ndarray:
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        vectors = numpy.zeros((len(texts), self.dimensions), dtype=numpy.float32)
+        for row, text in enumerate(texts):
+            words = WORD_PATTERN.findall(text.lower())
+            features = words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = numpy.fromiter(
+                (zlib.crc32(feature.encode('utf-8')) for feature in features),
+                dtype=numpy.uint64,
+                count=len(features),
+            )
+            numpy.add.at(
+                vectors[row],
+                (hashes % self.dimensions).astype(numpy.intp),
+                numpy.where(hashes & (1 << 31), -1.0, 1.0).astype(numpy.float32),
+            )
+        return normalize(vectors)
+
+
+@dataclasses.dataclass
+class ProviderEmbedder(Embedder):
+    """
+        Embedder using the embedding model of the LLM provider, which is queried in batches.
+    """
+    provider: gitme.llm.base.LLMProvider = dataclasses.field(repr=False)
+    provider_name: str
+    batch_size: int = DEFAULT_BATCH_SIZE
+
+    @property
+    def name(self) -> str:
+        return f'{PROVIDER_EMBEDDER}:{self.provider_name}'
+
+    def embed(self, texts: list[str], query: bool = False) -> numpy.ndarray:
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        vectors = [
+            vector
+            for batch_start in range(0, len(texts), self.batch_size)
+            for vector in self.provider.embed(texts[batch_start:batch_start + self.batch_size], query=query)
+        ]
+        return normalize(numpy.array(vectors, dtype=numpy.float32).reshape(len(texts), -1))
+
+
+@dataclasses.dataclass
+class EmbeddingIndex:
+    """
+        Embeddings of the summaries stored next to the output file.
+
+        path: str - Path of the output file, which the index belongs to
+    """
+    path: str
+
+    @property
+    def vectors_path(self) -> str:
+        return self.path + VECTORS_SUFFIX
+
+    @property
+    def metadata_path(self) -> str:
+        return self.path + METADATA_SUFFIX
+
+    def read_metadata(self) -> dict[str, typing.Any] | None:
+        if not (os.path.exists(self.metadata_path) and os.path.exists(self.vectors_path)):
+            return None
+        with open(self.metadata_path, encoding='utf-8') as metadata_file:
+            return json.load(metadata_file)
+
+    def open_vectors(self, mode: str = 'r') -> numpy.memmap:
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        return numpy.lib.format.open_memmap(self.vectors_path, mode=mode)
+
+    def update(self, summaries: dict[str, str], embedder: Embedder, prune: bool = True) -> int:
+        """
+            Embeds the new and changed summaries (by the name of the repository) and returns the number of embedded summaries.
+
+            If prune is set, repositories missing from the summaries are removed from the index (e.g. after the full run).
+            Changed vectors are overwritten in place, while new (or removed) repositories require the vectors file to be rewritten.
+            Index built by another embedder is rebuilt from scratch.
+        """
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        metadata = self.read_metadata()
+        if not metadata or metadata['embedder'] != embedder.name:
+            metadata = {'embedder': embedder.name, 'names': [], 'hashes': []}
+        positions = {name: position for position, name in enumerate(metadata['names'])}
+        summaries_hashes = {name: hash_summary(summary) for name, summary in summaries.items()}
+        changed_names = [
+            name
+            for name, summary_hash in summaries_hashes.items()
+            if name not in positions or metadata['hashes'][positions[name]] != summary_hash
+        ]
+        names = [
+            name
+            for name in metadata['names']
+            if not prune or name in summaries
+        ] + [
+            name
+            for name in changed_names
+            if name not in positions
+        ]
+        if not changed_names and names == metadata['names']:
+            return 0
+        changed_vectors = embedder.embed([summaries[name] for name in changed_names]) if changed_names else None
+
+        if names == metadata['names']:
+            vectors = self.open_vectors(mode='r+')
+        else:
+            dimensions = changed_vectors.shape[1] if changed_vectors is not None else self.open_vectors().shape[1]
+            output_directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile(dir=output_directory, suffix=VECTORS_SUFFIX, delete=False) as temporary_vectors:
+                temporary_path = temporary_vectors.name
+            vectors = numpy.lib.format.open_memmap(
+                temporary_path,
+                mode='w+',
+                dtype=numpy.float32,
+                shape=(len(names), dimensions),
+            )
+            if kept_positions := [(position, positions[name]) for position, name in enumerate(names) if name in positions]:
+                new_positions, old_positions = map(list, zip(*kept_positions))
+                vectors[new_positions] = self.open_vectors()[old_positions]
+        name_positions = {name: position for position, name in enumerate(names)}
+        if changed_vectors is not None:
+            vectors[[name_positions[name] for name in changed_names]] = changed_vectors
+        vectors.flush()
+        del vectors
+        if names != metadata['names']:
+            os.replace(temporary_path, self.vectors_path)
+
+        hashes = {name: summary_hash for name, summary_hash in zip(metadata['names'], metadata['hashes'])} | summaries_hashes
+        self.write_metadata({
+            'embedder': embedder.name,
+            'names': names,
+            'hashes': [hashes[name] for name in names],
+        })
+        return len(changed_names)
+
+    def write_metadata(self, metadata: dict[str, typing.Any]) -> None:
+        output_directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=output_directory, suffix=METADATA_SUFFIX, delete=False, encoding='utf-8') as temporary_metadata:
+            json.dump(metadata, temporary_metadata)
+        os.replace(temporary_metadata.name, self.metadata_path)
+
+    def search(self, query: str, embedder: Embedder, k: int = 10) -> list[tuple[str, float]]:
+        """
+            Returns the names of the k repositories with the summaries most similar to the query, along with their cosine similarity.
+        """
+        import numpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        if not (metadata := self.read_metadata()) or not metadata['names'] or k <= 0:
+            return []
+        if metadata['embedder'] != embedder.name:
+            raise ValueError(f"Index was built with the {metadata['embedder']} embedder, not {embedder.name}")
+        query_vector = embedder.embed([query], query=True)[0]
+        vectors = self.open_vectors()
+        scores = numpy.concatenate([
+            vectors[chunk_start:chunk_start + SEARCH_CHUNK_SIZE] @ query_vector
+            for chunk_start in range(0, len(vectors), SEARCH_CHUNK_SIZE)
+        ])
+        k = min(k, len(scores))
+        top_positions = numpy.argpartition(-scores, k - 1)[:k]
+        return [
+            (metadata['names'][position], float(scores[position]))
+            for position in top_positions[numpy.argsort(-scores[top_positions], kind='stable')]
+        ]
+
+
+def create_embedder(
+    name: str,
+    dimensions: int = DEFAULT_DIMENSIONS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    provider: typing.Callable[[], tuple[str, gitme.llm.base.LLMProvider]] | None = None,
+) -> Embedder:
+    """
+        Creates the embedder by its name (local or provider) - the provider is connected lazily, only if it is used.
+    """
+    if name == LOCAL_EMBEDDER:
+        return HashingEmbedder(dimensions=dimensions)
+    if name == PROVIDER_EMBEDDER:
+        if provider is None:
+            raise ValueError("Provider embedder requires a configured LLM provider")
+        provider_name, provider_instance = provider()
+        if not provider_instance.supports_embeddings:
+            raise ValueError(f"Provider {provider_name} has no embedding model, use the local embedder instead")
+        return ProviderEmbedder(provider=provider_instance, provider_name=provider_name, batch_size=batch_size)
+    raise ValueError(f"Unknown embedder: {name}, expected one of: {', '.join(EMBEDDERS)}")
+
+
+def search_output(config: gitme.config.RunnerConfigDictionary, query: str, k: int = 10) -> list[tuple[str, float]]:
+    """
+        Searches the embedding index of the configured output - the LLM provider is connected only if its embeddings are used.
+    """
+    import gitme.config  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    import gitme.llm.setup  # pylint: disable=import-outside-toplevel
+
+    embeddings_configuration = gitme.config.EmbeddingsConfig(**config.get('embeddings', {}))
+
+    def connect_provider() -> tuple[str, gitme.llm.base.LLMProvider]:
+        llm_configuration = gitme.config.LLMProviderConfig(**config['llm'])
+        return llm_configuration.name, gitme.llm.setup.get_provider(llm_configuration)
+
+    return EmbeddingIndex(config['output']).search(
+        query,
+        embedder=create_embedder(
+            embeddings_configuration.embedder,
+            dimensions=embeddings_configuration.dimensions,
+            batch_size=embeddings_configuration.batch_size,
+            provider=connect_provider,
+        ),
+        k=k,
+    )
@@ -1,9 +1,17 @@
 from __future__ import annotations
+import codecs
+import copy
 import dataclasses
+import datetime
+import hashlib
 import logging
+import os
 import string
 import random
+import sys
+import tempfile
 import typing
+import weakref
 
 import requests
 
@@ -12,33 +20,245 @@ import github.Auth
 import github.ContentFile
 import github.Repository
 
+if typing.TYPE_CHECKING:
+    import gitme.config
+
 
 class RequestsSessionHook(typing.Protocol):  # pylint: disable=too-few-public-methods
     def __call__(self, *args, **kwargs) -> requests.Response:
         ...
 
 
+README_MEDIA_TYPE = 'application/vnd.github.raw'
+DEFAULT_README_MAX_BYTES = 1024 * 1024
+README_CHUNK_BYTES = 64 * 1024
+BYTE_ORDER_MARKS = (  # Longer marks first, as the UTF-32 LE mark starts with the UTF-16 LE one
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def git_blob_sha(content: bytes) -> str:
+    """
+        Returns the SHA of the git blob with the content - the same as the sha of the file reported by GitHub.
+    """
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+def decode_text(data: bytes, final: bool = True) -> str:
+    """
+        Decodes the text of an unknown encoding - by its byte order mark, as UTF-8 or as the encoding detected by charset_normalizer
+        (if it is installed, as it is with requests), falling back to UTF-8 with the undecodable bytes replaced.
+
+        If the data is not final (e.g. it was cut at a size limit), an incomplete UTF-8 sequence at its end is dropped.
+    """
+    for byte_order_mark, encoding in BYTE_ORDER_MARKS:
+        if data.startswith(byte_order_mark):
+            return data.decode(encoding, errors='replace')
+    try:
+        return codecs.getincrementaldecoder('utf-8')().decode(data, final=final)
+    except UnicodeDecodeError:
+        pass
+    try:
+        import charset_normalizer  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return data.decode('utf-8', errors='replace')
+    if (best_match := charset_normalizer.from_bytes(data).best()) is not None:
+        return str(best_match)
+    return data.decode('utf-8', errors='replace')
+
+
+@dataclasses.dataclass(frozen=True)
+class ReadmeLimits:
+    """
+        Limits of the READMEs fetched from GitHub.
+
+        max_bytes: int - Maximal number of bytes of the README - larger READMEs are cut
+        spill_bytes: int | None - READMEs larger than that are kept in temporary files instead of the memory (None, to keep all in the memory)
+    """
+    max_bytes: int = DEFAULT_README_MAX_BYTES
+    spill_bytes: int | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class FetchedReadme:
+    """
+        README fetched from GitHub.
+
+        text: str - Decoded README, cut to the size limit
+        sha: str | None - SHA of the README blob, used to detect its changes (None, if the README was truncated, so it could not be computed)
+        truncated: bool - Whether the README was larger than the size limit
+    """
+    text: str
+    sha: str | None
+    truncated: bool = False
+
+    @classmethod
+    def from_content(cls, content: bytes, max_bytes: int, sha: str | None = None) -> FetchedReadme:
+        """
+            Cuts the content of the README to max_bytes and decodes it - SHA is computed from the content, if it is not given.
+        """
+        if truncated := len(content) > max_bytes:
+            content = content[:max_bytes]
+        return cls(
+            text=decode_text(content, final=not truncated),
+            sha=None if truncated else sha or git_blob_sha(content),
+            truncated=truncated,
+        )
+
+
 @dataclasses.dataclass
+class ReadmeSpill:
+    """
+        README content spilled to a temporary file, which is removed when the README is released (or garbage collected).
+    """
+    content: dataclasses.InitVar[bytes]
+    path: str = dataclasses.field(init=False)
+    size: int = dataclasses.field(init=False)
+    _remove: weakref.finalize = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self, content: bytes) -> None:
+        with tempfile.NamedTemporaryFile(prefix='gitme-readme-', delete=False) as spill_file:
+            spill_file.write(content)
+        self.path = spill_file.name
+        self.size = len(content)
+        self._remove = weakref.finalize(self, os.remove, self.path)
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as spill_file:
+            return spill_file.read()
+
+    def release(self) -> None:
+        self._remove()
+
+
+@dataclasses.dataclass(slots=True)
 class RepositoryMetadata:
+    """
+        Metadata of the repository used to generate its prompt, kept compact for profiles with many (or large) READMEs.
+
+        README is held as UTF-8 encoded bytes - or spilled to a temporary file, if it is larger than spill_threshold bytes -
+        and can be released as soon as it is no longer needed. Names of the technologies are interned, as they repeat between repositories.
+    """
+    spill_threshold: int | None = dataclasses.field(default=None, repr=False)
     name: str = dataclasses.field(init=False)
-    readme: str = dataclasses.field(init=False)
     description: str = dataclasses.field(init=False)
     technologies: list[str] = dataclasses.field(init=False, default_factory=list)
+    context: dict[str, str] | None = dataclasses.field(init=False, default=None)  # Extracted only if configured
+    readme_sha: str | None = dataclasses.field(init=False, default=None)  # SHA of the README blob, if it is known
+    _readme: bytes | ReadmeSpill | None = dataclasses.field(init=False, default=b'', repr=False)
+
+    @property
+    def readme(self) -> str:
+        if self._readme is None:
+            raise ValueError(f'README of {self.name} was already released')
+        if isinstance(self._readme, ReadmeSpill):
+            return self._readme.read().decode('utf-8')
+        return self._readme.decode('utf-8')
+
+    @readme.setter
+    def readme(self, readme: str) -> None:
+        self.release_readme()
+        encoded_readme = readme.encode('utf-8')
+        if self.spill_threshold is not None and len(encoded_readme) > self.spill_threshold:
+            self._readme = ReadmeSpill(encoded_readme)
+        else:
+            self._readme = encoded_readme
+
+    def release_readme(self) -> None:
+        if isinstance(self._readme, ReadmeSpill):
+            self._readme.release()
+        self._readme = None
+
+    @staticmethod
+    def intern_technologies(technologies: typing.Iterable[str]) -> list[str]:
+        return [
+            sys.intern(technology)
+            for technology in technologies
+        ]
+
+    def set_fetched_readme(self, fetched_readme: FetchedReadme) -> None:
+        self.readme = fetched_readme.text
+        self.readme_sha = fetched_readme.sha
 
     @classmethod
-    def from_repo(cls, repo: github.Repository.Repository) -> RepositoryMetadata:
-        metadata = cls()
+    def from_repo(
+        cls,
+        repo: github.Repository.Repository,
+        rest: GithubRESTAdapter | None = None,
+        limits: ReadmeLimits = ReadmeLimits(),
+    ) -> RepositoryMetadata:
+        """
+            Fetches the metadata of the repository - README is streamed as the raw file by the REST adapter, if it is given
+            (otherwise it is decoded by PyGithub from the base64-encoded JSON).
+        """
+        metadata = cls(spill_threshold=limits.spill_bytes)
         metadata.name = repo.full_name
         try:
-            metadata.readme = repo.get_readme().decoded_content.decode(encoding='utf-8')
+            if rest is not None:
+                fetched_readme = rest.fetch_readme(repo.full_name, max_bytes=limits.max_bytes)
+            else:
+                readme_file = repo.get_readme()
+                fetched_readme = FetchedReadme.from_content(readme_file.decoded_content, max_bytes=limits.max_bytes, sha=readme_file.sha)
         except github.UnknownObjectException:
-            metadata.readme = ''
+            fetched_readme = FetchedReadme(text='', sha=None)
+        metadata.set_fetched_readme(fetched_readme)
         metadata.description = repo.description
-        metadata.technologies = [
-            *repo.get_languages().keys()
-        ]
+        metadata.technologies = cls.intern_technologies(
+            repo.get_languages().keys()
+        )
         return metadata
 
+    @classmethod
+    def from_graphql_node(cls, node: dict[str, typing.Any], readme: FetchedReadme, limits: ReadmeLimits = ReadmeLimits()) -> RepositoryMetadata:
+        metadata = cls(spill_threshold=limits.spill_bytes)
+        metadata.name = node['nameWithOwner']
+        metadata.set_fetched_readme(readme)
+        metadata.description = node['description']
+        metadata.technologies = cls.intern_technologies(
+            language['name']
+            for language in node['languages']['nodes']
+        )
+        return metadata
+
+
+def requires_search(filters: gitme.config.RepositoryFilters) -> bool:
+    """
+        Whether any of the filters can be applied only by the search (forks and archived repositories are filtered
+        by the repositories connection of the owner as well, which unlike the search is not limited to 1000 results).
+    """
+    return bool(filters.topics or filters.languages or filters.min_stars is not None or filters.pushed_after is not None)
+
+
+def build_search_query(owner_qualifier: str, filters: gitme.config.RepositoryFilters) -> str:
+    """
+        Translates the discovery filters into a GitHub search query,
+        see: https://docs.github.com/en/search-github/searching-on-github/searching-for-repositories
+    """
+    query_chunks = [
+        f'{owner_qualifier}:{filters.owner}',
+        'is:public',
+        f'fork:{"true" if filters.forks else "false"}',
+    ]
+    if not filters.archived:
+        query_chunks.append('archived:false')
+    query_chunks.extend(
+        f'topic:{topic}'
+        for topic in filters.topics
+    )
+    query_chunks.extend(
+        f'language:"{language}"'
+        for language in filters.languages
+    )
+    if filters.min_stars is not None:
+        query_chunks.append(f'stars:>={filters.min_stars}')
+    if filters.pushed_after is not None:
+        query_chunks.append(f'pushed:>={filters.pushed_after.isoformat()}')
+    return ' '.join(query_chunks)
+
 
 @dataclasses.dataclass(frozen=True)
 class GithubGraphQLAdapter:
@@ -47,6 +267,7 @@ class GithubGraphQLAdapter:
     __instance: GithubGraphQLAdapter | None = dataclasses.field(default=None, init=False)
 
     GITHUB_GRAPHQL_ENDPOINT = 'https://api.github.com/graphql'
+    SEARCH_PAGE_SIZE = 100
 
     @classmethod
     def init(cls, token: str) -> GithubGraphQLAdapter:
@@ -77,15 +298,171 @@ class GithubGraphQLAdapter:
             ) from failed_query_error
         return response.json()
 
+    def paginate(self, query: str, variables: dict[str, typing.Any], path: list[str]) -> typing.Generator[dict, None, None]:
+        """
+            Lazily iterates over the nodes of a paginated connection - the next page is requested
+            only after all nodes of the current one are consumed.
+
+            The query needs to accept the $cursor variable and select pageInfo { hasNextPage endCursor } and nodes
+            of the connection located under the given path in the response data.
+        """
+        cursor: str | None = None
+        while True:
+            response = self.query({
+                'query': query,
+                'variables': variables | {'cursor': cursor},
+            })
+            if errors := response.get('errors'):
+                raise github.GithubException(
+                    status=400,
+                    data={
+                        'message': f'GraphQL query failed: {errors}'
+                    }
+                )
+            connection = response['data']
+            for key in path:
+                connection = connection[key]
+            yield from connection['nodes']
+            if not connection['pageInfo']['hasNextPage']:
+                return
+            cursor = connection['pageInfo']['endCursor']
+
+
+@dataclasses.dataclass(frozen=True)
+class GithubRESTAdapter:
+    """
+        Adapter for the GitHub REST API endpoints, which responses are streamed (e.g. archives and raw files),
+        instead of being decoded by PyGithub from the base64-encoded JSON. Connections are pooled by the session.
+    """
+    _get: RequestsSessionHook
+
+    __instance: GithubRESTAdapter | None = dataclasses.field(default=None, init=False)
+
+    GITHUB_API_ENDPOINT = 'https://api.github.com'
+
+    @classmethod
+    def init(cls, token: str) -> GithubRESTAdapter:
+        if not cls.__instance:
+            new_rest_session = requests.Session()
+            new_rest_session.headers.update({
+                'Authorization': f'bearer {token}',
+                'X-GitHub-Api-Version': '2022-11-28',
+            })
+            cls.__instance = cls(
+                _get=new_rest_session.get,
+            )
+        return cls.__instance
+
+    def stream(self, path: str, accept: str) -> requests.Response:
+        response = self._get(
+            f'{self.GITHUB_API_ENDPOINT}{path}',
+            headers={'Accept': accept},
+            stream=True,
+            timeout=60,
+        )
+        if response.status_code == 404:
+            response.close()
+            raise github.UnknownObjectException(
+                status=404,
+                data={
+                    'message': f'{path} does not exist or is private',
+                }
+            )
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as failed_request_error:
+            response.close()
+            raise github.GithubException(
+                status=response.status_code,
+                data={
+                    'message': f'Failed to fetch {path}',
+                }
+            ) from failed_request_error
+        return response
+
+    def fetch_readme(self, full_name: str, max_bytes: int = DEFAULT_README_MAX_BYTES) -> FetchedReadme:
+        """
+            Streams the README of the repository as the raw file, reading at most max_bytes of it.
+            Raises UnknownObjectException, if the repository has no README.
+        """
+        content = bytearray()
+        with self.stream(f'/repos/{full_name}/readme', accept=README_MEDIA_TYPE) as response:
+            for chunk in response.iter_content(chunk_size=README_CHUNK_BYTES):
+                content += chunk
+                if len(content) > max_bytes:
+                    break
+        return FetchedReadme.from_content(bytes(content), max_bytes=max_bytes)
+
+
+SEARCH_RESULTS_LIMIT = 1000  # GitHub search returns at most that many results for a single query
+FIRST_REPOSITORY_DATE = datetime.date(2007, 10, 1)  # Creation dates of the repositories, by which the searches are sliced, start there
+
+DISCOVERY_GRAPHQL_QUERY = """
+query($query: String!, $first: Int!, $cursor: String) {
+    search(query: $query, type: REPOSITORY, first: $first, after: $cursor) {
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+        nodes {
+            ... on Repository {
+                nameWithOwner
+                description
+                languages(first: 20, orderBy: {field: SIZE, direction: DESC}) {
+                    nodes {
+                        name
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+SEARCH_COUNT_GRAPHQL_QUERY = """
+query($query: String!) {
+    search(query: $query, type: REPOSITORY, first: 1) {
+        repositoryCount
+    }
+}
+"""
+
+OWNER_REPOSITORIES_GRAPHQL_QUERY = """
+query($owner: String!, $first: Int!, $cursor: String, $isFork: Boolean, $isArchived: Boolean) {
+    repositoryOwner(login: $owner) {
+        repositories(
+            first: $first, after: $cursor, privacy: PUBLIC, ownerAffiliations: [OWNER], isFork: $isFork, isArchived: $isArchived,
+            orderBy: {field: CREATED_AT, direction: ASC}
+        ) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                nameWithOwner
+                description
+                languages(first: 20, orderBy: {field: SIZE, direction: DESC}) {
+                    nodes {
+                        name
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
 
 @dataclasses.dataclass
 class GithubProfile:
     username: str
+    readme_limits: ReadmeLimits = dataclasses.field(default_factory=ReadmeLimits)
 
     logger: logging.Logger = dataclasses.field(init=False, default_factory=logging.getLogger)
 
     __client: github.Github = dataclasses.field(init=False, default_factory=github.Github)
     __graphql: GithubGraphQLAdapter = dataclasses.field(init=False)
+    __rest: GithubRESTAdapter = dataclasses.field(init=False)
     __instance: GithubProfile | None = dataclasses.field(default=None, init=False)
 
     # pylint: disable=protected-access, unused-private-member
@@ -112,9 +489,28 @@ class GithubProfile:
             new_instance.__client = new_client
             new_instance.check_token_permissions()
             new_instance.__graphql = GithubGraphQLAdapter.init(token)
+            new_instance.__rest = GithubRESTAdapter.init(token)
             cls.__instance = new_instance
         return cls.__instance
 
+    def for_user(self, username: str) -> GithubProfile:
+        """
+            Returns the profile of another user, which shares the already authenticated clients of this one.
+        """
+        if username == self.username:
+            return self
+        user_profile = copy.copy(self)
+        user_profile.username = username
+        return user_profile
+
+    def with_readme_limits(self, readme_limits: ReadmeLimits) -> GithubProfile:
+        """
+            Returns the profile, which fetches the READMEs with the given limits, sharing the already authenticated clients of this one.
+        """
+        limited_profile = copy.copy(self)
+        limited_profile.readme_limits = readme_limits
+        return limited_profile
+
     @staticmethod
     def _patch_logger(logger: logging.Logger) -> None:
         parent_logger: logging.Logger = logger.parent  # type: ignore
@@ -181,10 +577,16 @@ class GithubProfile:
         )
 
     def get_repo(self, repo_name: str) -> github.Repository.Repository:
-        repo_path = f"{self.username}/{repo_name}"
+        repo_path = repo_name if "/" in repo_name else f"{self.username}/{repo_name}"
         self.log(f"Fetching repository {repo_path}")
         return self.__client.get_repo(repo_path)
 
+    def get_repository_metadata(self, repo_name: str) -> RepositoryMetadata:
+        return self._metadata_of(self.get_repo(repo_name))
+
+    def _metadata_of(self, repo: github.Repository.Repository) -> RepositoryMetadata:
+        return RepositoryMetadata.from_repo(repo, rest=self.__rest, limits=self.readme_limits)
+
     @property
     def _repositories(self) -> list[github.Repository.Repository]:
         return list(self.__client.get_user().get_repos())
@@ -195,7 +597,7 @@ class GithubProfile:
         for repo in self._repositories:
             if repo.private:
                 continue
-            yield RepositoryMetadata.from_repo(repo)
+            yield self._metadata_of(repo)
 
     @property
     def _pinned_repositories(self) -> list[github.Repository.Repository]:
@@ -205,21 +607,16 @@ class GithubProfile:
                     pinnedItems(first: 10, types: REPOSITORY) {{
                         nodes {{
                             ... on Repository {{
-                                name
+                                nameWithOwner
                             }}
                         }}
                     }}
                 }}
             }}"""
         }
-        pinned_repositories_names = [
-            node['name']
-            for node in self.__graphql.query(graphql_query_json)['data']['user']['pinnedItems']['nodes']
-        ]
         return [
-            repository
-            for repository in self._repositories
-            if repository.name in pinned_repositories_names
+            self.__client.get_repo(node['nameWithOwner'])
+            for node in self.__graphql.query(graphql_query_json)['data']['user']['pinnedItems']['nodes']
         ]
 
     @property
@@ -228,13 +625,116 @@ class GithubProfile:
         for repo in self._pinned_repositories:
             if repo.private:
                 continue
-            yield RepositoryMetadata.from_repo(repo)
+            yield self._metadata_of(repo)
+
+    def _get_owner_qualifier(self, owner: str) -> str:
+        response = self.__graphql.query({
+            'query': 'query($owner: String!) { repositoryOwner(login: $owner) { __typename } }',
+            'variables': {'owner': owner},
+        })
+        if not (repository_owner := response.get('data', {}).get('repositoryOwner')):
+            raise github.UnknownObjectException(
+                status=404,
+                data={
+                    'message': f'User or organization {owner} does not exist',
+                }
+            )
+        return 'org' if repository_owner['__typename'] == 'Organization' else 'user'
+
+    def _count_search_results(self, search_query: str) -> int:
+        response = self.__graphql.query({
+            'query': SEARCH_COUNT_GRAPHQL_QUERY,
+            'variables': {'query': search_query},
+        })
+        if errors := response.get('errors'):
+            raise github.GithubException(
+                status=400,
+                data={
+                    'message': f'GraphQL query failed: {errors}'
+                }
+            )
+        return response['data']['search']['repositoryCount']
+
+    def _slice_search_query(
+        self,
+        search_query: str,
+        created_range: tuple[datetime.date, datetime.date] | None = None,
+    ) -> typing.Generator[str, None, None]:
+        """
+            Splits the search query into the ranges of the creation dates (halved until each of them has at most SEARCH_RESULTS_LIMIT results).
+            Results over the limit are lost only if the repositories created on a single day exceed it, which is logged.
+        """
+        sliced_query = search_query if created_range is None else f'{search_query} created:{created_range[0]}..{created_range[1]}'
+        if (results := self._count_search_results(sliced_query)) <= SEARCH_RESULTS_LIMIT:
+            if results:
+                yield sliced_query
+            return
+        first_date, last_date = created_range or (FIRST_REPOSITORY_DATE, datetime.date.today())
+        if first_date == last_date:
+            self.log(f"{results} repositories match {sliced_query}, only the first {SEARCH_RESULTS_LIMIT} of them are discovered", level=logging.WARNING)
+            yield sliced_query
+            return
+        middle_date = first_date + datetime.timedelta(days=(last_date - first_date).days // 2)
+        yield from self._slice_search_query(search_query, (first_date, middle_date))
+        yield from self._slice_search_query(search_query, (middle_date + datetime.timedelta(days=1), last_date))
+
+    def discover_repositories(self, filters: gitme.config.RepositoryFilters) -> typing.Generator[RepositoryMetadata, None, None]:
+        """
+            Streams the repositories of a user or an organization matching the filters.
+
+            Filters are translated into a search query, so that only the matching repositories are sent back,
+            together with their description and languages. Pages are fetched lazily, as the stream is consumed,
+            and only README files are downloaded separately for each of the yielded repositories.
+
+            GitHub search returns at most 1000 results for a single query - without the filters, which only the search supports,
+            the repositories connection of the owner is paginated instead, otherwise the search is sliced by the creation dates.
+        """
+        owner_qualifier = self._get_owner_qualifier(filters.owner)
+        if not requires_search(filters):
+            self.log(f"Discovering repositories of {filters.owner}")
+            nodes = self.__graphql.paginate(
+                OWNER_REPOSITORIES_GRAPHQL_QUERY,
+                variables={
+                    'owner': filters.owner,
+                    'first': self.__graphql.SEARCH_PAGE_SIZE,
+                    'isFork': None if filters.forks else False,
+                    'isArchived': None if filters.archived else False,
+                },
+                path=['repositoryOwner', 'repositories'],
+            )
+        else:
+            search_query = build_search_query(owner_qualifier, filters)
+            self.log(f"Discovering repositories matching: {search_query}")
+            nodes = (
+                node
+                for sliced_query in self._slice_search_query(search_query)
+                for node in self.__graphql.paginate(
+                    DISCOVERY_GRAPHQL_QUERY,
+                    variables={
+                        'query': sliced_query,
+                        'first': self.__graphql.SEARCH_PAGE_SIZE,
+                    },
+                    path=['search'],
+                )
+            )
+        for node in nodes:
+            if not node:  # Search may return nodes of other types, which are empty for the Repository fragment
+                continue
+            yield RepositoryMetadata.from_graphql_node(
+                node,
+                readme=self.get_repo_readme(node['nameWithOwner']),
+                limits=self.readme_limits,
+            )
+
+    @property
+    def rest(self) -> GithubRESTAdapter:
+        return self.__rest
 
-    def get_repo_readme(self, repo: github.Repository.Repository) -> str:
+    def get_repo_readme(self, full_name: str) -> FetchedReadme:
         try:
-            return repo.get_readme().decoded_content.decode('utf-8')
+            return self.__rest.fetch_readme(full_name, max_bytes=self.readme_limits.max_bytes)
         except github.UnknownObjectException:
-            return ''
+            return FetchedReadme(text='', sha=None)
         except github.GithubException as other_error:
             raise github.UnknownObjectException(
                 status=404,
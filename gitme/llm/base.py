@@ -4,9 +4,11 @@ import dataclasses
 import logging
 import typing
 
-import tenacity
+if typing.TYPE_CHECKING:
+    import tenacity
 
-import gitme.config
+    import gitme.config
+    import gitme.ratelimit
 
 
 class TokenCounters(typing.TypedDict):
@@ -14,6 +16,23 @@ class TokenCounters(typing.TypedDict):
     total: int
 
 
+class RateLimits(typing.TypedDict):
+    """
+        Per minute usage limits of the provider
+
+        RPM: int - Requests per minute
+        TPM: int - Tokens per minute
+    """
+    RPM: int
+    TPM: int
+
+
+class EmbeddingsNotSupportedError(Exception):
+    """
+        Raised when the embeddings are requested from a provider without an embedding model (see LLMProvider.supports_embeddings).
+    """
+
+
 @dataclasses.dataclass(kw_only=True, frozen=True)
 class LLMQueryResult:
     query: str
@@ -24,6 +43,7 @@ class LLMQueryResult:
 @dataclasses.dataclass
 class LLMProvider(abc.ABC):
     _logger: logging.Logger = dataclasses.field(init=False, default=logging.getLogger(__name__))
+    _rate_limiter: gitme.ratelimit.SharedRateLimiter | None = dataclasses.field(init=False, default=None)
 
     __instance: LLMProvider | None = dataclasses.field(init=False, default=None)
     __retry_policy: tenacity.Retrying | None = dataclasses.field(init=False, default=None)
@@ -32,6 +52,8 @@ class LLMProvider(abc.ABC):
     @classmethod
     def initialize(cls, configuration: gitme.config.LLMProviderConfig) -> LLMProvider:
         if not cls.__instance:
+            import tenacity  # pylint: disable=import-outside-toplevel
+
             cls.__retry_policy = tenacity.Retrying(**{
                 field.removeprefix('_'): getattr(configuration._retry, field)
                 for field in configuration._retry.get_policy_config()
@@ -46,9 +68,44 @@ class LLMProvider(abc.ABC):
             configuration = {}
         return cls.__instance
 
+    @classmethod
+    def get_rate_limits(cls, connection: dict[str, str] | None = None) -> RateLimits | None:  # pylint: disable=unused-argument
+        """
+            Returns the per minute usage limits of the provider (None, if the provider is not limited).
+            Can be called without connecting to the provider e.g. to plan the queries - limits of the providers,
+            which depend on the connection configuration (e.g. the router), are known only if it is given.
+        """
+        return None
+
+    @classmethod
+    def get_requests_per_query(cls, connection: dict[str, str] | None = None) -> int:  # pylint: disable=unused-argument
+        """
+            Returns the number of requests counted against the RPM limit for a single query.
+        """
+        return 1
+
+    def get_remaining_quota(self) -> RateLimits | None:
+        """
+            Returns the part of the per minute limits, which is still left in the current minute (None, if the provider is not limited).
+        """
+        return None
+
+    def stats(self) -> dict[str, typing.Any]:
+        """
+            Returns the usage statistics of the provider (e.g. of each of the routed providers).
+        """
+        return {}
+
     def set_logger(self, logger: logging.Logger) -> None:
         self._logger = logger
 
+    def set_rate_limiter(self, rate_limiter: gitme.ratelimit.SharedRateLimiter) -> None:
+        """
+            Replaces the internal usage counters of the provider with the limiter shared between the processes
+            (both when waiting for the limits and in get_remaining_quota).
+        """
+        self._rate_limiter = rate_limiter
+
     @classmethod
     @abc.abstractmethod
     def connect(cls, config: dict[str, str]) -> LLMProvider:  # pylint: disable=redefined-outer-name
@@ -62,6 +119,20 @@ class LLMProvider(abc.ABC):
     def count_tokens(self, query: str) -> int:
         pass
 
+    @property
+    def supports_embeddings(self) -> bool:
+        """
+            Whether the provider has an embedding model - only then its embed method can be used.
+        """
+        return False
+
+    def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        """
+            Returns the embeddings of the texts (documents, or search queries if query is set).
+            Providers with an embedding model override it along with supports_embeddings.
+        """
+        raise EmbeddingsNotSupportedError(f"{type(self).__name__} does not provide embeddings")
+
     def log(self, message_data: typing.Any, level: int = logging.INFO) -> None:
         self._logger.log(
             level=level,
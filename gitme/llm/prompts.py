@@ -1,4 +1,6 @@
 # pylint: disable=line-too-long
+import functools
+
 import requests
 
 CONTEXT_CLEANER_URL = "https://r.1lm.io/p/"
@@ -12,6 +14,7 @@ EXAMPLE_CONTEXT_URL = "https://raw.githubusercontent.com/cert-manager/csi-driver
 EXAMPLE_SUMMARY = "The csi-driver is a Kubernetes CSI plugin that works with cert-manager to automate the management of certificate key pairs for pods. It stores private keys locally on nodes, ensuring they are never transmitted over the network. Each pod replica receives a unique certificate, which is automatically renewed and securely destroyed upon termination. Certificate requests can be embedded within Kubernetes Pod templates, simplifying management. The driver supports secure, per-replica certificates and facilitates secure communications within Kubernetes environments."  # noqa: E501
 
 
+@functools.lru_cache(maxsize=32)  # The example context is the same for every prompt, so it is fetched only once per process
 def clean_context(context_url: str) -> str:
     raw_text = requests.get(
         url=f"{CONTEXT_CLEANER_URL}{context_url}",
@@ -20,7 +23,19 @@ def clean_context(context_url: str) -> str:
     return raw_text.split(CONTEXT_CLEANER_HEADER)[1]
 
 
-def generate_prompt(readme: str, description: str, technologies: list[str]) -> str:
+def format_context(context: dict[str, str] | None) -> str:
+    if not context:
+        return ""
+    files = "\n".join(
+        f"--- {path} ---\n{content}"
+        for path, content in context.items()
+    )
+    return f"""Other project files:
+    {files}
+    """
+
+
+def generate_prompt(readme: str, description: str, technologies: list[str], context: dict[str, str] | None = None) -> str:
     return f"""
     {JOB_DESCRIPTION}
 
@@ -33,5 +48,24 @@ def generate_prompt(readme: str, description: str, technologies: list[str]) -> s
     Project technologies: {', '.join(technologies)}
     Description: {description}
     Readme: {readme}
+    {format_context(context)}
     Your summary:
     """
+
+
+ROLLUP_JOB_DESCRIPTION = "You are tasked with writing an overview of a developer based on short summaries of their programming projects (or of groups of them). Be concise and focus on the main areas of interest, expertise and notable results. Don't list every project and don't repeat the summaries. Write only raw text, do not include any link or code blocks."  # noqa: E501
+
+
+def generate_rollup_prompt(subject: str, parts: list[tuple[str, str]]) -> str:
+    summaries = "\n".join(
+        f"- {name}: {summary}"
+        for name, summary in parts
+    )
+    return f"""
+    {ROLLUP_JOB_DESCRIPTION}
+
+    Here are the summaries of the {subject}:
+    {summaries}
+
+    Your overview:
+    """
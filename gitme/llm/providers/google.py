@@ -6,7 +6,7 @@ import time
 
 import google.generativeai.client
 
-from gitme.llm.base import LLMProvider, LLMQueryResult, TokenCounters
+from gitme.llm.base import LLMProvider, LLMQueryResult, RateLimits, TokenCounters
 
 
 # Limits below are taken from: https://aistudio.google.com/app/plan_information
@@ -21,6 +21,8 @@ MAX_RPM_PER_MODEL: dict[str, int] = {
     "gemini-1.5-flash": 15,
 }
 
+EMBEDDING_MODEL = "models/text-embedding-004"  # Limits of the embedding model are separate from the generative ones
+
 
 @dataclasses.dataclass
 class GoogleAI(LLMProvider, abc.ABC):
@@ -40,27 +42,47 @@ class GoogleAI(LLMProvider, abc.ABC):
 
     @classmethod
     def connect(cls, config: dict[str, str]) -> LLMProvider:
+        import gitme.cassette  # pylint: disable=import-outside-toplevel
+
+        transport_options = {
+            "transport": transport
+        } if (
+            # Only the REST transport goes through requests, so that the traffic can be recorded and replayed
+            transport := config.get("transport") or ("rest" if gitme.cassette.is_active() else None)
+        ) else {}
         google.generativeai.configure(
             api_key=config.get("api_key"),
+            **transport_options,
         )
         return cls(
             _model=google.generativeai.GenerativeModel(
                 model_name=cls.model,
             ),
-            _limits={
-                'TPM': MAX_TPM_PER_MODEL[cls.model],  # type: ignore
-                'RPM': MAX_RPM_PER_MODEL[cls.model],  # type: ignore
-            },
+            _limits=dict(cls.get_rate_limits()),  # type: ignore
             _usage_counters={
                 'TPM': 0,
                 'RPM': 0,
             }
         )
 
+    @classmethod
+    def get_rate_limits(cls, connection: dict[str, str] | None = None) -> RateLimits:
+        return RateLimits(
+            TPM=MAX_TPM_PER_MODEL[cls.model],  # type: ignore
+            RPM=MAX_RPM_PER_MODEL[cls.model],  # type: ignore
+        )
+
+    @classmethod
+    def get_requests_per_query(cls, connection: dict[str, str] | None = None) -> int:
+        return 2  # Tokens are counted by the model before each query
+
     def query(self, query: str) -> LLMQueryResult:
         tokens_to_send = self.count_tokens(query)
         self.log(f"Sending {tokens_to_send} tokens to the model.")
-        if self._are_limits_exceeded(tokens_to_send):
+        if self._rate_limiter:
+            if waited_seconds := self._rate_limiter.acquire(tokens_to_send, requests=self.get_requests_per_query()):
+                self.log(f"Shared usage limits exceeded. Waited {waited_seconds:.0f} seconds to continue.", level=logging.WARNING)
+        elif self._are_limits_exceeded(tokens_to_send):
             self.log("Usage limits exceeded. Waiting for the next minute to continue.", level=logging.WARNING)
             time.sleep(60)
         query_response = self._model.generate_content(query)
@@ -73,15 +95,29 @@ class GoogleAI(LLMProvider, abc.ABC):
             )
         )
         self._update_usage_counters(result.tokens)
+        if self._rate_limiter:
+            self._rate_limiter.record(result.tokens['total'] - tokens_to_send)
         self.log(f"Provider generated {result.tokens['total'] - tokens_to_send} tokens in response.")
         return result
 
-    def _are_limits_exceeded(self, requested_tokens: int) -> bool:
+    def get_remaining_quota(self) -> RateLimits:
+        if self._rate_limiter:  # Quota left to all of the workers sharing the limits
+            return self._rate_limiter.remaining()
+        self._reset_usage_counters()
+        return RateLimits(
+            RPM=max(self._limits['RPM'] - self._usage_counters['RPM'], 0),
+            TPM=max(self._limits['TPM'] - self._usage_counters['TPM'], 0),
+        )
+
+    def _reset_usage_counters(self) -> None:
         current_time = time.time()
         if current_time - self._last_check_time > 60:
             self._usage_counters['TPM'] = 0
             self._usage_counters['RPM'] = 0
             self._last_check_time = current_time
+
+    def _are_limits_exceeded(self, requested_tokens: int) -> bool:
+        self._reset_usage_counters()
         if self._usage_counters['TPM'] >= self._limits['TPM']:
             return True
         if self._usage_counters['TPM'] + requested_tokens > self._limits['TPM']:
@@ -90,11 +126,24 @@ class GoogleAI(LLMProvider, abc.ABC):
 
     def _update_usage_counters(self, tokens: TokenCounters) -> None:
         self._usage_counters['TPM'] += tokens['total']
-        self._usage_counters['RPM'] += 2
+        self._usage_counters['RPM'] += self.get_requests_per_query()
 
     def count_tokens(self, query: str) -> int:
         return self._model.count_tokens(query).total_tokens
 
+    @property
+    def supports_embeddings(self) -> bool:
+        return True
+
+    def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        embeddings = google.generativeai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=texts,
+            task_type="retrieval_query" if query else "retrieval_document",
+        )
+        self.log(f"Provider embedded {len(texts)} texts.")
+        return embeddings['embedding']
+
 
 @dataclasses.dataclass
 class GeminiOnePro(GoogleAI):
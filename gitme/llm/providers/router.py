@@ -0,0 +1,235 @@
+from __future__ import annotations
+import dataclasses
+import logging
+import time
+import typing
+
+import gitme.llm.setup
+import gitme.scheduler
+from gitme.llm.base import EmbeddingsNotSupportedError, LLMProvider, LLMQueryResult, RateLimits
+
+if typing.TYPE_CHECKING:
+    import gitme.config
+    import gitme.ratelimit
+
+# Router over an ordered list of providers (e.g. a local endpoint, gemini-1.5-flash and gemini-1.0-pro) -
+# each query is dispatched to the first provider, which has enough of its per minute quota left for the prompt,
+# so that the queries overflow to the next providers instead of waiting for the limits of the preferred one to reset.
+# Noticeably slower providers (by the moving average of their latency) are passed over in favour of the faster ones,
+# but are probed again every so often, so that the estimate of their latency can recover.
+
+ROUTE_KEY = "route"
+ROUTE_SEPARATOR = ","
+LATENCY_SMOOTHING = 0.3  # Weight of the latest observation in the moving average of the latency
+LATENCY_TOLERANCE = 2.0  # Preferred provider is passed over, if its latency is more than that many times the latency of a later one
+REPROBE_AFTER = 20  # Number of queries, for which a slower provider is passed over, before it is queried again to refresh its latency
+
+
+@dataclasses.dataclass
+class RoutedProvider:
+    """
+        Provider of the route along with its usage statistics.
+
+        queries: int - Number of queries answered by the provider
+        failures: int - Number of queries, which failed and were passed to the next provider
+        overflows: int - Number of queries passed to the next providers because of the quota (or latency) of this one
+        latency: float | None - Exponentially weighted moving average of the query duration in seconds
+        passed_over: int - Number of the consecutive queries passed to the later providers because of the latency of this one
+    """
+    name: str
+    provider: LLMProvider
+    queries: int = 0
+    failures: int = 0
+    overflows: int = 0
+    latency: float | None = None
+    passed_over: int = 0
+    prompt_tokens: int = 0
+    total_tokens: int = 0
+
+    def fits(self, tokens: int) -> bool:
+        if (remaining_quota := self.provider.get_remaining_quota()) is None:
+            return True
+        return remaining_quota['RPM'] >= self.provider.get_requests_per_query() and remaining_quota['TPM'] >= tokens
+
+    def observe(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else (
+            LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+        )
+
+    def reprobe(self) -> None:
+        """
+            Forgets the (possibly stale) latency, so that the provider is queried again and its latency is taken from that query.
+        """
+        self.latency = None
+        self.passed_over = 0
+
+    def describe(self) -> dict[str, typing.Any]:
+        return {
+            "queries": self.queries,
+            "failures": self.failures,
+            "overflows": self.overflows,
+            "latency": self.latency,
+            "prompt_tokens": self.prompt_tokens,
+            "total_tokens": self.total_tokens,
+            "remaining_quota": self.provider.get_remaining_quota(),
+        }
+
+
+@dataclasses.dataclass
+class RouterProvider(LLMProvider):
+    """
+        Provider dispatching each query to one of the routed providers, based on their remaining quota,
+        observed latency and the estimated size of the prompt.
+
+        Routed providers are given by their names in the connection configuration (e.g. {"route": "G1HF,G1P", "api_key": ...}),
+        the rest of which is passed to each of them. If none of the providers has enough quota left,
+        the query is sent to the first one of them, which waits for its limits to reset.
+    """
+    _routes: list[RoutedProvider]
+    _clock: typing.Callable[[], float] = dataclasses.field(default=time.monotonic, repr=False)
+
+    @staticmethod
+    def get_route(config: dict[str, str]) -> tuple[list[tuple[str, type[LLMProvider]]], dict[str, str]]:
+        """
+            Returns the names and classes of the routed providers, along with the connection configuration passed to each of them.
+        """
+        route = [name.strip() for name in config.get(ROUTE_KEY, "").split(ROUTE_SEPARATOR) if name.strip()]
+        if not route:
+            raise ValueError(f"Router requires an ordered list of providers in the {ROUTE_KEY} connection option, e.g. G1HF,G1P")
+        routed_providers: list[tuple[str, type[LLMProvider]]] = []
+        for name in route:
+            if issubclass(provider_class := gitme.llm.setup.get_provider_class(name), RouterProvider):
+                raise ValueError("Routers cannot be nested")
+            routed_providers.append((name, provider_class))
+        return routed_providers, {key: value for key, value in config.items() if key != ROUTE_KEY}
+
+    # pylint: disable=protected-access
+    @classmethod
+    def initialize(cls, configuration: gitme.config.LLMProviderConfig) -> LLMProvider:
+        """
+            Initializes each of the routed providers with the retry policy of the configuration, instead of connecting them directly.
+        """
+        routed_providers, routed_config = cls.get_route(configuration.connection)
+        return cls(_routes=[
+            RoutedProvider(
+                name=name,
+                provider=provider_class.initialize(configuration.model_copy(update={"name": name, "connection": routed_config})),
+            )
+            for name, provider_class in routed_providers
+        ])
+
+    @classmethod
+    def connect(cls, config: dict[str, str]) -> LLMProvider:
+        routed_providers, routed_config = cls.get_route(config)
+        return cls(_routes=[
+            RoutedProvider(name=name, provider=provider_class.connect(routed_config))
+            for name, provider_class in routed_providers
+        ])
+
+    @classmethod
+    def get_rate_limits(cls, connection: dict[str, str] | None = None) -> RateLimits | None:
+        """
+            Returns the sum of the limits of the routed providers, as the queries overflow between them
+            (None, if any of them is not limited, or if the route is not known without the connection configuration).
+        """
+        if connection is None:
+            return None
+        routed_limits = [provider_class.get_rate_limits() for _, provider_class in cls.get_route(connection)[0]]
+        if any(limits is None for limits in routed_limits):
+            return None
+        return RateLimits(
+            RPM=sum(limits['RPM'] for limits in routed_limits),  # type: ignore
+            TPM=sum(limits['TPM'] for limits in routed_limits),  # type: ignore
+        )
+
+    @classmethod
+    def get_requests_per_query(cls, connection: dict[str, str] | None = None) -> int:
+        if connection is None:
+            return 1
+        return max(provider_class.get_requests_per_query() for _, provider_class in cls.get_route(connection)[0])
+
+    def set_logger(self, logger: logging.Logger) -> None:
+        super().set_logger(logger)
+        for route in self._routes:
+            route.provider.set_logger(logger)
+
+    def set_rate_limiter(self, rate_limiter: gitme.ratelimit.SharedRateLimiter) -> None:
+        """
+            Shares the limits of each of the routed providers in a separate state file next to the one of the router.
+        """
+        super().set_rate_limiter(rate_limiter)
+        for route in self._routes:
+            if (limits := route.provider.get_rate_limits()) is not None:
+                route.provider.set_rate_limiter(dataclasses.replace(rate_limiter, path=f"{rate_limiter.path}.{route.name}", limits=limits))
+
+    @property
+    def supports_embeddings(self) -> bool:
+        return any(route.provider.supports_embeddings for route in self._routes)
+
+    def choose_routes(self, tokens: int) -> list[RoutedProvider]:
+        """
+            Orders the routed providers for the prompt of the estimated size - the first one is to be queried,
+            the rest of them are used if it fails. Providers without enough quota left come last, in their original order.
+        """
+        available_routes = [route for route in self._routes if route.fits(tokens)]
+        if not available_routes:
+            return list(self._routes)
+        chosen_route = available_routes[0]
+        for route in available_routes[1:]:  # Providers, which latency is not known yet, are tried once the preferred one is observed
+            if chosen_route.latency is not None and (route.latency is None or chosen_route.latency > LATENCY_TOLERANCE * route.latency):
+                chosen_route = route
+        for route in available_routes[:available_routes.index(chosen_route)]:  # Preferred providers passed over because of their latency
+            route.passed_over += 1
+            if route.passed_over > REPROBE_AFTER:
+                route.reprobe()
+                chosen_route = route
+                break
+        chosen_route.passed_over = 0
+        return [chosen_route] + [route for route in self._routes if route is not chosen_route]
+
+    def query(self, query: str) -> LLMQueryResult:
+        tokens = gitme.scheduler.estimate_tokens(query) + gitme.scheduler.ESTIMATED_RESPONSE_TOKENS
+        routes = self.choose_routes(tokens)
+        for route in self._routes[:self._routes.index(routes[0])]:
+            route.overflows += 1
+        for route_index, route in enumerate(routes):
+            self.log(f"Routing the query ({tokens} estimated tokens) to {route.name}.")
+            query_start = self._clock()
+            try:
+                result = route.provider.query(query)
+            except Exception as query_error:  # pylint: disable=broad-exception-caught
+                route.failures += 1
+                if route_index == len(routes) - 1:
+                    raise
+                self.log(f"Provider {route.name} failed ({query_error}), passing the query to {routes[route_index + 1].name}.", level=logging.WARNING)
+                continue
+            route.observe(self._clock() - query_start)
+            route.queries += 1
+            route.prompt_tokens += result.tokens['prompt']
+            route.total_tokens += result.tokens['total']
+            return result
+        raise RuntimeError("No providers to route the query to")  # Unreachable, routes are never empty
+
+    def count_tokens(self, query: str) -> int:
+        return self._routes[0].provider.count_tokens(query)
+
+    def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        for route in self._routes:
+            if route.provider.supports_embeddings:
+                return route.provider.embed(texts, query=query)
+        raise EmbeddingsNotSupportedError("None of the routed providers provides embeddings")
+
+    def get_remaining_quota(self) -> RateLimits | None:
+        remaining_quotas = [route.provider.get_remaining_quota() for route in self._routes]
+        if any(remaining_quota is None for remaining_quota in remaining_quotas):
+            return None
+        return RateLimits(
+            RPM=sum(remaining_quota['RPM'] for remaining_quota in remaining_quotas),  # type: ignore
+            TPM=sum(remaining_quota['TPM'] for remaining_quota in remaining_quotas),  # type: ignore
+        )
+
+    def stats(self) -> dict[str, typing.Any]:
+        return {
+            route.name: route.describe()
+            for route in self._routes
+        }
@@ -1,16 +1,29 @@
-import gitme.config
-import gitme.llm.providers.google
-from gitme.llm.base import LLMProvider
+from __future__ import annotations
+import importlib
+import typing
 
+if typing.TYPE_CHECKING:
+    import gitme.config
+    from gitme.llm.base import LLMProvider
 
-__AVAILABLE_PROVIDERS = {
-    "G1P": gitme.llm.providers.google.GeminiOnePro,
-    "G1HF": gitme.llm.providers.google.GeminiOneHalfFlash
+
+# Providers are registered by their import path, so that only the SDK of the selected provider
+# is imported when the provider is requested (e.g. google.generativeai is not loaded for other providers)
+
+__AVAILABLE_PROVIDERS: dict[str, str] = {
+    "G1P": "gitme.llm.providers.google:GeminiOnePro",
+    "G1HF": "gitme.llm.providers.google:GeminiOneHalfFlash",
+    "ROUTER": "gitme.llm.providers.router:RouterProvider",
 }
 AVAILABLE_PROVIDERS = __AVAILABLE_PROVIDERS.keys()
 
 
+def get_provider_class(name: str) -> type[LLMProvider]:
+    if not (provider_path := __AVAILABLE_PROVIDERS.get(name)):
+        raise ValueError(f"Provider {name} is not supported")
+    module_name, class_name = provider_path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
 def get_provider(configuration: gitme.config.LLMProviderConfig) -> LLMProvider:
-    if target_provider := __AVAILABLE_PROVIDERS.get(configuration.name):
-        return target_provider.initialize(configuration)
-    raise ValueError(f"Provider {configuration.name} is not supported")
+    return get_provider_class(configuration.name).initialize(configuration)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import abc
+import base64
+import contextlib
+import dataclasses
+import os
+import sqlite3
+import tempfile
+import typing
+import zlib
+
+if typing.TYPE_CHECKING:
+    import pandas
+
+# Output rows are keyed by the full name of the repository, so that single rows
+# can be updated (e.g. after a webhook-driven refresh) without summarizing all of the repositories again.
+# SHA of the README blob is kept along, so that its changes are detected even if the README column is truncated or omitted.
+
+OUTPUT_COLUMNS = ['name', 'description', 'technologies', 'readme', 'readme_sha', 'summary']
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+README_FULL = 'full'
+README_TRUNCATED = 'truncated'
+README_OMITTED = 'omitted'
+README_COMPRESSED = 'compressed'
+README_COLUMN_MODES = (README_FULL, README_TRUNCATED, README_OMITTED, README_COMPRESSED)
+COMPRESSED_README_PREFIX = 'zlib:'
+
+
+def compress_readme(readme: str) -> str:
+    return COMPRESSED_README_PREFIX + base64.b64encode(zlib.compress(readme.encode('utf-8'), level=9)).decode('ascii')
+
+
+def decompress_readme(value: str) -> str:
+    """
+        Returns the README stored in the compressed README column (values without the prefix are returned as they are).
+    """
+    if not value or not value.startswith(COMPRESSED_README_PREFIX):
+        return value
+    return zlib.decompress(base64.b64decode(value[len(COMPRESSED_README_PREFIX):])).decode('utf-8')
+
+
+@dataclasses.dataclass(frozen=True)
+class ReadmeColumn:
+    """
+        Representation of the README in the output rows.
+
+        mode: str - full, truncated (to the first max_chars characters), omitted or compressed (zlib, base64 encoded)
+        max_chars: int - Number of characters kept in the truncated mode
+    """
+    mode: str = README_FULL
+    max_chars: int = 2000
+
+    def __post_init__(self) -> None:
+        if self.mode not in README_COLUMN_MODES:
+            raise ValueError(f'Unknown README column mode: {self.mode}, expected one of: {", ".join(README_COLUMN_MODES)}')
+
+    def encode(self, readme: str) -> str | None:
+        if self.mode == README_OMITTED:
+            return None
+        if self.mode == README_TRUNCATED:
+            return readme[:self.max_chars]
+        if self.mode == README_COMPRESSED:
+            return compress_readme(readme)
+        return readme
+
+    def matches(self, stored_value: str | None, readme: str) -> bool | None:
+        """
+            Checks, whether the stored column value represents the README - None, if the column does not hold the whole README.
+        """
+        if self.mode == README_OMITTED or (self.mode == README_TRUNCATED and len(readme) > self.max_chars):
+            return None
+        if self.mode == README_COMPRESSED:
+            return decompress_readme(stored_value or '') == readme
+        return (stored_value or '') == readme
+
+
+@dataclasses.dataclass
+class OutputStore(abc.ABC):
+    path: str
+
+    @abc.abstractmethod
+    def write(self, df: pandas.DataFrame) -> None:
+        pass
+
+    @abc.abstractmethod
+    def read(self) -> pandas.DataFrame:
+        pass
+
+    @abc.abstractmethod
+    def get(self, name: str) -> dict[str, typing.Any] | None:
+        pass
+
+    @abc.abstractmethod
+    def upsert(self, row: dict[str, typing.Any]) -> None:
+        pass
+
+
+@dataclasses.dataclass
+class CSVOutputStore(OutputStore):
+    """
+        Output stored in a CSV file.
+
+        CSV rows have variable length, so an update of a single row rewrites the whole file
+        (atomically, through a temporary file) - use the SQLite output for frequent updates.
+    """
+
+    def write(self, df: pandas.DataFrame) -> None:
+        df.to_csv(
+            self.path,
+            index=False
+        )
+
+    def read(self) -> pandas.DataFrame:
+        import pandas  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        if not os.path.exists(self.path):
+            return pandas.DataFrame(columns=OUTPUT_COLUMNS)
+        try:
+            return pandas.read_csv(self.path, dtype=str, keep_default_na=False)
+        except pandas.errors.EmptyDataError:  # Output of an empty run has no header
+            return pandas.DataFrame(columns=OUTPUT_COLUMNS)
+
+    def get(self, name: str) -> dict[str, typing.Any] | None:
+        rows = self.read()
+        matching_rows = rows[rows['name'] == name]
+        return matching_rows.iloc[0].to_dict() if len(matching_rows) else None
+
+    def upsert(self, row: dict[str, typing.Any]) -> None:
+        import pandas  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        rows = self.read()
+        for column in row:  # Columns added in the later versions (e.g. readme_sha)
+            if column not in rows:
+                rows[column] = ''
+        if (rows['name'] == row['name']).any():
+            rows.loc[rows['name'] == row['name'], list(row)] = list(row.values())
+        else:
+            rows = pandas.concat([rows, pandas.DataFrame([row])], ignore_index=True)
+        output_directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=output_directory, suffix='.csv', delete=False) as temporary_output:
+            rows.to_csv(temporary_output, index=False)
+        os.replace(temporary_output.name, self.path)
+
+
+@dataclasses.dataclass
+class SQLiteOutputStore(OutputStore):
+    """
+        Output stored in a SQLite database, in which single rows are updated in place.
+    """
+    table: str = 'repositories'
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Generator[sqlite3.Connection, None, None]:
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        columns_definition = ', '.join(
+            f'{column} TEXT PRIMARY KEY' if column == 'name' else column
+            for column in OUTPUT_COLUMNS
+        )
+        try:
+            with connection:  # Commits the transaction on success
+                connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} ({columns_definition})')
+                stored_columns = {column_info['name'] for column_info in connection.execute(f'PRAGMA table_info({self.table})')}
+                for column in OUTPUT_COLUMNS:  # Columns added in the later versions (e.g. readme_sha)
+                    if column not in stored_columns:
+                        connection.execute(f'ALTER TABLE {self.table} ADD COLUMN {column}')
+                yield connection
+        finally:
+            connection.close()
+
+    def write(self, df: pandas.DataFrame) -> None:
+        with self._connect() as connection:
+            connection.execute(f'DELETE FROM {self.table}')
+            for row in df.to_dict(orient='records'):
+                self._upsert(connection, row)
+
+    def read(self) -> pandas.DataFrame:
+        import pandas  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        with self._connect() as connection:
+            return pandas.read_sql_query(f'SELECT * FROM {self.table}', connection).fillna('')
+
+    def get(self, name: str) -> dict[str, typing.Any] | None:
+        with self._connect() as connection:
+            stored_row = connection.execute(f'SELECT * FROM {self.table} WHERE name = ?', (name,)).fetchone()
+        return dict(stored_row) if stored_row else None
+
+    def upsert(self, row: dict[str, typing.Any]) -> None:
+        with self._connect() as connection:
+            self._upsert(connection, row)
+
+    def _upsert(self, connection: sqlite3.Connection, row: dict[str, typing.Any]) -> None:
+        columns = [column for column in OUTPUT_COLUMNS if column in row]
+        updated_columns = ', '.join(
+            f'{column} = excluded.{column}'
+            for column in columns
+            if column != 'name'
+        )
+        connection.execute(
+            f'INSERT INTO {self.table} ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)}) '
+            f'ON CONFLICT(name) DO UPDATE SET {updated_columns}',
+            [row[column] for column in columns],
+        )
+
+
+def open_store(path: str) -> OutputStore:
+    if path.endswith(SQLITE_EXTENSIONS):
+        return SQLiteOutputStore(path)
+    return CSVOutputStore(path)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import contextlib
+import dataclasses
+import json
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import gitme.llm.base
+
+# Rate limiter shared by all of the processes using the same state file (e.g. workers of the sharded execution),
+# so that the per minute limits of the provider are enforced globally instead of separately by each process.
+# Access to the state is serialized with an exclusive lock of the file (fcntl), which works across processes
+# and hosts sharing the file system (if it supports the POSIX locks).
+
+RATE_WINDOW_SECONDS = 60
+
+
+@dataclasses.dataclass
+class SharedRateLimiter:
+    """
+        Fixed window limiter of the requests and tokens per minute, with its state kept in a locked JSON file.
+
+        path: str - Path of the state file shared between the processes
+        limits: RateLimits - Per minute usage limits of the provider
+        clock: Callable[[], float] - Source of the current time
+        sleep: Callable[[float], None] - Used to wait for the next window
+    """
+    path: str
+    limits: gitme.llm.base.RateLimits
+    clock: typing.Callable[[], float] = dataclasses.field(default=time.time, repr=False)
+    sleep: typing.Callable[[float], None] = dataclasses.field(default=time.sleep, repr=False)
+
+    @contextlib.contextmanager
+    def _locked_state(self) -> typing.Generator[dict[str, float], None, None]:
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        with open(self.path, 'a+', encoding='utf-8') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                state = json.loads(state_file.read() or '{}')
+                if self.clock() - state.get('window_start', 0) >= RATE_WINDOW_SECONDS:
+                    state = {'window_start': self.clock(), 'requests': 0, 'tokens': 0}
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                json.dump(state, state_file)
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def acquire(self, tokens: int, requests: int = 1) -> float:
+        """
+            Waits until the current window has enough of both budgets left, reserves them and returns the number of seconds waited.
+            Requests are always admitted into an empty window, so that a prompt exceeding the TPM limit on its own does not block forever.
+        """
+        waited_seconds = 0.0
+        while True:
+            with self._locked_state() as state:
+                if not state['requests'] or (
+                    state['requests'] + requests <= self.limits['RPM'] and state['tokens'] + tokens <= self.limits['TPM']
+                ):
+                    state['requests'] += requests
+                    state['tokens'] += tokens
+                    return waited_seconds
+                waiting_time = max(state['window_start'] + RATE_WINDOW_SECONDS - self.clock(), 0)
+            self.sleep(waiting_time)
+            waited_seconds += waiting_time
+
+    def remaining(self) -> gitme.llm.base.RateLimits:
+        """
+            Returns the part of the limits, which is still left in the current window (across all of the processes).
+        """
+        with self._locked_state() as state:
+            return {
+                'RPM': max(self.limits['RPM'] - int(state['requests']), 0),
+                'TPM': max(self.limits['TPM'] - int(state['tokens']), 0),
+            }
+
+    def record(self, tokens: int) -> None:
+        """
+            Counts the tokens known only after the request (e.g. generated in the response) against the current window.
+        """
+        with self._locked_state() as state:
+            state['tokens'] += tokens
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import typing
+
+import gitme.llm.prompts
+
+# Hierarchical rollup of the profile - the short summaries of the repositories are summarized per group (language or technology),
+# and the group summaries into the overview of the whole profile, so that the overview takes a few small queries
+# instead of a single prompt with all of the READMEs. Each node is cached by the hashes of its children,
+# so after a change of a single repository only the nodes on its path to the root are summarized again.
+# Large groups are split into parts by the hashes of the names (not by their positions), so that a new or removed
+# repository changes only its own part instead of shifting the members of all of the following ones.
+
+GROUP_BY_LANGUAGE = 'language'  # Primary (first) language of the repository
+GROUP_BY_TECHNOLOGY = 'technology'  # Each of the technologies of the repository
+GROUPINGS = (GROUP_BY_LANGUAGE, GROUP_BY_TECHNOLOGY)
+DEFAULT_MAX_CHILDREN = 20
+UNGROUPED = 'Other'
+ROLLUP_SUFFIX = '.rollup.json'
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def group_rows(rows: typing.Iterable[dict[str, typing.Any]], group_by: str = GROUP_BY_LANGUAGE) -> dict[str, list[tuple[str, str]]]:
+    """
+        Groups the (name, summary) pairs of the summarized rows by the language or technology (groups and their members are sorted).
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f'Unknown rollup grouping: {group_by}, expected one of: {", ".join(GROUPINGS)}')
+    groups: dict[str, list[tuple[str, str]]] = {}
+    for row in rows:
+        if not row.get('summary'):
+            continue
+        technologies = [technology.strip() for technology in (row.get('technologies') or '').split(',') if technology.strip()]
+        for group in (technologies[:1] if group_by == GROUP_BY_LANGUAGE else technologies) or [UNGROUPED]:
+            groups.setdefault(group, []).append((row['name'], row['summary']))
+    return {
+        group: sorted(members)
+        for group, members in sorted(groups.items())
+    }
+
+
+@dataclasses.dataclass
+class ProfileRollup:
+    """
+        Builds the tree of the summaries with the nodes cached in the JSON file (next to the output).
+
+        path: str - Path of the rollup file, holding the summaries of the groups, the profile overview and the cached nodes
+        summarize: Callable[[str], str] - Queries the LLM with the prompt and returns the generated summary
+        max_children: int - Maximal number of summaries in a single prompt - larger groups are split into parts, which are summarized first
+    """
+    path: str
+    summarize: typing.Callable[[str], str] = dataclasses.field(repr=False)
+    max_children: int = DEFAULT_MAX_CHILDREN
+    computed_nodes: int = dataclasses.field(init=False, default=0)
+    reused_nodes: int = dataclasses.field(init=False, default=0)
+
+    _cached_nodes: dict[str, str] = dataclasses.field(init=False, repr=False, default_factory=dict)
+    _used_nodes: dict[str, str] = dataclasses.field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.max_children < 2:
+            raise ValueError('Rollup nodes need at least 2 children')
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as rollup_file:
+                self._cached_nodes = json.load(rollup_file).get('nodes', {})
+
+    def split_parts(self, subject: str, parts: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+        """
+            Splits the parts into the buckets by the hashes of their names (salted with the subject, so that the oversized buckets
+            are split differently on the next level). Number of the buckets is rounded up to a power of 2, so that it changes
+            (and moves the parts between the buckets) only once the group doubles. Buckets keep the order of the parts,
+            and the empty ones are kept, so that the numbers of the parts are stable.
+        """
+        buckets: list[list[tuple[str, str]]] = [[] for _ in range(1 << (-(-len(parts) // self.max_children) - 1).bit_length())]
+        for name, summary in parts:
+            buckets[int(hash_text(f'{subject}\n{name}'), 16) % len(buckets)].append((name, summary))
+        if any(len(bucket) == len(parts) for bucket in buckets):  # All of the names in a single bucket - split at the fixed offsets
+            return [parts[part_start:part_start + self.max_children] for part_start in range(0, len(parts), self.max_children)]
+        return buckets
+
+    def summarize_node(self, subject: str, parts: list[tuple[str, str]]) -> str:
+        """
+            Returns the summary of the parts (name, summary pairs), taken from the cache if none of the parts changed.
+        """
+        if len(parts) > self.max_children:
+            parts = [
+                (f'part {part_index + 1}', self.summarize_node(f'{subject} (part {part_index + 1})', bucket))
+                for part_index, bucket in enumerate(self.split_parts(subject, parts))
+                if bucket
+            ]
+        node_hash = hash_text(json.dumps([subject, [(name, hash_text(summary)) for name, summary in parts]]))
+        if (summary := self._cached_nodes.get(node_hash)) is not None:
+            self.reused_nodes += 1
+        else:
+            summary = self.summarize(gitme.llm.prompts.generate_rollup_prompt(subject, parts))
+            self.computed_nodes += 1
+        self._used_nodes[node_hash] = summary
+        return summary
+
+    def build(self, rows: typing.Iterable[dict[str, typing.Any]], username: str, group_by: str = GROUP_BY_LANGUAGE) -> dict[str, typing.Any]:
+        """
+            Summarizes the groups and the whole profile, stores the rollup and returns it (without the cached nodes).
+        """
+        self._used_nodes = {}
+        groups_summaries = {
+            group: self.summarize_node(f'{group} projects of {username}', members)
+            for group, members in group_rows(rows, group_by).items()
+        }
+        rollup = {
+            'profile': self.summarize_node(
+                f'groups of projects of the GitHub user {username}',
+                list(groups_summaries.items()),
+            ) if groups_summaries else '',
+            'groups': groups_summaries,
+        }
+        self.save(rollup | {'nodes': self._used_nodes})  # Nodes of the previous trees, which are no longer used, are dropped
+        return rollup
+
+    def save(self, rollup: dict[str, typing.Any]) -> None:
+        output_directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=output_directory, suffix=ROLLUP_SUFFIX, delete=False, encoding='utf-8') as temporary_rollup:
+            json.dump(rollup, temporary_rollup, indent=2)
+        os.replace(temporary_rollup.name, self.path)
+        self._cached_nodes = dict(self._used_nodes)
@@ -1,13 +1,22 @@
+from __future__ import annotations
 import dataclasses
+import itertools
 import typing
 
-import pandas
-
-import gitme.gh
-import gitme.config
-import gitme.llm.base
 import gitme.llm.setup
-import gitme.llm.prompts
+
+if typing.TYPE_CHECKING:
+    import pandas
+
+    import gitme.config
+    import gitme.gh
+    import gitme.llm.base
+    import gitme.output
+    import gitme.scheduler
+    import gitme.sharding
+
+# Heavy dependencies (pandas, PyGithub, provider SDKs) are imported only when they are actually used,
+# so that importing the runner (e.g. by the CLI) stays cheap - even pydantic is loaded only once the configuration is parsed
 
 
 @dataclasses.dataclass
@@ -15,6 +24,7 @@ class GitMeRunner:
     config: dict[str, typing.Any] = dataclasses.field(repr=False)
     llm_provisioner: gitme.llm.base.LLMProvider = dataclasses.field(init=False, repr=False)
     github_hooks: gitme.gh.GithubProfile = dataclasses.field(init=False, repr=False)
+    readme_column: gitme.output.ReadmeColumn = dataclasses.field(init=False, repr=False)
     __parsed_configuration: gitme.config.RunnerConfig = dataclasses.field(init=False, repr=False)
 
     def __post_init__(self):
@@ -24,65 +34,264 @@ class GitMeRunner:
             After the raw configuration is parsed, the configuration attribute is reset to an empty dictionary
             to prevent sensitive data from being exposed.
         """
+        import gitme.config  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
         self.__parsed_configuration = gitme.config.RunnerConfig(self.config)
         self.config = {}
 
-    # pylint: disable=protected-access
     def run(self) -> pandas.DataFrame:
+        import pandas  # pylint: disable=import-outside-toplevel
+
+        self.connect()
+        summarized_data = pandas.DataFrame.from_records(
+            data=self.summarize_repositories(
+                repositories=[*self.get_repositories_to_analyze()]
+            )
+        )
+        if provider_stats := self.llm_provisioner.stats():
+            self.github_hooks.log(f"Provider usage: {provider_stats}")
+        return summarized_data
+
+    def plan(self) -> gitme.scheduler.QueryPlan:
+        """
+        This function plans the queries for the repositories to analyze (dry-run), without connecting to the LLM provider.
+        Prompts are estimated from the READMEs and descriptions only - the archives are not downloaded for the context.
+        """
+        self.connect_github()
+        repositories = [*self.get_repositories_to_analyze()]
+        representatives = self.find_representatives(repositories)
+        return self.plan_queries([
+            repo
+            for index, repo in enumerate(repositories)
+            if representatives[index] == index
+        ], with_context=False)
+
+    def enqueue(self, queue: gitme.sharding.WorkQueue) -> int:
+        """
+        This function enumerates the repositories to analyze into the work queue of the sharded execution (coordinator),
+        without connecting to the LLM provider. Distinct repositories are queued in the order of the query plan,
+        while the near-duplicates are queued along with their rows, which reuse the summary of their representative.
+        """
+        self.connect_github()
+        repositories = [*self.get_repositories_to_analyze()]
+        representatives = self.find_representatives(repositories)
+        distinct_repositories = [
+            index
+            for index, representative_index in enumerate(representatives)
+            if representative_index == index
+        ]
+        query_plan = self.plan_queries([repositories[index] for index in distinct_repositories], with_context=False)
+        queued_repositories = queue.enqueue(
+            repositories[distinct_repositories[planned_index]].name
+            for planned_index in query_plan.order
+        )
+        for index, repo in enumerate(repositories):
+            if (representative_index := representatives[index]) != index:
+                queue.enqueue_duplicate(self.to_row(repo, ''), representative=repositories[representative_index].name)
+        self.github_hooks.log(f"Queued {queued_repositories} repositories to summarize in {queue.path}")
+        return queued_repositories
+
+    # pylint: disable=protected-access
+    def work(self, queue: gitme.sharding.WorkQueue, worker: str, lease_seconds: float) -> int:
+        """
+        This function summarizes the repositories claimed from the work queue (worker), until the queue is finished
+        (repositories leased by the other workers are claimed once their leases expire), and returns the number of the summarized repositories.
+        Leases are renewed while the repositories are summarized, so that long (e.g. rate limited) queries do not lose them.
+        Usage limits of the provider are shared by all of the workers using the same queue.
+        """
+        import gitme.ratelimit  # pylint: disable=import-outside-toplevel
+
+        self.connect()
+        if limits := self.llm_provisioner.get_rate_limits(self.__parsed_configuration._llm.connection):
+            self.llm_provisioner.set_rate_limiter(
+                gitme.ratelimit.SharedRateLimiter(path=f"{queue.path}.ratelimit", limits=limits)
+            )
+        summarized_repositories = 0
+        while repository_name := queue.wait_for_claim(worker, lease_seconds=lease_seconds):
+            try:
+                with queue.keep_leased(repository_name, worker, lease_seconds=lease_seconds):
+                    repo = self.github_hooks.get_repository_metadata(repository_name)
+                    row = self.to_row(repo, self.summarize_repository(repo))
+                repo.release_readme()
+            except Exception as processing_error:  # pylint: disable=broad-exception-caught
+                self.github_hooks.log(f"Worker {worker} failed to summarize {repository_name}: {processing_error}")
+                queue.fail(repository_name, worker, str(processing_error))
+                continue
+            if queue.complete(repository_name, worker, row):
+                summarized_repositories += 1
+            else:
+                self.github_hooks.log(f"Lease of {repository_name} expired, before it was summarized by {worker}")
+        self.github_hooks.log(f"Worker {worker} summarized {summarized_repositories} repositories, no more left in the queue")
+        return summarized_repositories
+
+    def merge(self, queue: gitme.sharding.WorkQueue) -> pandas.DataFrame:
+        """
+        This function collects the rows summarized by the workers into the DataFrame, once all of the queued repositories are done.
+        """
+        import pandas  # pylint: disable=import-outside-toplevel
+
+        if not queue.is_finished():
+            raise ValueError(f"Not all of the repositories are summarized yet: {queue.counts()}")
+        for repository_name, error in queue.errors().items():
+            self.github_hooks.log(f"Skipping {repository_name}, which failed to be summarized: {error}")
+        return pandas.DataFrame.from_records(
+            data=queue.rows()
+        )
+
+    # pylint: disable=protected-access
+    def connect_github(self) -> None:
+        """
+        This function connects to GitHub and prepares the representation of the READMEs in the output rows.
+        """
+        import gitme.gh  # pylint: disable=import-outside-toplevel
+        import gitme.output  # pylint: disable=import-outside-toplevel
+
         self.github_hooks = gitme.gh.GithubProfile.connect(
             username=self.__parsed_configuration._github.username,
             token=self.__parsed_configuration._github.token
+        ).with_readme_limits(gitme.gh.ReadmeLimits(
+            max_bytes=self.__parsed_configuration._readme.max_bytes,
+            spill_bytes=self.__parsed_configuration._readme.spill_bytes,
+        ))
+        self.readme_column = gitme.output.ReadmeColumn(
+            mode=self.__parsed_configuration._readme.column,
+            max_chars=self.__parsed_configuration._readme.max_chars,
         )
+
+    # pylint: disable=protected-access
+    def connect(self) -> None:
+        """
+        This function connects to GitHub and initializes the LLM provider.
+        Both clients are kept by the runner, so that they can be reused (e.g. by the service mode).
+        """
+        self.connect_github()
         self.llm_provisioner = gitme.llm.setup.get_provider(
             self.__parsed_configuration._llm
         )
         self.llm_provisioner.set_logger(self.github_hooks.logger)
-        return pandas.DataFrame.from_records(
-            data=self.summarize_repositories(
-                repositories=self.get_repositories_to_analyze()
-            )
-        )
 
     def dump(self, df: pandas.DataFrame) -> None:
         """
-        This function writes the DataFrame to a CSV file.
+        This function writes the DataFrame to a CSV file (or a SQLite database, if the output has a .db, .sqlite or .sqlite3 extension).
+        If configured, the summaries are embedded into the index next to the output and rolled up into the profile overview.
+        """
+        store = self.open_output_store()
+        store.write(df)
+        summaries = dict(zip(df['name'], df['summary'])) if not df.empty else {}  # DataFrame of an empty run has no columns
+        self.index_summaries(summaries)
+        self.rollup(store.read().to_dict(orient='records'))  # Stored rows, as in the webhook refresh, so that the cached nodes match
+
+    # pylint: disable=protected-access
+    def rollup(self, rows: list[dict[str, typing.Any]]) -> dict[str, typing.Any] | None:
+        """
+        This function summarizes the summaries of the repositories per group and then into the overview of the whole profile (if configured),
+        which is stored next to the output. Only the groups with changed summaries (and the overview) are summarized again.
+        """
+        if not (rollup_configuration := self.__parsed_configuration._rollup):
+            return None
+        import gitme.rollup  # pylint: disable=import-outside-toplevel
+
+        profile_rollup = gitme.rollup.ProfileRollup(
+            path=f"{self.__parsed_configuration.output}{gitme.rollup.ROLLUP_SUFFIX}",
+            summarize=lambda prompt: self.llm_provisioner.query(prompt).result,
+            max_children=rollup_configuration.max_children,
+        )
+        rollup = profile_rollup.build(rows, username=self.github_hooks.username, group_by=rollup_configuration.group_by)
+        self.github_hooks.log(
+            f"Rolled up {len(rollup['groups'])} groups into the profile overview "
+            f"({profile_rollup.computed_nodes} summarized, {profile_rollup.reused_nodes} cached)"
+        )
+        return rollup
+
+    # pylint: disable=protected-access
+    def index_summaries(self, summaries: dict[str, str], prune: bool = True) -> None:
+        """
+        This function embeds the new and changed summaries into the index next to the output (if configured).
+        Repositories without the summaries are removed from the index, unless prune is disabled (e.g. for the refresh of a single repository).
         """
-        df.to_csv(
-            self.__parsed_configuration.output,
-            index=False
+        if not (embeddings_configuration := self.__parsed_configuration._embeddings):
+            return
+        import gitme.embeddings  # pylint: disable=import-outside-toplevel
+
+        embedded_summaries = gitme.embeddings.EmbeddingIndex(self.__parsed_configuration.output).update(
+            summaries,
+            embedder=gitme.embeddings.create_embedder(
+                embeddings_configuration.embedder,
+                dimensions=embeddings_configuration.dimensions,
+                batch_size=embeddings_configuration.batch_size,
+                provider=lambda: (self.__parsed_configuration._llm.name, self.llm_provisioner),
+            ),
+            prune=prune,
         )
+        self.github_hooks.log(f"Embedded {embedded_summaries} new or changed summaries")
+
+    def open_output_store(self) -> gitme.output.OutputStore:
+        import gitme.output  # pylint: disable=import-outside-toplevel
+
+        return gitme.output.open_store(self.__parsed_configuration.output)
 
     # pylint: disable=protected-access
-    def get_repositories_to_analyze(self) -> list[gitme.gh.RepositoryMetadata]:
-        """
-        This function fetches the repositories to analyze from the GitHub profile.
-        """
-        if not self.__parsed_configuration._only_repos:
-            all_repositories = ([
-                *self.github_hooks.pinned_repositories,
-            ] + [
-                gitme.gh.RepositoryMetadata.from_repo(
-                    self.github_hooks.get_repo(repo_name)
-                )
-                for repo_name in self.config
-                if repo_name
-            ]) if self.__parsed_configuration._add_repos else [
-                *self.github_hooks.pinned_repositories
-            ]
-        else:
+    @property
+    def webhooks_configuration(self) -> gitme.config.WebhooksConfig | None:
+        return self.__parsed_configuration._webhooks
+
+    # pylint: disable=protected-access
+    def get_repositories_to_analyze(self) -> typing.Generator[gitme.gh.RepositoryMetadata, None, None]:
+        """
+        This function streams the repositories to analyze from the GitHub profile - discovered ones are fetched page by page,
+        as the stream is consumed (callers, which need all of them at once, e.g. to plan the queries, collect them on their own).
+        """
+        if self.__parsed_configuration._only_repos:
             self.github_hooks.log(f"Specified repositories to analyze: {', '.join(self.__parsed_configuration._only_repos)}")
-            all_repositories = [
-                gitme.gh.RepositoryMetadata.from_repo(
-                    self.github_hooks.get_repo(repo_name)
-                )
+            repositories: typing.Iterable[gitme.gh.RepositoryMetadata] = (
+                self.github_hooks.get_repository_metadata(repo_name)
                 for repo_name in self.__parsed_configuration._only_repos
-            ]
+            )
+        else:
+            repositories = itertools.chain(
+                self.github_hooks.discover_repositories(self.__parsed_configuration._discovery)
+                if self.__parsed_configuration._discovery else self.github_hooks.pinned_repositories,
+                (
+                    self.github_hooks.get_repository_metadata(repo_name)
+                    for repo_name in self.__parsed_configuration._add_repos
+                    if repo_name
+                ),
+            )
+        for repo in repositories:
+            self.github_hooks.log(f"Repository to analyze: {repo.name}")
+            yield repo
 
-        self.github_hooks.log(f"Repositories to analyze: {', '.join([
-            repo.name
-            for repo in all_repositories
-        ])}")
-        return all_repositories
+    # pylint: disable=protected-access
+    def attach_context(self, repositories: list[gitme.gh.RepositoryMetadata]) -> None:
+        """
+        This function extracts the additional context files of the repositories (if configured) from their archives.
+        Repositories, which archives cannot be fetched (e.g. empty ones, or on timeouts and broken connections) or read,
+        are summarized without the context.
+        """
+        if not (context_configuration := self.__parsed_configuration._context):
+            return
+        import tarfile  # pylint: disable=import-outside-toplevel
+        import github  # pylint: disable=import-outside-toplevel
+        import requests  # pylint: disable=import-outside-toplevel
+        import gitme.context  # pylint: disable=import-outside-toplevel
+
+        extractor = gitme.context.ContextExtractor(
+            rest=self.github_hooks.rest,
+            max_file_bytes=context_configuration.max_file_bytes,
+            max_total_bytes=context_configuration.max_total_bytes,
+        )
+        if context_configuration.patterns is not None:
+            extractor.patterns = context_configuration.patterns
+        for repo in repositories:
+            if repo.context is not None:
+                continue
+            try:
+                repo.context = extractor.extract(repo.name)
+            except (github.GithubException, requests.exceptions.RequestException, tarfile.TarError) as extraction_error:
+                self.github_hooks.log(f"Failed to extract context of {repo.name}, skipping it: {extraction_error}")
+                repo.context = {}
+                continue
+            self.github_hooks.log(f"Extracted context of {repo.name}: {', '.join(repo.context) or 'no matching files'}")
 
     def summarize_repositories(
         self,
@@ -93,22 +302,100 @@ class GitMeRunner:
 
         The LLM model will generate a summary based on the prompt and return it to us.
 
+        If deduplication is configured, only one representative of each cluster of near-duplicate READMEs
+        is summarized and its summary is reused for the rest of the cluster.
+
         We then log the query and the result to the console.
+
+        READMEs are released as soon as the rows are built, so that they are not kept next to the output.
         """
-        summarized_data = []
-        for repo in repositories:
-            self.github_hooks.log(f"Processing {repo.name}")
-            prompt = gitme.llm.prompts.generate_prompt(
-                description=repo.description,
-                technologies=repo.technologies,
-                readme=repo.readme or "No README available. Use the repository description."
-            )
-            summary = self.llm_provisioner.query(prompt)
-            summarized_data.append({
-                'name': repo.name,
-                'description': repo.description,
-                'technologies': ', '.join(repo.technologies),
-                'readme': repo.readme,
-                'summary': summary.result
-            })
+        representatives = self.find_representatives(repositories)
+        distinct_repositories = [
+            index
+            for index, representative_index in enumerate(representatives)
+            if representative_index == index
+        ]
+        query_plan = self.plan_queries([repositories[index] for index in distinct_repositories])
+        self.github_hooks.log(f"Ordered {query_plan.queries} queries by the plan of {len(query_plan.windows)} rate windows")
+
+        summaries: dict[int, str] = {}
+        for planned_index in query_plan.order:
+            repository_index = distinct_repositories[planned_index]
+            summaries[repository_index] = self.summarize_repository(repositories[repository_index])
+
+        summarized_data: list[dict[str, str]] = []
+        for index, repo in enumerate(repositories):
+            if (representative_index := representatives[index]) != index:
+                self.github_hooks.log(f"Reusing summary of {repositories[representative_index].name} for near-duplicate {repo.name}")
+            summarized_data.append(self.to_row(repo, summaries[representative_index]))
+            repo.release_readme()
         return summarized_data
+
+    # pylint: disable=protected-access
+    def plan_queries(self, repositories: list[gitme.gh.RepositoryMetadata], with_context: bool = True) -> gitme.scheduler.QueryPlan:
+        """
+        This function packs the queries for the repositories into the rate windows of the configured provider,
+        based on the estimated sizes of their prompts. The context is extracted only for the planned repositories
+        and only with_context - otherwise (dry-run, sharded queue) the prompts are estimated without it.
+        """
+        import gitme.scheduler  # pylint: disable=import-outside-toplevel
+
+        if with_context:
+            self.attach_context(repositories)
+
+        provider_class = gitme.llm.setup.get_provider_class(self.__parsed_configuration._llm.name)
+        return gitme.scheduler.plan_queries(
+            (
+                (repo.name, self.generate_prompt(repo))
+                for repo in repositories
+            ),
+            limits=provider_class.get_rate_limits(self.__parsed_configuration._llm.connection),
+            requests_per_query=provider_class.get_requests_per_query(self.__parsed_configuration._llm.connection),
+        )
+
+    def to_row(self, repo: gitme.gh.RepositoryMetadata, summary: str) -> dict[str, str]:
+        row = {
+            'name': repo.name,
+            'description': repo.description,
+            'technologies': ', '.join(repo.technologies),
+        }
+        if (readme := self.readme_column.encode(repo.readme)) is not None:  # Column can be omitted
+            row['readme'] = readme
+        row['readme_sha'] = repo.readme_sha
+        row['summary'] = summary
+        return row
+
+    def summarize_repository(self, repo: gitme.gh.RepositoryMetadata) -> str:
+        self.github_hooks.log(f"Processing {repo.name}")
+        self.attach_context([repo])
+        return self.llm_provisioner.query(
+            self.generate_prompt(repo)
+        ).result
+
+    @staticmethod
+    def generate_prompt(repo: gitme.gh.RepositoryMetadata) -> str:
+        import gitme.llm.prompts  # pylint: disable=import-outside-toplevel
+
+        return gitme.llm.prompts.generate_prompt(
+            description=repo.description,
+            technologies=repo.technologies,
+            readme=repo.readme or "No README available. Use the repository description.",
+            context=repo.context,
+        )
+
+    # pylint: disable=protected-access
+    def find_representatives(self, repositories: list[gitme.gh.RepositoryMetadata]) -> list[int]:
+        """
+        This function returns the index of the repository, which summary is to be used, for each of the repositories.
+        """
+        if not (deduplication := self.__parsed_configuration._deduplication):
+            return list(range(len(repositories)))
+        import gitme.dedup  # pylint: disable=import-outside-toplevel
+
+        representatives = gitme.dedup.cluster_near_duplicates(
+            [repo.readme for repo in repositories],
+            threshold=deduplication.threshold,
+            permutations=deduplication.permutations,
+        )
+        self.github_hooks.log(f"Found {len(set(representatives))} distinct READMEs among {len(repositories)} repositories")
+        return representatives
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import dataclasses
+import math
+import typing
+
+if typing.TYPE_CHECKING:
+    import gitme.llm.base
+
+# Token-budget-aware scheduling of the LLM queries - estimated sizes of all of the prompts are known upfront,
+# so the queries can be packed into the per minute rate windows of the provider (first fit decreasing),
+# instead of being sent in the list order, in which a single huge prompt stalls all of the small ones queued after it.
+# The plan only orders the queries - they are sent one after another in that order, and paced by the rate limits
+# of the provider itself (its usage counters or the shared rate limiter), not by the planned windows.
+
+RATE_WINDOW_SECONDS = 60
+CHARACTERS_PER_TOKEN = 4  # Rough, provider independent estimate used to plan the queries without calling the provider
+ESTIMATED_RESPONSE_TOKENS = 300  # Responses count against the TPM limit as well
+ESTIMATED_QUERY_SECONDS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARACTERS_PER_TOKEN)
+
+
+@dataclasses.dataclass(frozen=True)
+class ScheduledQuery:
+    index: int
+    name: str
+    tokens: int
+
+
+@dataclasses.dataclass
+class QueryPlan:
+    """
+        Queries packed into consecutive rate windows of the provider.
+
+        windows: list[list[ScheduledQuery]] - Queries to send in each of the rate windows
+        limits: RateLimits | None - Per minute usage limits of the provider (None, if not limited)
+        requests_per_query: int - Number of requests counted against the RPM limit for a single query
+    """
+    windows: list[list[ScheduledQuery]]
+    limits: gitme.llm.base.RateLimits | None
+    requests_per_query: int = 1
+
+    @property
+    def order(self) -> list[int]:
+        return [
+            query.index
+            for window in self.windows
+            for query in window
+        ]
+
+    @property
+    def queries(self) -> int:
+        return sum(len(window) for window in self.windows)
+
+    @property
+    def requests(self) -> int:
+        return self.queries * self.requests_per_query
+
+    @property
+    def tokens(self) -> int:
+        return sum(query.tokens for window in self.windows for query in window)
+
+    @property
+    def oversized(self) -> list[ScheduledQuery]:
+        """
+            Queries exceeding the TPM limit on their own, which will be most likely rejected by the provider.
+        """
+        if not self.limits:
+            return []
+        return [
+            query
+            for window in self.windows
+            for query in window
+            if query.tokens > self.limits['TPM']
+        ]
+
+    @property
+    def estimated_duration(self) -> float:
+        """
+            Estimated wall-clock duration in seconds - every window but the last one takes the whole minute.
+        """
+        if not self.windows:
+            return 0
+        if not self.limits:
+            return self.queries * ESTIMATED_QUERY_SECONDS
+        return (len(self.windows) - 1) * RATE_WINDOW_SECONDS + min(
+            len(self.windows[-1]) * ESTIMATED_QUERY_SECONDS,
+            RATE_WINDOW_SECONDS,
+        )
+
+    def describe(self) -> str:
+        limits_description = f"{self.limits['RPM']} RPM, {self.limits['TPM']} TPM" if self.limits else "no limits"
+        lines = [
+            f"Provider limits: {limits_description}",
+            f"Queries: {self.queries} ({self.requests} requests)",
+            f"Estimated tokens: {self.tokens} (including {ESTIMATED_RESPONSE_TOKENS} response tokens per query)",
+            f"Rate windows: {len(self.windows)}",
+            f"Estimated duration: {self.estimated_duration / 60:.1f} min",
+            "Queries are sent in the order of the windows, paced by the rate limits of the provider",
+        ]
+        for window_index, window in enumerate(self.windows):
+            lines.append(
+                f"  Window {window_index + 1}: {len(window)} queries, {sum(query.tokens for query in window)} tokens"
+                f" - {', '.join(query.name for query in window)}"
+            )
+        if oversized_queries := self.oversized:
+            lines.append(f"WARNING: Prompts exceeding the TPM limit: {', '.join(query.name for query in oversized_queries)}")
+        return '\n'.join(lines)
+
+
+def plan_queries(
+    prompts: typing.Iterable[tuple[str, str]],
+    limits: gitme.llm.base.RateLimits | None,
+    requests_per_query: int = 1,
+) -> QueryPlan:
+    """
+        Packs the (name, prompt) pairs (only sizes of the prompts are kept) into rate windows, so that each window uses as much of both RPM and TPM limits as possible.
+
+        Queries are placed from the largest one into the first window, which has enough of both budgets left.
+        Within each window queries are kept in their original order.
+    """
+    queries = [
+        ScheduledQuery(index=index, name=name, tokens=estimate_tokens(prompt) + ESTIMATED_RESPONSE_TOKENS)
+        for index, (name, prompt) in enumerate(prompts)
+    ]
+    if not limits:
+        return QueryPlan(windows=[queries] if queries else [], limits=limits, requests_per_query=requests_per_query)
+
+    queries_per_window = max(limits['RPM'] // requests_per_query, 1)
+    windows: list[list[ScheduledQuery]] = []
+    windows_tokens: list[int] = []
+    open_windows: list[int] = []  # Windows that still have some of the RPM budget left
+    for query in sorted(queries, key=lambda query: query.tokens, reverse=True):
+        for window_index in open_windows:
+            if windows_tokens[window_index] + query.tokens <= limits['TPM']:
+                break
+        else:
+            window_index = len(windows)
+            windows.append([])
+            windows_tokens.append(0)
+            open_windows.append(window_index)
+        windows[window_index].append(query)
+        windows_tokens[window_index] += query.tokens
+        if len(windows[window_index]) >= queries_per_window:
+            open_windows.remove(window_index)
+    return QueryPlan(
+        windows=[sorted(window, key=lambda query: query.index) for window in windows],
+        limits=limits,
+        requests_per_query=requests_per_query,
+    )
@@ -0,0 +1,305 @@
+from __future__ import annotations
+import collections
+import dataclasses
+import http
+import http.server
+import json
+import logging
+import threading
+import typing
+import uuid
+
+if typing.TYPE_CHECKING:
+    import gitme.gh
+    import gitme.runner
+
+# Resident service mode - a local HTTP API accepting summarization jobs, which keeps the GitHub and LLM clients,
+# the prompt example and the rate limiter state warm across jobs (all of them live in a single, connected runner).
+#
+# Endpoints:
+#     POST /jobs                - submit a job: {"username": "...", "repositories": ["repo1", ...]} (pinned ones if omitted)
+#     GET  /jobs                - list of submitted jobs
+#     GET  /jobs/<id>           - status and results of a job
+#     GET  /jobs/<id>/results   - stream of results (JSON lines), sent as soon as each repository is summarized
+#     GET  /stats               - usage statistics of the LLM provider (e.g. of each of the routed providers)
+
+# Work items are names of the repositories, metadata of already fetched ones (e.g. pinned) or None,
+# which means that the pinned repositories of the user still need to be resolved
+WorkItemRepository: typing.TypeAlias = "str | gitme.gh.RepositoryMetadata | None"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+MAX_FINISHED_JOBS = 1000  # Number of the latest finished jobs kept for GET /jobs, older ones are forgotten
+
+
+@dataclasses.dataclass
+class SummarizationJob:
+    """
+        Summarization job submitted to the service.
+
+        username: str - GitHub username owning the repositories
+        repositories: list[str] - Names of the repositories to summarize (empty for the pinned repositories)
+    """
+    username: str
+    repositories: list[str]
+    id: str = dataclasses.field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = dataclasses.field(default=JOB_QUEUED)
+    results: list[dict[str, str]] = dataclasses.field(default_factory=list)
+    errors: list[str] = dataclasses.field(default_factory=list)
+    pending: int = dataclasses.field(default=0)
+
+    _updated: threading.Condition = dataclasses.field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def describe(self, with_results: bool = False) -> dict[str, typing.Any]:
+        with self._updated:
+            description: dict[str, typing.Any] = {
+                "id": self.id,
+                "username": self.username,
+                "repositories": self.repositories,
+                "status": self.status,
+                "completed": len(self.results),
+                "pending": self.pending,
+                "errors": self.errors,
+            }
+            if with_results:
+                description["results"] = list(self.results)
+            return description
+
+    def stream_results(self) -> typing.Generator[dict[str, str], None, None]:
+        """
+            Yields the results of the job as they are completed, until the job is finished.
+        """
+        sent_results = 0
+        while True:
+            with self._updated:
+                self._updated.wait_for(lambda: len(self.results) > sent_results or self.finished)
+                new_results = self.results[sent_results:]
+                finished = self.finished
+            yield from new_results
+            sent_results += len(new_results)
+            if finished and sent_results == len(self.results):
+                return
+
+    def _notify(self, update: typing.Callable[[], None]) -> None:
+        with self._updated:
+            update()
+            self._updated.notify_all()
+
+
+@dataclasses.dataclass
+class FairJobScheduler:
+    """
+        Queue of work items (single repositories) of the submitted jobs.
+
+        Work items are scheduled in a round-robin manner between users, so that a large job
+        does not starve the jobs of other users submitted after it.
+    """
+    _queues: collections.OrderedDict[str, collections.deque[tuple[SummarizationJob, WorkItemRepository]]] = dataclasses.field(
+        default_factory=collections.OrderedDict,
+    )
+    _available: threading.Condition = dataclasses.field(default_factory=threading.Condition)
+
+    def submit(self, job: SummarizationJob) -> None:
+        with self._available:
+            user_queue = self._queues.setdefault(job.username, collections.deque())
+            if job.repositories:
+                user_queue.extend((job, repository) for repository in job.repositories)
+                job.pending = len(job.repositories)
+            else:
+                user_queue.append((job, None))  # Pinned repositories are resolved when the job is scheduled
+                job.pending = 1
+            self._available.notify()
+
+    def extend(self, job: SummarizationJob, repositories: typing.Sequence[WorkItemRepository]) -> None:
+        with self._available:
+            self._queues.setdefault(job.username, collections.deque()).extend(
+                (job, repository) for repository in repositories
+            )
+            self._available.notify()
+
+    def next(self, timeout: float | None = None) -> tuple[SummarizationJob, WorkItemRepository] | None:
+        with self._available:
+            if not self._available.wait_for(lambda: bool(self._queues), timeout=timeout):
+                return None
+            username, user_queue = self._queues.popitem(last=False)
+            work_item = user_queue.popleft()
+            if user_queue:
+                self._queues[username] = user_queue  # Goes to the end of the rotation
+            return work_item
+
+
+@dataclasses.dataclass
+class GitMeService:
+    """
+        Service processing the submitted jobs with a single, warm runner.
+
+        Work items are processed one by one by a worker thread, because the LLM provider
+        limits are shared by all of the jobs anyway. Jobs are submitted and listed by the request handler
+        threads, so they are accessed under the lock (only the max_finished_jobs latest finished ones are kept).
+    """
+    runner: gitme.runner.GitMeRunner
+    scheduler: FairJobScheduler = dataclasses.field(default_factory=FairJobScheduler)
+    jobs: dict[str, SummarizationJob] = dataclasses.field(default_factory=dict)
+    max_finished_jobs: int = MAX_FINISHED_JOBS
+
+    _jobs_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock, repr=False)
+
+    _worker: threading.Thread | None = dataclasses.field(init=False, default=None)
+    _stopped: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+
+    def start(self) -> None:
+        self.runner.connect()
+        self._worker = threading.Thread(target=self._work, name="gitme-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._worker:
+            self._worker.join()
+
+    def submit(self, username: str, repositories: list[str]) -> SummarizationJob:
+        job = SummarizationJob(username=username, repositories=repositories)
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+            finished_jobs = [job_id for job_id, submitted_job in self.jobs.items() if submitted_job.finished]
+            for finished_job_id in finished_jobs[:max(len(finished_jobs) - self.max_finished_jobs, 0)]:  # Oldest ones first
+                del self.jobs[finished_job_id]
+        self.scheduler.submit(job)
+        self.runner.github_hooks.log(f"Queued job {job.id} for {username}")
+        return job
+
+    def get_job(self, job_id: str) -> SummarizationJob | None:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list[SummarizationJob]:
+        with self._jobs_lock:
+            return list(self.jobs.values())
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            if work_item := self.scheduler.next(timeout=1):
+                self.process(*work_item)
+
+    def process(self, job: SummarizationJob, repository: WorkItemRepository) -> None:
+        job._notify(lambda: setattr(job, "status", JOB_RUNNING))  # pylint: disable=protected-access
+        profile = self.runner.github_hooks.for_user(job.username)
+        try:
+            if repository is None:
+                pinned_repositories = [*profile.pinned_repositories]
+                job._notify(lambda: self._expand(job, pinned_repositories))  # pylint: disable=protected-access
+                return
+            repo = profile.get_repository_metadata(repository) if isinstance(repository, str) else repository
+            row = self.runner.to_row(repo, self.runner.summarize_repository(repo))
+            job._notify(lambda: self._complete(job, row=row))  # pylint: disable=protected-access
+        except Exception as processing_error:  # pylint: disable=broad-exception-caught
+            error = f"{getattr(repository, 'name', repository)}: {processing_error}"
+            profile.log(f"Job {job.id} failed for {error}", level=logging.ERROR)
+            job._notify(lambda: self._complete(job, error=error))  # pylint: disable=protected-access
+
+    def _expand(self, job: SummarizationJob, repositories: list[gitme.gh.RepositoryMetadata]) -> None:
+        job.repositories = [repo.name for repo in repositories]
+        job.pending += len(repositories) - 1
+        self.scheduler.extend(job, repositories)
+        if not job.pending:
+            job.status = JOB_DONE
+
+    @staticmethod
+    def _complete(job: SummarizationJob, row: dict[str, str] | None = None, error: str | None = None) -> None:
+        job.pending -= 1
+        if row is not None:
+            job.results.append(row)
+        if error is not None:
+            job.errors.append(error)
+        if not job.pending:
+            job.status = JOB_FAILED if job.errors and not job.results else JOB_DONE
+
+
+class ServiceRequestHandler(http.server.BaseHTTPRequestHandler):
+    service: GitMeService
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        path_parts = self.path.strip("/").split("/")
+        if path_parts == ["jobs"]:
+            self._send_json([job.describe() for job in self.service.list_jobs()])
+            return
+        if path_parts == ["stats"]:
+            self._send_json(self.service.runner.llm_provisioner.stats())
+            return
+        if len(path_parts) not in (2, 3) or path_parts[0] != "jobs" or not (job := self.service.get_job(path_parts[1])):
+            self._send_json({"error": "Not found"}, status=http.HTTPStatus.NOT_FOUND)
+            return
+        if len(path_parts) == 2:
+            self._send_json(job.describe(with_results=True))
+        elif path_parts[2] == "results":
+            self._stream_json_lines(job.stream_results())
+        else:
+            self._send_json({"error": "Not found"}, status=http.HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json({"error": "Not found"}, status=http.HTTPStatus.NOT_FOUND)
+            return
+        try:
+            job_request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(job_request, dict):
+                raise TypeError("Job must be a JSON object")
+            username = job_request.get("username") or self.service.runner.github_hooks.username
+            if not isinstance(requested_repositories := job_request.get("repositories", []), list):
+                raise TypeError("Repositories must be a list of names")
+            repositories = [repository for repository in requested_repositories if repository]
+            if not isinstance(username, str) or not all(isinstance(repository, str) for repository in repositories):
+                raise ValueError("Username and repositories must be strings")
+        except (ValueError, TypeError) as invalid_request_error:
+            self._send_json({"error": f"Invalid job: {invalid_request_error}"}, status=http.HTTPStatus.BAD_REQUEST)
+            return
+        job = self.service.submit(username, repositories)
+        self._send_json(job.describe(), status=http.HTTPStatus.ACCEPTED)
+
+    def _send_json(self, data: typing.Any, status: http.HTTPStatus = http.HTTPStatus.OK) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_json_lines(self, rows: typing.Iterable[typing.Any]) -> None:
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for row in rows:
+            line = json.dumps(row).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # pylint: disable=redefined-builtin
+        self.service.runner.github_hooks.log(f"{self.address_string()} - {format % args}", level=logging.DEBUG)
+
+
+def create_server(service: GitMeService, host: str, port: int) -> http.server.ThreadingHTTPServer:
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    return http.server.ThreadingHTTPServer((host, port), handler)
+
+
+def serve(runner: gitme.runner.GitMeRunner, host: str = "127.0.0.1", port: int = 8000) -> None:
+    service = GitMeService(runner)
+    service.start()
+    server = create_server(service, host, port)
+    service.runner.github_hooks.log(f"Serving GitMe jobs on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
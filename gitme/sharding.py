@@ -0,0 +1,223 @@
+from __future__ import annotations
+import contextlib
+import dataclasses
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import typing
+
+# Sharded execution - the coordinator enumerates the repositories into a durable work queue (SQLite database),
+# from which any number of workers (processes or hosts sharing the file system) claim the repositories with leases.
+# Leases of crashed workers expire, so their repositories are claimed again by the other workers,
+# while the leases of the live workers are renewed for as long as their repositories are being summarized.
+# Rows summarized by the workers are kept in the queue and merged into the final output once all of the repositories are done.
+
+ITEM_PENDING = 'pending'
+ITEM_LEASED = 'leased'
+ITEM_DONE = 'done'
+ITEM_FAILED = 'failed'
+ITEM_DUPLICATE = 'duplicate'  # Near-duplicate, which reuses the summary of its representative
+
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_SECONDS = 10  # Interval of checking for the expired leases, once all of the remaining items are leased
+LEASE_RENEWALS = 3  # Number of the renewals per lease duration, so that a lease does not expire between them
+QUEUE_SUFFIX = '.queue.db'
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+@dataclasses.dataclass
+class WorkQueue:
+    """
+        Work queue of the repositories to summarize stored in a SQLite database.
+
+        Items are claimed in the order of their priority (e.g. the order of the query plan),
+        and every claim and update is a single transaction, so that workers never claim the same item at once.
+
+        path: str - Path of the SQLite database
+        max_attempts: int - Number of claims, after which a repository failing to be summarized is marked as failed
+        clock: Callable[[], float] - Source of the current time (used to expire the leases)
+        sleep: Callable[[float], None] - Used to wait for the leases of the other workers
+    """
+    path: str
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    clock: typing.Callable[[], float] = dataclasses.field(default=time.time, repr=False)
+    sleep: typing.Callable[[float], None] = dataclasses.field(default=time.sleep, repr=False)
+
+    @contextlib.contextmanager
+    def _connect(self) -> typing.Generator[sqlite3.Connection, None, None]:
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute('BEGIN IMMEDIATE')  # Takes the write lock upfront, so that concurrent claims are serialized
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS items ('
+                'name TEXT PRIMARY KEY, priority INTEGER, status TEXT, representative TEXT, '
+                'worker TEXT, lease_expires REAL, attempts INTEGER DEFAULT 0, row TEXT, error TEXT)'
+            )
+            yield connection
+            connection.execute('COMMIT')
+        except BaseException:
+            if connection.in_transaction:  # Failed BEGIN (e.g. a locked database) has nothing to roll back
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+    def enqueue(self, names: typing.Iterable[str]) -> int:
+        """
+            Adds the repositories to summarize (in the order of their priority) and returns the number of the new ones.
+            Repositories that are already in the queue are left as they are, so the coordinator can be safely run again.
+        """
+        with self._connect() as connection:
+            first_priority = connection.execute('SELECT COALESCE(MAX(priority) + 1, 0) FROM items').fetchone()[0]
+            return sum(
+                connection.execute(
+                    'INSERT OR IGNORE INTO items (name, priority, status) VALUES (?, ?, ?)',
+                    (name, first_priority + index, ITEM_PENDING),
+                ).rowcount
+                for index, name in enumerate(names)
+            )
+
+    def enqueue_duplicate(self, row: dict[str, typing.Any], representative: str) -> None:
+        """
+            Adds the near-duplicate repository, which row is completed with the summary of its representative while merging.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO items (name, priority, status, representative, row) '
+                'VALUES (?, (SELECT COALESCE(MAX(priority) + 1, 0) FROM items), ?, ?, ?)',
+                (row['name'], ITEM_DUPLICATE, representative, json.dumps(row)),
+            )
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> str | None:
+        """
+            Leases the next pending repository (or one with an expired lease) to the worker and returns its name.
+        """
+        with self._connect() as connection:
+            now = self.clock()
+            claimed_item = connection.execute(
+                'SELECT name FROM items WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY priority LIMIT 1',
+                (ITEM_PENDING, ITEM_LEASED, now),
+            ).fetchone()
+            if not claimed_item:
+                return None
+            connection.execute(
+                'UPDATE items SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE name = ?',
+                (ITEM_LEASED, worker, now + lease_seconds, claimed_item['name']),
+            )
+            return claimed_item['name']
+
+    def wait_for_claim(
+        self,
+        worker: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+    ) -> str | None:
+        """
+            Claims the next repository like claim, but while the remaining repositories are leased by the other workers,
+            keeps polling for their leases to expire (or failed ones to be returned). Returns None once the queue is finished.
+        """
+        while (name := self.claim(worker, lease_seconds=lease_seconds)) is None:
+            if self.is_finished():
+                return None
+            self.sleep(poll_seconds)
+        return name
+
+    def renew(self, name: str, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """
+            Extends the lease of the worker - returns False, if it was already lost to another worker.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE items SET lease_expires = ? WHERE name = ? AND status = ? AND worker = ?',
+                (self.clock() + lease_seconds, name, ITEM_LEASED, worker),
+            ).rowcount == 1
+
+    @contextlib.contextmanager
+    def keep_leased(self, name: str, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> typing.Generator[None, None, None]:
+        """
+            Renews the lease in a background thread, while the repository is being summarized (e.g. waiting for the rate limits).
+        """
+        stopped = threading.Event()
+
+        def renew_lease() -> None:
+            while not stopped.wait(lease_seconds / LEASE_RENEWALS):
+                if not self.renew(name, worker, lease_seconds=lease_seconds):
+                    return
+
+        renewer = threading.Thread(target=renew_lease, name=f"gitme-lease-{name}", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            renewer.join()
+
+    def complete(self, name: str, worker: str, row: dict[str, typing.Any]) -> bool:
+        """
+            Stores the row summarized by the worker - ignored (returns False), if the lease was lost to another worker in the meantime.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE items SET status = ?, row = ?, error = NULL WHERE name = ? AND status = ? AND worker = ?',
+                (ITEM_DONE, json.dumps(row), name, ITEM_LEASED, worker),
+            ).rowcount == 1
+
+    def fail(self, name: str, worker: str, error: str) -> None:
+        """
+            Returns the repository to the queue, or marks it as failed after max_attempts claims.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE items SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_expires = NULL '
+                'WHERE name = ? AND status = ? AND worker = ?',
+                (self.max_attempts, ITEM_FAILED, ITEM_PENDING, error, name, ITEM_LEASED, worker),
+            )
+
+    def counts(self) -> dict[str, int]:
+        with self._connect() as connection:
+            return {
+                status: count
+                for status, count in connection.execute('SELECT status, COUNT(*) FROM items GROUP BY status')
+            }
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return not counts.get(ITEM_PENDING) and not counts.get(ITEM_LEASED)
+
+    def rows(self) -> list[dict[str, typing.Any]]:
+        """
+            Returns the summarized rows (in the order of the priority), in which near-duplicates get the summaries of their representatives.
+            Failed repositories are left out.
+        """
+        with self._connect() as connection:
+            items = connection.execute(
+                'SELECT name, status, representative, row FROM items WHERE status IN (?, ?) ORDER BY priority',
+                (ITEM_DONE, ITEM_DUPLICATE),
+            ).fetchall()
+        summaries = {
+            item['name']: json.loads(item['row'])['summary']
+            for item in items
+            if item['status'] == ITEM_DONE
+        }
+        return [
+            json.loads(item['row']) | (
+                {'summary': summaries[item['representative']]} if item['status'] == ITEM_DUPLICATE else {}
+            )
+            for item in items
+            if item['status'] == ITEM_DONE or item['representative'] in summaries
+        ]
+
+    def errors(self) -> dict[str, str]:
+        with self._connect() as connection:
+            return {
+                item['name']: item['error']
+                for item in connection.execute('SELECT name, error FROM items WHERE status = ?', (ITEM_FAILED,))
+            }
@@ -0,0 +1,261 @@
+from __future__ import annotations
+import collections
+import dataclasses
+import hashlib
+import hmac
+import http
+import http.server
+import json
+import logging
+import re
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import gitme.gh
+    import gitme.output
+    import gitme.runner
+
+# Webhook-driven incremental refresh - GitHub push and repository events are verified and filtered down
+# to the ones changing the README or the description of a repository, then bursts of events are coalesced per repository
+# and only the affected rows of the stored output are refreshed.
+#
+# The receiver accepts events on POST /webhook (see: https://docs.github.com/en/webhooks/webhook-events-and-payloads)
+
+SIGNATURE_HEADER = 'X-Hub-Signature-256'
+EVENT_HEADER = 'X-GitHub-Event'
+DELIVERY_HEADER = 'X-GitHub-Delivery'
+
+# GitHub displays the README from the root, .github or docs directory of the repository
+README_PATH_PATTERN = re.compile(r'^(\.github/|docs/)?readme(\.[a-z0-9]+)?$', flags=re.IGNORECASE)
+
+REMEMBERED_DELIVERIES = 1024
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def get_changed_repository(event: str, payload: dict[str, typing.Any]) -> str | None:
+    """
+        Returns the full name of the repository, if the event changes its README or description, otherwise None.
+
+        Pushes are taken into account only if they are made to the default branch.
+    """
+    repository = payload.get('repository') or {}
+    if event == 'push':
+        if payload.get('ref') != f"refs/heads/{repository.get('default_branch')}":
+            return None
+        changed_paths = {
+            path
+            for commit in payload.get('commits') or []
+            for change in ('added', 'modified', 'removed')
+            for path in commit.get(change) or []
+        }
+        if any(README_PATH_PATTERN.match(path) for path in changed_paths):
+            return repository.get('full_name')
+    elif event == 'repository':
+        if payload.get('action') == 'edited' and 'description' in (payload.get('changes') or {}):
+            return repository.get('full_name')
+    return None
+
+
+@dataclasses.dataclass
+class RefreshCoalescer:
+    """
+        Coalesces bursts of events per repository - a repository is due for a refresh
+        once no new events arrived for it for the quiet period, but not later than max_delay after its first event.
+
+        quiet_period: float - Number of seconds without new events after which the repository is refreshed
+        max_delay: float - Maximal number of seconds between the first event and the refresh
+    """
+    quiet_period: float = 30
+    max_delay: float = 300
+    clock: typing.Callable[[], float] = dataclasses.field(default=time.monotonic, repr=False)
+
+    _pending: dict[str, tuple[float, float]] = dataclasses.field(init=False, default_factory=dict)
+    _changed: threading.Condition = dataclasses.field(init=False, default_factory=threading.Condition)
+
+    def add(self, full_name: str) -> None:
+        with self._changed:
+            now = self.clock()
+            first_event_time, _ = self._pending.get(full_name, (now, now))
+            self._pending[full_name] = (first_event_time, now)
+            self._changed.notify()
+
+    def _deadline(self, full_name: str) -> float:
+        first_event_time, last_event_time = self._pending[full_name]
+        return min(last_event_time + self.quiet_period, first_event_time + self.max_delay)
+
+    def pop_due(self) -> list[str]:
+        with self._changed:
+            now = self.clock()
+            due_repositories = [
+                full_name
+                for full_name in self._pending
+                if self._deadline(full_name) <= now
+            ]
+            for full_name in due_repositories:
+                del self._pending[full_name]
+            return due_repositories
+
+    def wait_for_due(self, timeout: float | None = None) -> list[str]:
+        """
+            Blocks until any of the repositories is due (or the timeout passes) and returns the due repositories.
+        """
+        give_up_time = None if timeout is None else self.clock() + timeout
+        with self._changed:
+            while not (due_repositories := self.pop_due()):
+                now = self.clock()
+                if give_up_time is not None and now >= give_up_time:
+                    return []
+                waiting_times = [
+                    self._deadline(full_name) - now
+                    for full_name in self._pending
+                ] + ([give_up_time - now] if give_up_time is not None else [])
+                self._changed.wait(max(min(waiting_times), 0) if waiting_times else None)
+            return due_repositories
+
+
+@dataclasses.dataclass
+class WebhookRefresher:
+    """
+        Refreshes the stored rows of the repositories - the summary is regenerated only
+        if the README or the description differs from the stored one.
+    """
+    runner: gitme.runner.GitMeRunner
+    store: gitme.output.OutputStore
+
+    def refresh(self, full_name: str) -> bool:
+        repo = self.runner.github_hooks.get_repository_metadata(full_name)
+        stored_row = self.store.get(repo.name)
+        if stored_row and (stored_row['description'] or '') == (repo.description or '') and self.readme_matches(stored_row, repo):
+            self.runner.github_hooks.log(f"README and description of {repo.name} did not change, skipping")
+            return False
+        summary = self.runner.summarize_repository(repo)
+        self.store.upsert(
+            self.runner.to_row(repo, summary)
+        )
+        self.runner.index_summaries({repo.name: summary}, prune=False)
+        self.runner.rollup(self.store.read().to_dict(orient='records'))
+        self.runner.github_hooks.log(f"Refreshed summary of {repo.name}")
+        return True
+
+    def readme_matches(self, stored_row: dict[str, typing.Any], repo: gitme.gh.RepositoryMetadata) -> bool:
+        """
+            Compares the README with the stored one - by the SHA of its blob, if both are known, or by the stored column.
+            README that is not stored whole (omitted or truncated column) and has no stored SHA is considered to be changed.
+        """
+        if stored_row.get('readme_sha') and repo.readme_sha:
+            return stored_row['readme_sha'] == repo.readme_sha
+        return bool(self.runner.readme_column.matches(stored_row.get('readme'), repo.readme))
+
+
+@dataclasses.dataclass
+class WebhookReceiver:
+    """
+        Ingests the webhook events and refreshes the changed repositories in a background worker thread.
+    """
+    secret: str = dataclasses.field(repr=False)
+    refresh: typing.Callable[[str], typing.Any]
+    coalescer: RefreshCoalescer = dataclasses.field(default_factory=RefreshCoalescer)
+    logger: logging.Logger = dataclasses.field(default_factory=lambda: logging.getLogger(__name__))
+
+    _deliveries: collections.deque[str] = dataclasses.field(
+        init=False,
+        default_factory=lambda: collections.deque(maxlen=REMEMBERED_DELIVERIES),
+    )
+    _worker: threading.Thread | None = dataclasses.field(init=False, default=None)
+    _stopped: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+
+    def ingest(self, headers: typing.Mapping[str, str], body: bytes) -> http.HTTPStatus:
+        if not verify_signature(self.secret, body, headers.get(SIGNATURE_HEADER)):
+            return http.HTTPStatus.UNAUTHORIZED
+        if (delivery := headers.get(DELIVERY_HEADER)) and delivery in self._deliveries:
+            return http.HTTPStatus.ACCEPTED  # Redelivery of an already ingested event
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return http.HTTPStatus.BAD_REQUEST
+        if delivery:
+            self._deliveries.append(delivery)
+        if full_name := get_changed_repository(headers.get(EVENT_HEADER, ''), payload):
+            self.logger.info(f"Scheduled refresh of {full_name}")
+            self.coalescer.add(full_name)
+        return http.HTTPStatus.ACCEPTED
+
+    def start(self) -> None:
+        self._worker = threading.Thread(target=self._work, name="gitme-webhooks", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._worker:
+            self._worker.join()
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            for full_name in self.coalescer.wait_for_due(timeout=1):
+                try:
+                    self.refresh(full_name)
+                except Exception as refresh_error:  # pylint: disable=broad-exception-caught
+                    self.logger.error(f"Failed to refresh {full_name}: {refresh_error}")
+
+
+class WebhookRequestHandler(http.server.BaseHTTPRequestHandler):
+    receiver: WebhookReceiver
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path.rstrip('/') != '/webhook':
+            status = http.HTTPStatus.NOT_FOUND
+        else:
+            status = self.receiver.ingest(
+                self.headers,
+                self.rfile.read(int(self.headers.get('Content-Length', 0))),
+            )
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # pylint: disable=redefined-builtin
+        self.receiver.logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def create_server(receiver: WebhookReceiver, host: str, port: int) -> http.server.ThreadingHTTPServer:
+    handler = type('BoundWebhookRequestHandler', (WebhookRequestHandler,), {'receiver': receiver})
+    return http.server.ThreadingHTTPServer((host, port), handler)
+
+
+def serve(runner: gitme.runner.GitMeRunner, host: str = '127.0.0.1', port: int = 8000) -> None:
+    if not (webhooks_config := runner.webhooks_configuration):
+        raise ValueError("Webhooks configuration (with the secret) is required to receive webhooks")
+    runner.connect()
+    receiver = WebhookReceiver(
+        secret=webhooks_config.secret,
+        refresh=WebhookRefresher(
+            runner=runner,
+            store=runner.open_output_store(),
+        ).refresh,
+        coalescer=RefreshCoalescer(
+            quiet_period=webhooks_config.quiet_period,
+            max_delay=webhooks_config.max_delay,
+        ),
+        logger=runner.github_hooks.logger,
+    )
+    receiver.start()
+    server = create_server(receiver, host, port)
+    runner.github_hooks.log(f"Receiving GitHub webhooks on http://{host}:{port}/webhook")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        receiver.stop()
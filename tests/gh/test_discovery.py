@@ -0,0 +1,147 @@
+import datetime
+import logging
+
+import github
+import pytest
+
+import gitme.config
+import gitme.gh
+
+
+class MockResponse:
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    def json(self) -> dict:
+        return self.data
+
+
+def search_page(names: list[str], cursor: str | None) -> dict:
+    return {
+        'data': {
+            'search': {
+                'pageInfo': {
+                    'hasNextPage': cursor is not None,
+                    'endCursor': cursor,
+                },
+                'nodes': [
+                    {
+                        'nameWithOwner': name,
+                        'description': f'{name} description',
+                        'languages': {'nodes': [{'name': 'Python'}]},
+                    }
+                    for name in names
+                ]
+            }
+        }
+    }
+
+
+def test_search_query() -> None:
+    filters = gitme.config.RepositoryFilters(
+        owner='some-org',
+        topics=['kubernetes', 'operators'],
+        languages=['Python', 'Jupyter Notebook'],
+        min_stars=5,
+        pushed_after=datetime.date(2024, 1, 1),
+    )
+    assert gitme.gh.build_search_query('org', filters) == (
+        'org:some-org is:public fork:false archived:false topic:kubernetes topic:operators '
+        'language:"Python" language:"Jupyter Notebook" stars:>=5 pushed:>=2024-01-01'
+    )
+
+
+def test_search_query_with_forks_and_archived() -> None:
+    filters = gitme.config.RepositoryFilters(
+        owner='someone',
+        forks=True,
+        archived=True,
+    )
+    assert gitme.gh.build_search_query('user', filters) == 'user:someone is:public fork:true'
+
+
+def test_lazy_pagination() -> None:
+    pages = {
+        None: search_page(['a/one', 'a/two'], cursor='first'),
+        'first': search_page(['a/three'], cursor=None),
+    }
+    sent_queries: list[dict] = []
+
+    def post(_: str, json: dict) -> MockResponse:
+        sent_queries.append(json)
+        return MockResponse(pages[json['variables']['cursor']])
+
+    adapter = gitme.gh.GithubGraphQLAdapter(_post=post)
+    nodes = adapter.paginate(
+        gitme.gh.DISCOVERY_GRAPHQL_QUERY,
+        variables={'query': 'user:a', 'first': 2},
+        path=['search'],
+    )
+    assert next(nodes)['nameWithOwner'] == 'a/one'
+    assert len(sent_queries) == 1
+    assert [node['nameWithOwner'] for node in nodes] == ['a/two', 'a/three']
+    assert len(sent_queries) == 2
+
+
+def test_pagination_errors() -> None:
+    adapter = gitme.gh.GithubGraphQLAdapter(
+        _post=lambda *_, **__: MockResponse({'errors': [{'message': 'Bad query'}]})
+    )
+    with pytest.raises(github.GithubException):
+        next(adapter.paginate('query', variables={}, path=['search']))
+
+
+CREATED_DATES = {
+    'some-org/first': datetime.date(2015, 3, 1),
+    'some-org/second': datetime.date(2019, 7, 1),
+    'some-org/third': datetime.date(2019, 7, 1),
+    'some-org/fourth': datetime.date(2022, 1, 1),
+    'some-org/fifth': datetime.date(2022, 1, 1),
+    'some-org/sixth': datetime.date(2022, 1, 1),
+}
+
+
+def make_profile(monkeypatch, sent_queries: list[dict]) -> gitme.gh.GithubProfile:
+    def matching_names(search_query: str) -> list[str]:
+        if 'created:' not in search_query:
+            return list(CREATED_DATES)
+        first_date, last_date = map(datetime.date.fromisoformat, search_query.split('created:')[1].split('..'))
+        return [name for name, created_date in CREATED_DATES.items() if first_date <= created_date <= last_date]
+
+    def post(_: str, json: dict) -> MockResponse:
+        sent_queries.append(json)
+        if 'repositoryCount' in json['query']:
+            return MockResponse({'data': {'search': {'repositoryCount': len(matching_names(json['variables']['query']))}}})
+        if 'search(' in json['query']:
+            return MockResponse(search_page(matching_names(json['variables']['query']), cursor=None))
+        if 'repositories(' in json['query']:
+            return MockResponse({'data': {'repositoryOwner': {'repositories': search_page(list(CREATED_DATES), cursor=None)['data']['search']}}})
+        return MockResponse({'data': {'repositoryOwner': {'__typename': 'Organization'}}})
+
+    profile = gitme.gh.GithubProfile('someone')
+    profile._GithubProfile__graphql = gitme.gh.GithubGraphQLAdapter(_post=post)  # type: ignore  # pylint: disable=protected-access
+    monkeypatch.setattr(profile, 'get_repo_readme', lambda _: gitme.gh.FetchedReadme(text='', sha=None))
+    return profile
+
+
+def test_discovery_without_search_filters_is_not_limited(monkeypatch) -> None:
+    sent_queries: list[dict] = []
+    profile = make_profile(monkeypatch, sent_queries)
+    discovered = [repo.name for repo in profile.discover_repositories(gitme.config.RepositoryFilters(owner='some-org', forks=True))]
+    assert discovered == list(CREATED_DATES)
+    assert not any('search(' in sent_query['query'] for sent_query in sent_queries)
+    assert sent_queries[-1]['variables'] | {'cursor': None} == {
+        'owner': 'some-org', 'first': 100, 'isFork': None, 'isArchived': False, 'cursor': None,
+    }
+
+
+def test_large_searches_are_sliced(monkeypatch, caplog) -> None:
+    monkeypatch.setattr(gitme.gh, 'SEARCH_RESULTS_LIMIT', 2)
+    sent_queries: list[dict] = []
+    profile = make_profile(monkeypatch, sent_queries)
+    with caplog.at_level(logging.WARNING):
+        discovered = [repo.name for repo in profile.discover_repositories(gitme.config.RepositoryFilters(owner='some-org', min_stars=1))]
+    assert sorted(discovered) == sorted(CREATED_DATES)  # Mock search is not limited, so the repositories of the single day are all sent
+    assert "3 repositories match" in caplog.text and "created:2022-01-01..2022-01-01" in caplog.text
+    searched_queries = [sent_query['variables']['query'] for sent_query in sent_queries if 'nodes' in sent_query['query'] and 'search(' in sent_query['query']]
+    assert all(' created:' in searched_query for searched_query in searched_queries)
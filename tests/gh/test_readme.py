@@ -0,0 +1,100 @@
+import dataclasses
+import io
+import subprocess
+import types
+
+import github
+import pytest
+import requests
+
+import gitme.gh
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.read_bytes = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+def make_adapter(responses: dict[str, tuple[int, bytes]], requested: list[dict] | None = None) -> gitme.gh.GithubRESTAdapter:
+    def get(url: str, **kwargs) -> requests.Response:
+        status_code, content = responses.get(url.removeprefix(gitme.gh.GithubRESTAdapter.GITHUB_API_ENDPOINT), (404, b''))
+        response = requests.Response()
+        response.status_code = status_code
+        response.raw = CountingStream(content)
+        if requested is not None:
+            requested.append({'url': url, 'raw': response.raw} | kwargs)
+        return response
+
+    return gitme.gh.GithubRESTAdapter(_get=get)
+
+
+def test_readme_is_fetched_raw() -> None:
+    requested: list[dict] = []
+    readme = "# Project\n\nŻółć - unicode is kept\n".encode()
+    fetched_readme = make_adapter({'/repos/someone/project/readme': (200, readme)}, requested).fetch_readme('someone/project')
+    assert fetched_readme == gitme.gh.FetchedReadme(text="# Project\n\nŻółć - unicode is kept\n", sha=gitme.gh.git_blob_sha(readme))
+    assert requested[0]['headers'] == {'Accept': 'application/vnd.github.raw'}
+    assert requested[0]['stream']
+    with pytest.raises(github.UnknownObjectException):
+        make_adapter({}).fetch_readme('someone/no-readme')
+
+
+def test_blob_sha_matches_git() -> None:
+    readme = b"# Project\r\nBinary \x00 and \xff bytes\n"
+    git_sha = subprocess.run(['git', 'hash-object', '--stdin'], input=readme, capture_output=True, check=True).stdout.decode().strip()
+    assert gitme.gh.git_blob_sha(readme) == git_sha
+
+
+def test_large_readme_is_cut() -> None:
+    requested: list[dict] = []
+    readme = ("ż" * 300_000).encode()  # Two bytes per character
+    adapter = make_adapter({'/repos/someone/large/readme': (200, readme)}, requested)
+    fetched_readme = adapter.fetch_readme('someone/large', max_bytes=1001)  # Cut in the middle of a character
+    assert fetched_readme.truncated
+    assert fetched_readme.sha is None
+    assert fetched_readme.text == "ż" * 500
+    assert requested[0]['raw'].read_bytes < len(readme)  # Rest of the README is not downloaded
+
+
+@pytest.mark.parametrize('readme, text', [
+    ("Café crème\n".encode('utf-16'), "Café crème\n"),
+    ("\ufeffZażółć".encode('utf-8'), "Zażółć"),
+    ("Dès que le café est prêt, nous partons à la plage.".encode('cp1252'), "Dès que le café est prêt, nous partons à la plage."),
+])
+def test_readme_encoding_is_detected(readme: bytes, text: str) -> None:
+    assert gitme.gh.decode_text(readme) == text
+
+
+@dataclasses.dataclass
+class MockRepository:
+    full_name: str
+    readme: bytes
+    description: str = 'Description'
+
+    def get_readme(self) -> types.SimpleNamespace:
+        return types.SimpleNamespace(decoded_content=self.readme, sha='0123abcd')
+
+    def get_languages(self) -> dict[str, int]:
+        return {'Python': 100}
+
+
+def test_readme_limits_are_applied_to_metadata() -> None:
+    repo = MockRepository('someone/project', b'# Project\n' * 10)
+    metadata = gitme.gh.RepositoryMetadata.from_repo(repo)  # type: ignore
+    assert (metadata.readme, metadata.readme_sha) == ('# Project\n' * 10, '0123abcd')
+
+    limits = gitme.gh.ReadmeLimits(max_bytes=16, spill_bytes=8)
+    metadata = gitme.gh.RepositoryMetadata.from_repo(repo, limits=limits)  # type: ignore
+    assert (metadata.readme, metadata.readme_sha) == ('# Project\n# Proj', None)
+    assert isinstance(metadata._readme, gitme.gh.ReadmeSpill)  # pylint: disable=protected-access
+
+    adapter = make_adapter({'/repos/someone/project/readme': (200, b'# Raw project')})
+    metadata = gitme.gh.RepositoryMetadata.from_repo(repo, rest=adapter, limits=limits)  # type: ignore
+    assert (metadata.readme, metadata.readme_sha) == ('# Raw project', gitme.gh.git_blob_sha(b'# Raw project'))
+    assert gitme.gh.RepositoryMetadata.from_repo(repo).spill_threshold is None  # type: ignore  # Limits are not shared
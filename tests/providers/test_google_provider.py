@@ -12,6 +12,8 @@ import gitme.config
 import gitme.llm.base
 import gitme.llm.providers.google
 import gitme.llm.setup
+import gitme.ratelimit
+from gitme.llm.providers.router import RoutedProvider, RouterProvider
 
 
 class MockGenerativeModel(google.generativeai.GenerativeModel):
@@ -125,3 +127,16 @@ def test_google_model(name: str, monkeypatch) -> None:
     provider._model = MockGenerativeModel(model_name=provider.model)  # type: ignore
     with pytest.raises(ValueError):
         provider.query("Some query")
+
+
+def test_shared_quota_is_used_for_routing(tmp_path) -> None:
+    limits = gitme.llm.base.RateLimits(RPM=4, TPM=1_000)
+    provider = MockGoogleAI.connect({})
+    provider.set_rate_limiter(gitme.ratelimit.SharedRateLimiter(path=str(tmp_path / "queue.db.ratelimit"), limits=limits))
+    gitme.ratelimit.SharedRateLimiter(path=str(tmp_path / "queue.db.ratelimit"), limits=limits).acquire(400, requests=2)  # Other worker
+    assert provider.get_remaining_quota() == {"RPM": 2, "TPM": 600}
+    unused_provider = MockGoogleAI.connect({})
+    unused_provider._limits = limits
+    router = RouterProvider(_routes=[RoutedProvider(name="G1P", provider=provider), RoutedProvider(name="G1HF", provider=unused_provider)])
+    assert router.choose_routes(500)[0].name == "G1P"
+    assert router.choose_routes(700)[0].name == "G1HF"  # Overflows instead of waiting for the shared limits
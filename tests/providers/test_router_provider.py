@@ -0,0 +1,194 @@
+import dataclasses
+
+import pytest
+
+import gitme.config
+import gitme.llm.base
+import gitme.llm.providers.google
+import gitme.llm.setup
+import gitme.ratelimit
+from gitme.llm.providers.router import REPROBE_AFTER, RoutedProvider, RouterProvider
+
+
+@dataclasses.dataclass
+class FakeClock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+CLOCK = FakeClock()
+
+
+# pylint: disable=all
+@dataclasses.dataclass
+class MockProvider(gitme.llm.base.LLMProvider):
+    limits: gitme.llm.base.RateLimits | None = None
+    latency: float = 1
+    failing: bool = False
+    embeddings: bool = False
+    used_tokens: int = 0
+    used_requests: int = 0
+
+    @classmethod
+    def connect(cls, config: dict[str, str]) -> gitme.llm.base.LLMProvider:
+        return cls()
+
+    def query(self, query: str) -> gitme.llm.base.LLMQueryResult:
+        if self.failing:
+            raise ConnectionError("Endpoint is down")
+        CLOCK.now += self.latency
+        tokens = len(query) // 4
+        self.used_tokens += tokens
+        self.used_requests += 1
+        return gitme.llm.base.LLMQueryResult(query=query, result="Summary", tokens=gitme.llm.base.TokenCounters(prompt=tokens, total=tokens))
+
+    def count_tokens(self, query: str) -> int:
+        return len(query) // 4
+
+    @property
+    def supports_embeddings(self) -> bool:
+        return self.embeddings
+
+    def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        return [[1.0] for _ in texts]
+
+    def get_remaining_quota(self) -> gitme.llm.base.RateLimits | None:
+        if self.limits is None:
+            return None
+        return gitme.llm.base.RateLimits(RPM=self.limits['RPM'] - self.used_requests, TPM=self.limits['TPM'] - self.used_tokens)
+
+
+def make_router(**providers: MockProvider) -> RouterProvider:
+    return RouterProvider(
+        _routes=[RoutedProvider(name=name, provider=provider) for name, provider in providers.items()],
+        _clock=CLOCK,
+    )
+
+
+def test_queries_overflow_to_next_provider() -> None:
+    router = make_router(
+        flash=MockProvider(limits=gitme.llm.base.RateLimits(RPM=2, TPM=100_000)),
+        pro=MockProvider(limits=gitme.llm.base.RateLimits(RPM=2, TPM=100_000)),
+    )
+    for _ in range(3):
+        router.query("x" * 400)
+    stats = router.stats()
+    assert (stats["flash"]["queries"], stats["pro"]["queries"]) == (2, 1)
+    assert stats["flash"]["overflows"] == 1
+    assert stats["flash"]["remaining_quota"] == {"RPM": 0, "TPM": 100_000 - 200}
+
+
+def test_large_prompts_go_to_provider_with_enough_tokens() -> None:
+    router = make_router(
+        small=MockProvider(limits=gitme.llm.base.RateLimits(RPM=10, TPM=1_000)),
+        large=MockProvider(limits=gitme.llm.base.RateLimits(RPM=10, TPM=100_000)),
+    )
+    router.query("x" * 20_000)
+    router.query("x" * 400)
+    assert router.stats()["small"]["queries"] == 1
+    assert router.stats()["large"]["queries"] == 1
+
+
+def test_slow_provider_is_passed_over() -> None:
+    router = make_router(local=MockProvider(latency=10), flash=MockProvider(latency=1))
+    router.query("First query")  # Latencies are not known yet, so the preferred provider is used
+    router.query("Second query")
+    router.query("Third query")
+    stats = router.stats()
+    assert (stats["local"]["queries"], stats["flash"]["queries"]) == (1, 2)
+    assert stats["local"]["latency"] == 10
+
+
+def test_failed_queries_are_passed_to_next_provider() -> None:
+    router = make_router(local=MockProvider(failing=True), flash=MockProvider())
+    assert router.query("Query").result == "Summary"
+    assert router.stats()["local"]["failures"] == 1
+    router = make_router(local=MockProvider(failing=True))
+    with pytest.raises(ConnectionError):
+        router.query("Query")
+
+
+def test_exhausted_providers_fall_back_to_first_one() -> None:
+    router = make_router(
+        flash=MockProvider(limits=gitme.llm.base.RateLimits(RPM=0, TPM=0)),
+        pro=MockProvider(limits=gitme.llm.base.RateLimits(RPM=0, TPM=0)),
+    )
+    router.query("Query")
+    assert router.stats()["flash"]["queries"] == 1
+
+
+def test_route_is_required() -> None:
+    with pytest.raises(ValueError):
+        gitme.llm.setup.get_provider_class("ROUTER").connect({"api_key": "secret"})
+    with pytest.raises(ValueError):
+        gitme.llm.setup.get_provider_class("ROUTER").connect({"route": "ROUTER"})
+
+
+def test_embeddings_are_taken_from_capable_provider() -> None:
+    with pytest.raises(gitme.llm.base.EmbeddingsNotSupportedError):
+        make_router(local=MockProvider()).embed(["Text"])
+    router = make_router(local=MockProvider(), flash=MockProvider(embeddings=True))
+    assert router.supports_embeddings
+    assert router.embed(["Text"]) == [[1.0]]
+
+
+def test_rate_limits_of_routed_providers_are_summed() -> None:
+    connection = {"route": "G1HF,G1P", "api_key": "secret"}
+    flash_limits = gitme.llm.providers.google.GeminiOneHalfFlash.get_rate_limits()
+    pro_limits = gitme.llm.providers.google.GeminiOnePro.get_rate_limits()
+    assert RouterProvider.get_rate_limits(connection) == {
+        "RPM": flash_limits["RPM"] + pro_limits["RPM"],
+        "TPM": flash_limits["TPM"] + pro_limits["TPM"],
+    }
+    assert RouterProvider.get_requests_per_query(connection) == 2
+    assert RouterProvider.get_rate_limits() is None  # Route is not known without the connection configuration
+
+
+def test_shared_limits_are_kept_per_routed_provider(tmp_path) -> None:
+    @dataclasses.dataclass
+    class LimitedProvider(MockProvider):
+        @classmethod
+        def get_rate_limits(cls, connection: dict[str, str] | None = None) -> gitme.llm.base.RateLimits:
+            return gitme.llm.base.RateLimits(RPM=5, TPM=1_000)
+
+    router = make_router(local=MockProvider(), flash=LimitedProvider())
+    router.set_rate_limiter(gitme.ratelimit.SharedRateLimiter(path=str(tmp_path / "queue.db.ratelimit"), limits={"RPM": 5, "TPM": 1_000}))
+    assert router._routes[0].provider._rate_limiter is None
+    assert router._routes[1].provider._rate_limiter.path == str(tmp_path / "queue.db.ratelimit.flash")
+
+
+def test_routed_providers_are_connected_with_retries(monkeypatch) -> None:
+    @dataclasses.dataclass
+    class FlakyProvider(MockProvider):
+        @classmethod
+        def connect(cls, config: dict[str, str]) -> gitme.llm.base.LLMProvider:
+            connections.append(config)
+            if len(connections) == 1:
+                raise ConnectionError("Endpoint is starting")
+            return cls()
+
+    connections: list[dict[str, str]] = []
+    monkeypatch.setattr(gitme.llm.setup, "get_provider_class", lambda name: RouterProvider if name == "ROUTER" else FlakyProvider)
+    router = RouterProvider.initialize(gitme.config.LLMProviderConfig(
+        name="ROUTER",
+        connection={"route": "LOCAL", "api_key": "secret"},
+        retry={"attempts": 2, "delay": 0},
+    ))
+    assert connections == [{"api_key": "secret"}, {"api_key": "secret"}]
+    assert router.query("Query").result == "Summary"
+
+
+def test_slow_provider_is_reprobed() -> None:
+    local = MockProvider(latency=10)
+    router = make_router(local=local, flash=MockProvider(latency=1))
+    for _ in range(REPROBE_AFTER + 1):  # Local endpoint is observed and then passed over
+        router.query("Query")
+    assert router.stats()["local"]["queries"] == 1
+    local.latency = 1  # Local endpoint is fast again
+    router.query("Query")
+    assert router.stats()["local"]["queries"] == 2
+    assert router.stats()["local"]["latency"] == 1
+    router.query("Query")
+    assert router.stats()["local"]["queries"] == 3
@@ -0,0 +1,122 @@
+import base64
+import gzip
+import http.server
+import json
+import pathlib
+import threading
+
+import pytest
+import requests
+
+import gitme.cassette
+
+
+class EchoHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._respond(f"GET {self.path}".encode())
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self._respond(b"POST " + self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def _respond(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Set-Cookie", "session=secret")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        pass
+
+
+@pytest.fixture
+def recorded_cassette(tmp_path: pathlib.Path) -> tuple[str, str]:
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"http://127.0.0.1:{server.server_address[1]}"
+    cassette_path = str(tmp_path / "run.cassette.gz")
+    try:
+        with gitme.cassette.Cassette(cassette_path, mode=gitme.cassette.RECORD).activate():
+            assert gitme.cassette.is_active()
+            with requests.Session() as session:
+                assert session.get(f"{address}/repos?key=secret-api-key", headers={"Authorization": "token secret"}).text == "GET /repos?key=secret-api-key"
+                assert session.post(f"{address}/graphql", data=b"first page").text == "POST first page"
+                assert session.post(f"{address}/graphql", data=b"second page").text == "POST second page"
+                with session.get(f"{address}/tarball", stream=True) as response:
+                    assert response.raw.read() == b"GET /tarball"
+                assert session.put(f"{address}/repos/someone/someone/contents/Xy7Qa0b1C2", data=b"random").status_code == 501
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not gitme.cassette.is_active()
+    return cassette_path, address
+
+
+def test_secrets_are_not_recorded(recorded_cassette: tuple[str, str]) -> None:
+    cassette_path, _ = recorded_cassette
+    with gzip.open(cassette_path, "rt", encoding="utf-8") as cassette_file:
+        exchanges = [json.loads(line) for line in cassette_file]
+    assert len(exchanges) == 5
+    assert not any(
+        "secret" in json.dumps({name: value for name, value in exchange.items() if name != "body"})
+        for exchange in exchanges
+    )
+
+
+def test_exchanges_are_replayed_offline(recorded_cassette: tuple[str, str]) -> None:
+    cassette_path, address = recorded_cassette  # Server is already shut down
+    with gitme.cassette.Cassette(cassette_path).activate():
+        with requests.Session() as session:
+            assert session.post(f"{address}/graphql", data=b"second page").text == "POST second page"
+            assert session.post(f"{address}/graphql", data=b"first page").text == "POST first page"
+            response = session.get(f"{address}/repos?key=other-api-key")
+            assert (response.status_code, response.text) == (200, "GET /repos?key=secret-api-key")
+            assert response.headers["Content-Type"] == "text/plain; charset=utf-8"
+            with session.get(f"{address}/tarball", stream=True) as streamed_response:
+                assert streamed_response.raw.read() == b"GET /tarball"
+            assert session.put(f"{address}/repos/someone/someone/contents/Ab3Zk9d8E7", data=b"other").status_code == 501  # Randomized path
+            with pytest.raises(gitme.cassette.CassetteMissError):
+                session.get(f"{address}/not-recorded")
+
+
+def test_requests_to_other_paths_are_not_replayed(recorded_cassette: tuple[str, str]) -> None:
+    cassette_path, address = recorded_cassette
+    with gitme.cassette.Cassette(cassette_path).activate():
+        with requests.Session() as session:
+            assert session.post(f"{address}/graphql", data=b"third page").text == "POST first page"  # Same path, other body
+            with pytest.raises(gitme.cassette.CassetteMissError):
+                session.get(f"{address}/repos/someone/other")
+            with pytest.raises(gitme.cassette.CassetteMissError):
+                session.put(f"{address}/repos/someone/someone/contents/README.md", data=b"random")
+
+
+def test_recorded_latencies_are_replayed(recorded_cassette: tuple[str, str]) -> None:
+    cassette_path, address = recorded_cassette
+    delays: list[float] = []
+    with gitme.cassette.Cassette(cassette_path, replay_latency=True, sleep=delays.append).activate():
+        requests.get(f"{address}/tarball", timeout=5)
+    assert len(delays) == 1 and delays[0] > 0
+
+
+def test_bodies_are_recorded_as_read(tmp_path: pathlib.Path, monkeypatch) -> None:
+    monkeypatch.setattr(gitme.cassette, "MAX_RECORDED_BODY_BYTES", 16)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"http://127.0.0.1:{server.server_address[1]}"
+    cassette_path = str(tmp_path / "run.cassette.gz")
+    try:
+        with gitme.cassette.Cassette(cassette_path, mode=gitme.cassette.RECORD).activate():
+            with requests.Session() as session:
+                with session.get(f"{address}/tarball/{'x' * 100}", stream=True) as response:
+                    assert next(response.iter_content(chunk_size=8)) == b"GET /tar"  # Reading stops early
+                assert session.get(f"{address}/large/{'x' * 100}").text == f"GET /large/{'x' * 100}"  # Client gets the whole body
+    finally:
+        server.shutdown()
+        server.server_close()
+    with gzip.open(cassette_path, "rt", encoding="utf-8") as cassette_file:
+        exchanges = [json.loads(line) for line in cassette_file]
+    assert [(base64.b64decode(exchange["body"]), exchange.get("truncated", False)) for exchange in exchanges] == [
+        (b"GET /tar", False),
+        (b"GET /large/xxxxx", True),
+    ]
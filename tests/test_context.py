@@ -0,0 +1,141 @@
+import contextlib
+import dataclasses
+import io
+import random
+import string
+import tarfile
+import typing
+
+import github
+import requests
+
+import gitme.context
+import gitme.gh
+import gitme.llm.prompts
+import gitme.runner
+
+ARCHIVE_PREFIX = "someone-some-project-0d1a26e"
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.read_bytes = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+def make_tarball(files: dict[str, bytes]) -> bytes:
+    archive_buffer = io.BytesIO()
+    with tarfile.open(fileobj=archive_buffer, mode="w:gz") as archive:
+        for path, content in files.items():
+            member = tarfile.TarInfo(f"{ARCHIVE_PREFIX}/{path}")
+            member.size = len(content)
+            archive.addfile(member, io.BytesIO(content))
+    return archive_buffer.getvalue()
+
+
+def make_extractor(**limits: int) -> gitme.context.ContextExtractor:
+    return gitme.context.ContextExtractor(rest=None, **limits)  # type: ignore
+
+
+def test_files_are_selected_by_patterns_and_size() -> None:
+    tarball = make_tarball({
+        "README.md": b"# Project",
+        "pyproject.toml": b"[project]\nname = 'project'",
+        "docs/usage.md": b"Usage of the project",
+        "docs/nested/internal.md": b"Not matched by docs/*.md",
+        "docs/huge.md": b"x" * 1024,
+        "src/main.py": b"print('Hello')",
+        "docs/logo.md": b"\x00\x01binary",
+    })
+    context = make_extractor(max_file_bytes=512).extract_from_stream(io.BytesIO(tarball))
+    assert context == {
+        "pyproject.toml": "[project]\nname = 'project'",
+        "docs/usage.md": "Usage of the project",
+    }
+
+
+def test_extraction_stops_when_budget_is_used() -> None:
+    generator = random.Random(0)
+    files = {
+        f"docs/{index:04}.md": ''.join(generator.choices(string.ascii_letters, k=1000)).encode()
+        for index in range(200)
+    }
+    tarball = make_tarball(files)
+    stream = CountingStream(tarball)
+    context = make_extractor(max_total_bytes=3100).extract_from_stream(stream)  # Remaining 100 bytes cannot fit any of the files
+    assert list(context) == ["docs/0000.md", "docs/0001.md", "docs/0002.md"]
+    assert stream.read_bytes < len(tarball) / 10
+
+
+def test_extraction_stops_after_archive_limit() -> None:
+    generator = random.Random(0)
+    files = {
+        f"src/{index:04}.py": ''.join(generator.choices(string.ascii_letters, k=1000)).encode()
+        for index in range(200)
+    }
+    tarball = make_tarball(files | {"pyproject.toml": b"[project]"})  # Matching file at the end of the archive
+    stream = CountingStream(tarball)
+    assert not make_extractor(max_archive_bytes=20_000).extract_from_stream(stream)
+    assert stream.read_bytes < len(tarball) / 5
+
+
+def test_context_is_included_in_prompt(monkeypatch) -> None:
+    monkeypatch.setattr(gitme.llm.prompts, "clean_context", lambda _: "Example README")
+    prompt = gitme.llm.prompts.generate_prompt(
+        readme="# Project",
+        description="Some project",
+        technologies=["Python"],
+        context={"pyproject.toml": "[project]\nname = 'project'"},
+    )
+    assert "--- pyproject.toml ---\n[project]\nname = 'project'" in prompt
+    assert "Other project files" not in gitme.llm.prompts.generate_prompt(
+        readme="# Project",
+        description="Some project",
+        technologies=["Python"],
+    )
+
+
+def test_unreadable_archives_are_skipped(monkeypatch) -> None:
+    @dataclasses.dataclass
+    class MockRESTAdapter:
+        tarballs: dict[str, bytes]
+
+        @contextlib.contextmanager
+        def stream(self, path: str, accept: str) -> typing.Generator[requests.Response, None, None]:
+            if path.endswith("/slow/tarball"):
+                raise requests.exceptions.ReadTimeout("Read timed out")
+            if (tarball := self.tarballs.get(path.removeprefix("/repos/").removesuffix("/tarball"))) is None:
+                raise github.UnknownObjectException(status=404, data={"message": f"{path} does not exist"})
+            response = requests.Response()
+            response.raw = io.BytesIO(tarball)
+            yield response
+
+    @dataclasses.dataclass
+    class MockProfile:
+        rest: MockRESTAdapter
+        log = staticmethod(lambda *_, **__: None)
+
+    runner = gitme.runner.GitMeRunner({
+        "output": "output.csv",
+        "github": {"username": "someone", "token": "token"},
+        "llm": {"name": "G1P", "connection": {"api_key": "key"}, "retry": {"attempts": 1}},
+        "context": {"patterns": ["pyproject.toml"]},
+    })
+    runner.github_hooks = MockProfile(rest=MockRESTAdapter({  # type: ignore
+        "someone/project": make_tarball({"pyproject.toml": b"[project]"}),
+        "someone/truncated": make_tarball({"pyproject.toml": b"[project]" * 100})[:40],
+    }))
+    repositories = []
+    for name in ["someone/project", "someone/empty", "someone/truncated", "someone/slow"]:
+        repositories.append(repo := gitme.gh.RepositoryMetadata())
+        repo.name, repo.description, repo.technologies, repo.readme = name, "", [], "# Project"
+    monkeypatch.setattr(gitme.llm.prompts, "clean_context", lambda _: "Example README")
+    runner.plan_queries(repositories, with_context=False)  # Dry-run does not download the archives
+    assert [repo.context for repo in repositories] == [None, None, None, None]
+    runner.attach_context(repositories)
+    assert [repo.context for repo in repositories] == [{"pyproject.toml": "[project]"}, {}, {}, {}]
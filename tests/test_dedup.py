@@ -0,0 +1,51 @@
+import random
+import string
+
+import pytest
+
+import gitme.dedup
+
+
+def random_readme(generator: random.Random, words: int = 300) -> str:
+    return ' '.join(
+        ''.join(generator.choices(string.ascii_lowercase, k=generator.randint(3, 9)))
+        for _ in range(words)
+    )
+
+
+def test_preprocessing_strips_markdown_noise() -> None:
+    readme = (
+        '# Project [![Build](https://ci/badge.svg)](https://ci)\n'
+        'See the [docs](https://docs.example.com) <br/> for details.\n'
+        '```bash\npip install project\n```'
+    )
+    assert gitme.dedup.preprocess_readme(readme) == ['project', 'see', 'the', 'docs', 'for', 'details']
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.8, 0.9, 0.95])
+def test_chosen_bands_fit_signature(threshold: float) -> None:
+    bands, rows = gitme.dedup.choose_bands(128, threshold)
+    assert bands * rows <= 128
+    assert abs((1 / bands) ** (1 / rows) - threshold) < 0.1
+
+
+def test_near_duplicates_are_clustered() -> None:
+    generator = random.Random(26)
+    original = random_readme(generator)
+    fork = original.replace(original.split()[10], 'forked', 1) + ' maintained by someone else'
+    unrelated = random_readme(generator)
+    representatives = gitme.dedup.cluster_near_duplicates(
+        [original, unrelated, fork, original],
+        threshold=0.8,
+    )
+    assert representatives == [0, 1, 0, 0]
+
+
+def test_empty_readmes_are_not_duplicates() -> None:
+    assert gitme.dedup.cluster_near_duplicates(['', '', '  ']) == [0, 1, 2]
+
+
+def test_distinct_readmes_at_scale() -> None:
+    generator = random.Random(28)
+    readmes = [random_readme(generator, words=50) for _ in range(500)]
+    assert gitme.dedup.cluster_near_duplicates(readmes) == list(range(500))
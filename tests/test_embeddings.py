@@ -0,0 +1,130 @@
+import dataclasses
+import json
+import os
+import pathlib
+
+import numpy
+import pandas
+import pytest
+
+import gitme.cli
+import gitme.embeddings
+import gitme.runner
+
+SUMMARIES = {
+    "someone/parser": "Fast incremental parser of JSON documents written in Rust",
+    "someone/dashboard": "Web dashboard visualizing the metrics of Kubernetes clusters",
+    "someone/bot": "Chat bot answering the questions about the weather forecast",
+}
+
+
+@dataclasses.dataclass
+class CountingEmbedder(gitme.embeddings.Embedder):
+    wrapped: gitme.embeddings.Embedder = dataclasses.field(default_factory=gitme.embeddings.HashingEmbedder)
+    embedded: list[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.wrapped.name
+
+    def embed(self, texts: list[str], query: bool = False) -> numpy.ndarray:
+        if not query:
+            self.embedded += texts
+        return self.wrapped.embed(texts, query=query)
+
+
+def test_hashing_embedder() -> None:
+    vectors = gitme.embeddings.HashingEmbedder(dimensions=64).embed(["JSON parser", "parser of JSON", "weather bot", ""])
+    assert vectors.shape == (4, 64)
+    assert numpy.allclose(numpy.linalg.norm(vectors[:3], axis=1), 1)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_index_is_updated_incrementally(tmp_path: pathlib.Path) -> None:
+    index = gitme.embeddings.EmbeddingIndex(str(tmp_path / "output.csv"))
+    embedder = CountingEmbedder()
+    assert index.update(SUMMARIES, embedder) == 3
+    assert index.update(SUMMARIES, embedder) == 0
+    assert len(embedder.embedded) == 3
+
+    changed_summaries = SUMMARIES | {"someone/bot": "Chat bot answering the questions about the JSON parsers"}
+    assert index.update(changed_summaries, embedder) == 1
+    assert embedder.embedded[-1] == changed_summaries["someone/bot"]
+    assert index.search("JSON parser", embedder, k=2)[0][0] == "someone/parser"
+
+    assert index.update({"someone/new": "Command line tool"}, embedder, prune=False) == 1
+    assert len(index.open_vectors()) == 4
+    assert index.update({"someone/new": "Command line tool"}, embedder) == 0
+    assert [name for name, _ in index.search("Command line", embedder)] == ["someone/new"]
+
+
+def test_index_is_rebuilt_for_another_embedder(tmp_path: pathlib.Path) -> None:
+    index = gitme.embeddings.EmbeddingIndex(str(tmp_path / "output.csv"))
+    index.update(SUMMARIES, gitme.embeddings.HashingEmbedder(dimensions=32))
+    with pytest.raises(ValueError):
+        index.search("JSON parser", gitme.embeddings.HashingEmbedder(dimensions=64))
+    assert index.update(SUMMARIES, gitme.embeddings.HashingEmbedder(dimensions=64)) == 3
+    assert index.open_vectors().shape == (3, 64)
+
+
+def test_search_ranking(tmp_path: pathlib.Path) -> None:
+    index = gitme.embeddings.EmbeddingIndex(str(tmp_path / "output.csv"))
+    embedder = gitme.embeddings.HashingEmbedder()
+    assert not index.search("Kubernetes", embedder)
+    index.update(SUMMARIES, embedder)
+    results = index.search("metrics of Kubernetes clusters", embedder, k=10)
+    assert [name for name, _ in results][0] == "someone/dashboard"
+    assert len(results) == 3
+    assert [similarity for _, similarity in results] == sorted((similarity for _, similarity in results), reverse=True)
+
+
+def test_provider_embeddings_are_batched() -> None:
+    @dataclasses.dataclass
+    class MockProvider:
+        batches: list[int] = dataclasses.field(default_factory=list)
+        supports_embeddings: bool = True
+
+        def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+            self.batches.append(len(texts))
+            return [[len(text), 1.0] for text in texts]
+
+    provider = MockProvider()
+    embedder = gitme.embeddings.create_embedder("provider", batch_size=2, provider=lambda: ("MOCK", provider))  # type: ignore
+    vectors = embedder.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+    assert provider.batches == [2, 2, 1]
+    assert vectors.shape == (5, 2)
+    assert embedder.name == "provider:MOCK"
+    with pytest.raises(ValueError):
+        gitme.embeddings.create_embedder("provider", provider=lambda: ("MOCK", MockProvider(supports_embeddings=False)))  # type: ignore
+
+
+def test_search_command(tmp_path: pathlib.Path, capsys, monkeypatch) -> None:
+    for variable in ("GITME__GITHUB_USERNAME", "GITME__GITHUB_TOKEN", "GITME__LLM_PROVIDER_API_KEY"):
+        monkeypatch.delenv(variable, raising=False)
+    output = str(tmp_path / "output.csv")
+    gitme.embeddings.EmbeddingIndex(output).update(SUMMARIES, gitme.embeddings.HashingEmbedder())
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"output": output, "embeddings": {"embedder": "local"}}))
+    gitme.cli.main(["search", "weather bot", "-k", "1", "--config", str(config_path)])
+    assert capsys.readouterr().out.strip().endswith("\tsomeone/bot")
+
+
+def test_empty_run_is_dumped(tmp_path: pathlib.Path) -> None:
+    @dataclasses.dataclass
+    class MockProfile:
+        username: str = "someone"
+        log = staticmethod(lambda *_, **__: None)
+
+    output = str(tmp_path / "output.csv")
+    gitme.embeddings.EmbeddingIndex(output).update(SUMMARIES, gitme.embeddings.HashingEmbedder())
+    runner = gitme.runner.GitMeRunner({
+        "output": output,
+        "github": {"username": "someone", "token": "token"},
+        "llm": {"name": "G1P", "connection": {"api_key": "key"}, "retry": {"attempts": 1}},
+        "embeddings": {"embedder": "local"},
+    })
+    runner.github_hooks = MockProfile()  # type: ignore
+    runner.dump(pandas.DataFrame.from_records([]))
+    assert os.path.exists(output)
+    assert not gitme.embeddings.EmbeddingIndex(output).search("weather bot", gitme.embeddings.HashingEmbedder())  # Index is pruned
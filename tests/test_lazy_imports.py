@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+import gitme.llm.setup
+
+
+def loaded_modules_after(statement: str, candidates: list[str]) -> list[str]:
+    completed_process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; {statement}; print(','.join(name for name in {candidates!r} if name in sys.modules))"
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return [name for name in completed_process.stdout.strip().split(",") if name]
+
+
+HEAVY_DEPENDENCIES = ["pandas", "numpy", "github", "google.generativeai", "pydantic", "tenacity", "requests"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "gitme.cli",
+        "gitme.runner",
+        "gitme.llm.setup",
+    ]
+)
+def test_entry_points_do_not_import_heavy_dependencies(module: str) -> None:
+    assert not loaded_modules_after(
+        f"import {module}",
+        HEAVY_DEPENDENCIES
+    )
+
+
+def test_runner_imports_only_configuration_dependencies() -> None:
+    assert loaded_modules_after(
+        "import gitme.runner; gitme.runner.GitMeRunner({"
+        "'output': 'output.csv', 'github': {'username': 'someone', 'token': 'token'},"
+        "'llm': {'name': 'G1P', 'connection': {}, 'retry': {'attempts': 1}}})",
+        HEAVY_DEPENDENCIES
+    ) == ["pydantic", "tenacity"]  # Configuration is validated when the runner is created, clients are imported only once connected
+
+
+def test_only_selected_provider_is_imported() -> None:
+    assert loaded_modules_after(
+        "import gitme.llm.setup; gitme.llm.setup.get_provider_class('G1P')",
+        ["google.generativeai"]
+    ) == ["google.generativeai"]
+
+
+def test_unknown_provider() -> None:
+    with pytest.raises(ValueError):
+        gitme.llm.setup.get_provider_class("UNKNOWN")
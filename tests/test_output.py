@@ -0,0 +1,113 @@
+import os
+import sqlite3
+
+import pandas
+import pytest
+
+import gitme.gh
+import gitme.output
+import gitme.runner
+
+
+def make_metadata(name: str, readme: str, spill_threshold: int | None = None) -> gitme.gh.RepositoryMetadata:
+    metadata = gitme.gh.RepositoryMetadata(spill_threshold=spill_threshold)
+    metadata.name = name
+    metadata.description = "Description"
+    metadata.technologies = gitme.gh.RepositoryMetadata.intern_technologies(["Python", "Shell"])
+    metadata.readme = readme
+    return metadata
+
+
+def test_metadata_is_compact() -> None:
+    first, second = make_metadata("someone/first", "# First"), make_metadata("someone/second", "# Żółć")
+    assert not hasattr(first, "__dict__")
+    assert first.technologies[0] is second.technologies[0]
+    assert second.readme == "# Żółć"
+    second.release_readme()
+    with pytest.raises(ValueError):
+        _ = second.readme
+
+
+def test_large_readme_is_spilled() -> None:
+    short, large = make_metadata("someone/short", "# Short", 16), make_metadata("someone/large", "# Large\n" * 100, 16)
+    assert not isinstance(short._readme, gitme.gh.ReadmeSpill)  # pylint: disable=protected-access
+    spill = large._readme  # pylint: disable=protected-access
+    assert isinstance(spill, gitme.gh.ReadmeSpill)
+    assert os.path.exists(spill.path)
+    assert large.readme == "# Large\n" * 100
+    large.release_readme()
+    assert not os.path.exists(spill.path)
+
+
+@pytest.mark.parametrize("mode", gitme.output.README_COLUMN_MODES)
+@pytest.mark.parametrize("output_name", ["output.csv", "output.db"])
+def test_readme_column_modes(mode: str, output_name: str, tmp_path) -> None:
+    readme = "# Project\n" + "Some text. " * 100
+    readme_column = gitme.output.ReadmeColumn(mode=mode, max_chars=50)
+    row = {"name": "someone/project", "description": "Description", "technologies": "Python", "summary": "Summary"}
+    if (value := readme_column.encode(readme)) is not None:
+        row["readme"] = value
+    store = gitme.output.open_store(str(tmp_path / output_name))
+    store.write(pandas.DataFrame.from_records([row]))
+    stored_value = store.get("someone/project").get("readme")  # type: ignore
+
+    if mode == gitme.output.README_FULL:
+        assert stored_value == readme
+    elif mode == gitme.output.README_TRUNCATED:
+        assert stored_value == readme[:50]
+    elif mode == gitme.output.README_COMPRESSED:
+        assert len(stored_value) < len(readme)
+        assert gitme.output.decompress_readme(stored_value) == readme
+    else:
+        assert not stored_value
+    if mode in (gitme.output.README_TRUNCATED, gitme.output.README_OMITTED):
+        assert readme_column.matches(stored_value, readme) is None  # Changes of the README cannot be detected
+    else:
+        assert readme_column.matches(stored_value, readme)
+        assert not readme_column.matches(stored_value, "# Changed")
+
+
+def test_unknown_readme_column_mode() -> None:
+    with pytest.raises(ValueError):
+        gitme.output.ReadmeColumn(mode="zipped")
+
+
+@pytest.mark.parametrize("output_name", ["output.csv", "output.db"])
+def test_outputs_without_readme_sha_are_extended(output_name: str, tmp_path) -> None:
+    output_path = str(tmp_path / output_name)
+    old_rows = pandas.DataFrame.from_records([
+        {"name": name, "description": "", "technologies": "Python", "readme": "# Project", "summary": "Summary"}
+        for name in ["someone/project", "someone/other"]
+    ])
+    if output_name.endswith(".db"):
+        with sqlite3.connect(output_path) as connection:  # Table created by the previous versions
+            connection.execute("CREATE TABLE repositories (name TEXT PRIMARY KEY, description, technologies, readme, summary)")
+            old_rows.to_sql("repositories", connection, index=False, if_exists="append")
+    else:
+        old_rows.to_csv(output_path, index=False)
+    store = gitme.output.open_store(output_path)
+    store.upsert({"name": "someone/project", "readme": "# Changed", "readme_sha": "0123abcd", "summary": "New summary"})
+    assert store.get("someone/project")["readme_sha"] == "0123abcd"
+    assert not store.get("someone/other")["readme_sha"]
+
+
+@pytest.mark.parametrize("column, readmes", [
+    ("truncated", ["# Pr"] * 3),
+    ("omitted", [None] * 3),
+    ("full", ["# Project 0", "# Project 1", "# Project 2"]),
+])
+def test_readme_column_follows_configuration(column: str, readmes: list[str | None], monkeypatch) -> None:
+    profile = gitme.gh.GithubProfile("someone")
+    monkeypatch.setattr(gitme.gh.GithubProfile, "connect", classmethod(lambda cls, username, token: profile))
+    runner = gitme.runner.GitMeRunner({
+        "output": "output.csv",
+        "github": {"username": "someone", "token": "token"},
+        "llm": {"name": "G1P", "connection": {"api_key": "key"}, "retry": {"attempts": 1}},
+        "readme": {"column": column, "max_chars": 4, "max_bytes": 64},
+    })
+    runner.connect_github()
+    rows = [runner.to_row(make_metadata(f"someone/project-{index}", f"# Project {index}"), "Summary") for index in range(3)]
+    assert [row.get("readme") for row in rows] == readmes
+    assert all(row["summary"] == "Summary" for row in rows)
+    assert runner.github_hooks.readme_limits == gitme.gh.ReadmeLimits(max_bytes=64)
+    assert profile.readme_limits == gitme.gh.ReadmeLimits()  # Connected profile is shared, so it is not modified
@@ -0,0 +1,110 @@
+import dataclasses
+import json
+import pathlib
+import types
+
+import pandas
+import pytest
+
+import gitme.output
+import gitme.rollup
+import gitme.runner
+
+ROWS = [
+    {"name": "someone/parser", "technologies": "Rust, Python", "summary": "JSON parser"},
+    {"name": "someone/cli", "technologies": "Rust", "summary": "Command line tool"},
+    {"name": "someone/dashboard", "technologies": "TypeScript, CSS", "summary": "Metrics dashboard"},
+    {"name": "someone/notes", "technologies": "", "summary": "Personal notes"},
+    {"name": "someone/empty", "technologies": "Go", "summary": ""},
+]
+
+
+class RecordingSummarizer:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    def __call__(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return f"Overview #{len(self.prompts)}"
+
+
+def test_rows_are_grouped() -> None:
+    assert gitme.rollup.group_rows(ROWS) == {
+        "Other": [("someone/notes", "Personal notes")],
+        "Rust": [("someone/cli", "Command line tool"), ("someone/parser", "JSON parser")],
+        "TypeScript": [("someone/dashboard", "Metrics dashboard")],
+    }
+    assert list(gitme.rollup.group_rows(ROWS, gitme.rollup.GROUP_BY_TECHNOLOGY)) == ["CSS", "Other", "Python", "Rust", "TypeScript"]
+    with pytest.raises(ValueError):
+        gitme.rollup.group_rows(ROWS, "stars")
+
+
+def test_only_affected_path_is_recomputed(tmp_path: pathlib.Path) -> None:
+    rollup_path = str(tmp_path / "output.csv.rollup.json")
+    summarizer = RecordingSummarizer()
+    rollup = gitme.rollup.ProfileRollup(path=rollup_path, summarize=summarizer).build(ROWS, username="someone")
+    assert len(summarizer.prompts) == 4  # Three groups and the profile
+    assert rollup["profile"] == "Overview #4"
+    assert "someone/cli: Command line tool" in summarizer.prompts[1]
+    assert "Rust: Overview #2" in summarizer.prompts[3]
+
+    profile_rollup = gitme.rollup.ProfileRollup(path=rollup_path, summarize=summarizer)  # e.g. in the next run
+    assert profile_rollup.build(ROWS, username="someone") == rollup
+    assert (profile_rollup.computed_nodes, profile_rollup.reused_nodes) == (0, 4)
+
+    changed_rows = [row | {"summary": "Fast JSON parser"} if row["name"] == "someone/parser" else row for row in ROWS]
+    profile_rollup = gitme.rollup.ProfileRollup(path=rollup_path, summarize=summarizer)
+    changed_rollup = profile_rollup.build(changed_rows, username="someone")
+    assert (profile_rollup.computed_nodes, profile_rollup.reused_nodes) == (2, 2)  # Rust group and the profile
+    assert changed_rollup["groups"]["TypeScript"] == rollup["groups"]["TypeScript"]
+    assert changed_rollup["groups"]["Rust"] == "Overview #5"
+    with open(rollup_path, encoding="utf-8") as rollup_file:
+        assert len(json.load(rollup_file)["nodes"]) == 4  # Nodes of the previous tree are dropped
+
+
+def test_large_groups_are_split(tmp_path: pathlib.Path) -> None:
+    rows = [{"name": f"someone/repo-{index:02}", "technologies": "Python", "summary": f"Project {index}"} for index in range(7)]
+    summarizer = RecordingSummarizer()
+    profile_rollup = gitme.rollup.ProfileRollup(path=str(tmp_path / "rollup.json"), summarize=summarizer, max_children=3)
+    profile_rollup.build(rows, username="someone")
+    assert len(summarizer.prompts) == 4 + 1 + 1  # Parts of the group, the group and the profile
+    assert all(prompt.count("someone/repo-") <= 3 for prompt in summarizer.prompts)
+
+    rows.append({"name": "someone/repo-new", "technologies": "Python", "summary": "New project"})
+    profile_rollup = gitme.rollup.ProfileRollup(path=str(tmp_path / "rollup.json"), summarize=summarizer, max_children=3)
+    profile_rollup.build(rows, username="someone")
+    assert (profile_rollup.computed_nodes, profile_rollup.reused_nodes) == (3, 3)  # Only the part of the new repository is summarized again
+
+
+@pytest.mark.parametrize("output_name", ["output.csv", "output.db"])
+def test_stored_rows_are_read(output_name: str, tmp_path: pathlib.Path) -> None:
+    store = gitme.output.open_store(str(tmp_path / output_name))
+    store.write(pandas.DataFrame.from_records([
+        {"name": row["name"], "description": None, "technologies": row["technologies"], "readme": "", "summary": row["summary"]}
+        for row in ROWS
+    ]))
+    assert gitme.rollup.group_rows(store.read().to_dict(orient="records")) == gitme.rollup.group_rows(ROWS)
+
+
+def test_dumped_rollup_is_built_from_stored_rows(tmp_path: pathlib.Path) -> None:
+    @dataclasses.dataclass
+    class MockProfile:
+        username: str = "someone"
+        log = staticmethod(lambda *_, **__: None)
+
+    output = str(tmp_path / "output.csv")
+    summarizer = RecordingSummarizer()
+    runner = gitme.runner.GitMeRunner({
+        "output": output,
+        "github": {"username": "someone", "token": "token"},
+        "llm": {"name": "G1P", "connection": {"api_key": "key"}, "retry": {"attempts": 1}},
+        "rollup": {},
+    })
+    runner.github_hooks = MockProfile()  # type: ignore
+    runner.llm_provisioner = types.SimpleNamespace(query=lambda prompt: types.SimpleNamespace(result=summarizer(prompt)))  # type: ignore
+    runner.dump(pandas.DataFrame.from_records([row | {"description": None, "readme": ""} for row in ROWS]))
+
+    stored_rows = gitme.output.open_store(output).read().to_dict(orient="records")
+    profile_rollup = gitme.rollup.ProfileRollup(path=f"{output}{gitme.rollup.ROLLUP_SUFFIX}", summarize=summarizer)
+    profile_rollup.build(stored_rows, username="someone")  # e.g. by the webhook refresh
+    assert profile_rollup.computed_nodes == 0
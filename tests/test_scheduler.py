@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+import gitme.llm.base
+import gitme.llm.setup
+import gitme.scheduler
+
+
+def prompt_of(tokens: int) -> str:
+    return "x" * (tokens - gitme.scheduler.ESTIMATED_RESPONSE_TOKENS) * gitme.scheduler.CHARACTERS_PER_TOKEN
+
+
+def test_huge_prompt_does_not_stall_small_ones() -> None:
+    limits = gitme.llm.base.RateLimits(RPM=10, TPM=10_000)
+    plan = gitme.scheduler.plan_queries(
+        [
+            ("small-1", prompt_of(1_000)),
+            ("huge", prompt_of(9_500)),
+            ("small-2", prompt_of(1_000)),
+            ("small-3", prompt_of(1_000)),
+        ],
+        limits=limits,
+    )
+    assert [[query.name for query in window] for window in plan.windows] == [
+        ["huge"],
+        ["small-1", "small-2", "small-3"],
+    ]
+    assert plan.order == [1, 0, 2, 3]
+    assert plan.estimated_duration == gitme.scheduler.RATE_WINDOW_SECONDS + 3 * gitme.scheduler.ESTIMATED_QUERY_SECONDS
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_windows_respect_limits(seed: int) -> None:
+    generator = random.Random(seed)
+    limits = gitme.llm.base.RateLimits(RPM=generator.randint(2, 30), TPM=generator.randint(5_000, 50_000))
+    requests_per_query = generator.randint(1, 2)
+    prompts = [
+        (f"repo-{index}", prompt_of(generator.randint(gitme.scheduler.ESTIMATED_RESPONSE_TOKENS + 1, limits['TPM'])))
+        for index in range(generator.randint(1, 200))
+    ]
+    plan = gitme.scheduler.plan_queries(prompts, limits=limits, requests_per_query=requests_per_query)
+    assert sorted(plan.order) == list(range(len(prompts)))
+    assert plan.requests == len(prompts) * requests_per_query
+    for window in plan.windows:
+        assert len(window) * requests_per_query <= max(limits['RPM'], requests_per_query)
+        assert sum(query.tokens for query in window) <= limits['TPM']
+
+
+def test_oversized_prompts_are_reported() -> None:
+    plan = gitme.scheduler.plan_queries(
+        [("too-big", prompt_of(2_000)), ("fine", prompt_of(500))],
+        limits=gitme.llm.base.RateLimits(RPM=10, TPM=1_000),
+    )
+    assert [query.name for query in plan.oversized] == ["too-big"]
+    assert "too-big" in plan.describe().splitlines()[-1]
+
+
+def test_unlimited_provider() -> None:
+    plan = gitme.scheduler.plan_queries([("a", prompt_of(500)), ("b", prompt_of(600))], limits=None)
+    assert len(plan.windows) == 1
+    assert plan.order == [0, 1]
+
+
+def test_google_provider_limits_are_known_without_connecting() -> None:
+    provider_class = gitme.llm.setup.get_provider_class("G1P")
+    assert provider_class.get_rate_limits() == {"RPM": 2, "TPM": 32_000}
+    assert provider_class.get_requests_per_query() == 2
@@ -0,0 +1,148 @@
+import dataclasses
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import gitme.gh
+import gitme.service
+
+
+@dataclasses.dataclass
+class MockProfile:
+    username: str = "owner"
+
+    def for_user(self, username: str) -> "MockProfile":
+        return MockProfile(username)
+
+    def get_repository_metadata(self, repo_name: str) -> gitme.gh.RepositoryMetadata:
+        return mock_metadata(f"{self.username}/{repo_name}")
+
+    @property
+    def pinned_repositories(self) -> list[gitme.gh.RepositoryMetadata]:
+        return [mock_metadata(f"{self.username}/pinned")]
+
+    def log(self, *_, **__) -> None:
+        pass
+
+
+@dataclasses.dataclass
+class MockRunner:
+    github_hooks: MockProfile = dataclasses.field(default_factory=MockProfile)
+    connections: int = 0
+    summarized: list[str] = dataclasses.field(default_factory=list)
+
+    def connect(self) -> None:
+        self.connections += 1
+
+    def summarize_repository(self, repo: gitme.gh.RepositoryMetadata) -> str:
+        self.summarized.append(repo.name)
+        return f"Summary of {repo.name}"
+
+    @staticmethod
+    def to_row(repo: gitme.gh.RepositoryMetadata, summary: str) -> dict[str, str]:
+        return {'name': repo.name, 'summary': summary}
+
+
+def mock_metadata(full_name: str) -> gitme.gh.RepositoryMetadata:
+    metadata = gitme.gh.RepositoryMetadata()
+    metadata.name = full_name
+    metadata.readme = ''
+    metadata.description = ''
+    metadata.technologies = []
+    return metadata
+
+
+@pytest.fixture
+def service() -> gitme.service.GitMeService:
+    return gitme.service.GitMeService(MockRunner())  # type: ignore
+
+
+def test_scheduler_is_fair_between_users() -> None:
+    scheduler = gitme.service.FairJobScheduler()
+    scheduler.submit(gitme.service.SummarizationJob(username="big", repositories=["a", "b", "c", "d"]))
+    scheduler.submit(gitme.service.SummarizationJob(username="small", repositories=["x", "y"]))
+    order = [
+        (job.username, repository)
+        for job, repository in iter(lambda: scheduler.next(timeout=0), None)
+    ]
+    assert order == [
+        ("big", "a"), ("small", "x"), ("big", "b"), ("small", "y"), ("big", "c"), ("big", "d")
+    ]
+
+
+def test_jobs_share_warm_runner(service: gitme.service.GitMeService) -> None:
+    service.start()
+    try:
+        jobs = [
+            service.submit("first", ["one", "two"]),
+            service.submit("second", []),
+        ]
+        results = [list(job.stream_results()) for job in jobs]
+    finally:
+        service.stop()
+    assert service.runner.connections == 1
+    assert [row['name'] for row in results[0]] == ["first/one", "first/two"]
+    assert [row['name'] for row in results[1]] == ["second/pinned"]
+    assert all(job.status == gitme.service.JOB_DONE for job in jobs)
+
+
+def test_http_api(service: gitme.service.GitMeService) -> None:
+    service.start()
+    server = gitme.service.create_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        submit_request = urllib.request.Request(
+            f"{address}/jobs",
+            data=json.dumps({"username": "someone", "repositories": ["one", "two"]}).encode(),
+            method="POST",
+        )
+        with urllib.request.urlopen(submit_request) as response:
+            assert response.status == 202
+            job_id = json.load(response)["id"]
+        with urllib.request.urlopen(f"{address}/jobs/{job_id}/results") as response:
+            streamed_rows = [json.loads(line) for line in response]
+        with urllib.request.urlopen(f"{address}/jobs/{job_id}") as response:
+            job_description = json.load(response)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+    assert [row['name'] for row in streamed_rows] == ["someone/one", "someone/two"]
+    assert job_description["status"] == gitme.service.JOB_DONE
+    assert job_description["results"] == streamed_rows
+
+
+@pytest.mark.parametrize("job_request", [
+    ["one"],
+    {"repositories": "one"},
+    {"repositories": 5},
+    {"username": ["someone"]},
+])
+def test_invalid_jobs_are_rejected(service: gitme.service.GitMeService, job_request: object) -> None:
+    server = gitme.service.create_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as http_error:
+            urllib.request.urlopen(urllib.request.Request(
+                f"http://127.0.0.1:{server.server_address[1]}/jobs",
+                data=json.dumps(job_request).encode(),
+                method="POST",
+            ))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert http_error.value.code == 400
+    assert not service.jobs
+
+
+def test_old_finished_jobs_are_evicted() -> None:
+    service = gitme.service.GitMeService(MockRunner(), max_finished_jobs=2)  # type: ignore
+    jobs = [service.submit("someone", [f"repo{i}"]) for i in range(4)]
+    for job in jobs[:3]:
+        job.status = gitme.service.JOB_DONE
+    service.submit("someone", ["last"])
+    assert [job.repositories for job in service.list_jobs()] == [["repo1"], ["repo2"], ["repo3"], ["last"]]
@@ -0,0 +1,168 @@
+import dataclasses
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+import gitme.llm.base
+import gitme.ratelimit
+import gitme.sharding
+
+
+@dataclasses.dataclass
+class FakeClock:
+    now: float = 1_000
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_row(name: str, summary: str = "") -> dict[str, str]:
+    return {"name": name, "description": "Description", "technologies": "Python", "readme": "# Readme", "summary": summary}
+
+
+def test_items_are_leased(tmp_path: pathlib.Path) -> None:
+    clock = FakeClock()
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"), clock=clock)
+    assert queue.enqueue(["someone/first", "someone/second"]) == 2
+    assert queue.enqueue(["someone/first"]) == 0
+
+    assert queue.claim("worker-1", lease_seconds=10) == "someone/first"
+    assert queue.claim("worker-2", lease_seconds=10) == "someone/second"
+    assert queue.claim("worker-2", lease_seconds=10) is None
+    clock.now += 11  # Worker 1 crashed, its lease expires
+    assert queue.claim("worker-2", lease_seconds=10) == "someone/first"
+    assert not queue.complete("someone/first", "worker-1", make_row("someone/first", "Late summary"))
+    assert queue.complete("someone/first", "worker-2", make_row("someone/first", "Summary"))
+    assert not queue.is_finished()
+    assert queue.complete("someone/second", "worker-2", make_row("someone/second", "Other summary"))
+    assert queue.is_finished()
+    assert [row["summary"] for row in queue.rows()] == ["Summary", "Other summary"]
+
+
+def test_failed_items_are_retried(tmp_path: pathlib.Path) -> None:
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    queue.enqueue(["someone/broken"])
+    for _ in range(2):
+        assert queue.claim("worker") == "someone/broken"
+        queue.fail("someone/broken", "worker", "README not found")
+    assert queue.claim("worker") is None
+    assert queue.is_finished()
+    assert queue.errors() == {"someone/broken": "README not found"}
+    assert not queue.rows()
+
+
+def test_duplicates_reuse_summaries_of_representatives(tmp_path: pathlib.Path) -> None:
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(["someone/original"])
+    queue.enqueue_duplicate(make_row("someone/fork"), representative="someone/original")
+    assert queue.claim("worker") == "someone/original"
+    assert queue.claim("worker") is None
+    queue.complete("someone/original", "worker", make_row("someone/original", "Summary"))
+    assert [(row["name"], row["summary"]) for row in queue.rows()] == [
+        ("someone/original", "Summary"),
+        ("someone/fork", "Summary"),
+    ]
+
+
+def test_concurrent_workers_claim_each_item_once(tmp_path: pathlib.Path) -> None:
+    queue_path = str(tmp_path / "queue.db")
+    names = [f"someone/repo-{index}" for index in range(100)]
+    gitme.sharding.WorkQueue(queue_path).enqueue(names)
+    claimed: dict[str, list[str]] = {}
+
+    def work(worker: str) -> None:
+        queue = gitme.sharding.WorkQueue(queue_path)
+        claimed[worker] = []
+        while name := queue.claim(worker):
+            claimed[worker].append(name)
+            queue.complete(name, worker, make_row(name, f"Summary of {name}"))
+
+    workers = [threading.Thread(target=work, args=(f"worker-{index}",)) for index in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(name for worker_names in claimed.values() for name in worker_names) == sorted(names)
+    assert len(gitme.sharding.WorkQueue(queue_path).rows()) == len(names)
+
+
+def test_shared_rate_limiter_waits_for_next_window(tmp_path: pathlib.Path) -> None:
+    clock = FakeClock()
+    limiter_path = str(tmp_path / "queue.db.ratelimit")
+    limiters = [
+        gitme.ratelimit.SharedRateLimiter(
+            path=limiter_path,
+            limits=gitme.llm.base.RateLimits(RPM=4, TPM=1_000),
+            clock=clock,
+            sleep=clock.sleep,
+        )
+        for _ in range(2)
+    ]  # Separate limiters, e.g. of two workers, sharing the same state
+    assert limiters[0].acquire(400, requests=2) == 0
+    limiters[1].record(300)
+    assert limiters[1].acquire(400, requests=2) == gitme.ratelimit.RATE_WINDOW_SECONDS  # Tokens budget is used up
+    assert limiters[0].acquire(5_000, requests=2) == gitme.ratelimit.RATE_WINDOW_SECONDS  # Oversized prompt gets a window on its own
+    assert limiters[0].acquire(10, requests=2) == gitme.ratelimit.RATE_WINDOW_SECONDS
+    with open(limiter_path, encoding="utf-8") as state_file:
+        assert json.load(state_file)["requests"] == 2
+
+
+def test_shared_rate_limiter_does_not_lose_updates(tmp_path: pathlib.Path) -> None:
+    limiter_path = str(tmp_path / "queue.db.ratelimit")
+
+    def acquire() -> None:
+        limiter = gitme.ratelimit.SharedRateLimiter(path=limiter_path, limits=gitme.llm.base.RateLimits(RPM=10_000, TPM=10_000_000))
+        for _ in range(50):
+            limiter.acquire(10)
+
+    workers = [threading.Thread(target=acquire) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    with open(limiter_path, encoding="utf-8") as state_file:
+        assert json.load(state_file) | {"window_start": 0} == {"window_start": 0, "requests": 200, "tokens": 2_000}
+
+
+def test_workers_wait_for_leases_of_other_workers(tmp_path: pathlib.Path) -> None:
+    clock = FakeClock()
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"), clock=clock, sleep=clock.sleep)
+    queue.enqueue(["someone/first"])
+    assert queue.claim("worker-1", lease_seconds=30) == "someone/first"  # Worker 1 crashes
+    assert queue.wait_for_claim("worker-2", lease_seconds=30, poll_seconds=10) == "someone/first"
+    assert clock.now == 1_040
+    queue.complete("someone/first", "worker-2", make_row("someone/first", "Summary"))
+    assert queue.wait_for_claim("worker-2") is None
+
+
+def test_leases_are_renewed_while_summarizing(tmp_path: pathlib.Path) -> None:
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(["someone/first"])
+    assert queue.claim("worker-1", lease_seconds=0.3) == "someone/first"
+    with queue.keep_leased("someone/first", "worker-1", lease_seconds=0.3):
+        time.sleep(0.6)  # Long query, e.g. waiting for the rate limits
+        assert queue.claim("worker-2", lease_seconds=0.3) is None
+    assert queue.complete("someone/first", "worker-1", make_row("someone/first", "Summary"))
+    assert not queue.renew("someone/first", "worker-1")
+
+
+def test_failed_begin_is_not_hidden(tmp_path: pathlib.Path) -> None:
+    queue = gitme.sharding.WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(["someone/first"])
+    blocking_connection = sqlite3.connect(queue.path, isolation_level=None)
+    blocking_connection.execute("BEGIN IMMEDIATE")
+    try:
+        with mock.patch("sqlite3.connect", lambda *args, **kwargs: sqlite3.Connection(*args, **kwargs | {"timeout": 0})):
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                queue.claim("worker")
+    finally:
+        blocking_connection.execute("ROLLBACK")
+        blocking_connection.close()
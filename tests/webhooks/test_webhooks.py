@@ -0,0 +1,190 @@
+import dataclasses
+import http
+import json
+import pathlib
+import threading
+import urllib.error
+import urllib.request
+
+import pandas
+import pytest
+
+import gitme.gh
+import gitme.output
+import gitme.webhooks
+
+PAYLOADS_DIRECTORY = pathlib.Path(__file__).parent / "payloads"
+SECRET = "It's a Secret to Everybody"
+
+
+def load_payload(name: str) -> bytes:
+    return (PAYLOADS_DIRECTORY / f"{name}.json").read_bytes()
+
+
+def delivery_headers(event: str, body: bytes, delivery: str = "72d3162e-cc78-11e3-81ab-4c9367dc0958") -> dict[str, str]:
+    return {
+        gitme.webhooks.EVENT_HEADER: event,
+        gitme.webhooks.DELIVERY_HEADER: delivery,
+        gitme.webhooks.SIGNATURE_HEADER: gitme.webhooks.sign_payload(SECRET, body),
+    }
+
+
+@dataclasses.dataclass
+class FakeClock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_signature_verification() -> None:
+    body = load_payload("push_readme")
+    assert gitme.webhooks.verify_signature(SECRET, body, gitme.webhooks.sign_payload(SECRET, body))
+    assert not gitme.webhooks.verify_signature(SECRET, body + b" ", gitme.webhooks.sign_payload(SECRET, body))
+    assert not gitme.webhooks.verify_signature(SECRET, body, gitme.webhooks.sign_payload("other secret", body))
+    assert not gitme.webhooks.verify_signature(SECRET, body, None)
+
+
+@pytest.mark.parametrize(
+    "event, payload_name, changed",
+    [
+        ("push", "push_readme", True),
+        ("push", "push_code", False),
+        ("push", "push_feature_branch", False),
+        ("repository", "repository_edited", True),
+        ("repository", "repository_edited_homepage", False),
+        ("ping", "push_readme", False),
+    ]
+)
+def test_changed_repository_detection(event: str, payload_name: str, changed: bool) -> None:
+    full_name = gitme.webhooks.get_changed_repository(event, json.loads(load_payload(payload_name)))
+    assert full_name == ("someone/some-project" if changed else None)
+
+
+def test_bursts_of_events_are_coalesced() -> None:
+    clock = FakeClock()
+    coalescer = gitme.webhooks.RefreshCoalescer(quiet_period=10, max_delay=25, clock=clock)
+    coalescer.add("someone/first")
+    clock.now = 5
+    coalescer.add("someone/first")
+    coalescer.add("someone/second")
+    clock.now = 14
+    assert not coalescer.pop_due()
+    clock.now = 15
+    assert coalescer.pop_due() == ["someone/first", "someone/second"]
+    for moment in range(16, 60, 5):  # Events keep coming, but the refresh is not delayed by more than max_delay
+        clock.now = moment
+        coalescer.add("someone/first")
+        if due_repositories := coalescer.pop_due():
+            break
+    assert due_repositories == ["someone/first"]
+    assert clock.now == 16 + 25
+
+
+def test_redeliveries_are_ignored() -> None:
+    refreshed: list[str] = []
+    receiver = gitme.webhooks.WebhookReceiver(
+        secret=SECRET,
+        refresh=refreshed.append,
+        coalescer=gitme.webhooks.RefreshCoalescer(quiet_period=0),
+    )
+    body = load_payload("repository_edited")
+    assert receiver.ingest(delivery_headers("repository", body), body) == http.HTTPStatus.ACCEPTED
+    assert receiver.coalescer.pop_due() == ["someone/some-project"]
+    assert receiver.ingest(delivery_headers("repository", body), body) == http.HTTPStatus.ACCEPTED
+    assert not receiver.coalescer.pop_due()
+
+
+def test_local_receiver() -> None:
+    refreshed: list[str] = []
+    refreshed_event = threading.Event()
+    receiver = gitme.webhooks.WebhookReceiver(
+        secret=SECRET,
+        refresh=lambda full_name: (refreshed.append(full_name), refreshed_event.set()),
+        coalescer=gitme.webhooks.RefreshCoalescer(quiet_period=0.2),
+    )
+    receiver.start()
+    server = gitme.webhooks.create_server(receiver, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    address = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    try:
+        for index, payload_name in enumerate(["push_readme", "push_code", "repository_edited"]):
+            body = load_payload(payload_name)
+            event = payload_name.split("_")[0]
+            request = urllib.request.Request(address, data=body, headers=delivery_headers(event, body, str(index)), method="POST")
+            with urllib.request.urlopen(request) as response:
+                assert response.status == http.HTTPStatus.ACCEPTED
+        forged_request = urllib.request.Request(
+            address,
+            data=body,
+            headers=delivery_headers(event, b"forged", "forged"),
+            method="POST",
+        )
+        with pytest.raises(urllib.error.HTTPError) as forged_error:
+            urllib.request.urlopen(forged_request)  # pylint: disable=consider-using-with
+        assert forged_error.value.code == http.HTTPStatus.UNAUTHORIZED
+        assert refreshed_event.wait(timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+        receiver.stop()
+    assert refreshed == ["someone/some-project"]
+
+
+@pytest.mark.parametrize("output_name", ["output.csv", "output.db"])
+def test_refresh_updates_stored_row(output_name: str, tmp_path: pathlib.Path) -> None:
+    def fetch_metadata(full_name: str) -> gitme.gh.RepositoryMetadata:
+        metadata = gitme.gh.RepositoryMetadata()
+        metadata.name = full_name
+        metadata.readme = "# Changed" if full_name == "someone/changed" else "# Same"
+        metadata.readme_sha = "changed-sha" if full_name == "someone/changed" else "same-sha"
+        metadata.description = "Description"
+        metadata.technologies = ["Python"]
+        return metadata
+
+    @dataclasses.dataclass
+    class MockRunner:
+        github_hooks: object
+        summarized: list[str] = dataclasses.field(default_factory=list)
+        readme_column: gitme.output.ReadmeColumn = dataclasses.field(default_factory=gitme.output.ReadmeColumn)
+        index_summaries = staticmethod(lambda *_, **__: None)
+        rollup = staticmethod(lambda *_, **__: None)
+
+        def summarize_repository(self, repo: gitme.gh.RepositoryMetadata) -> str:
+            self.summarized.append(repo.name)
+            return f"New summary of {repo.name}"
+
+        to_row = staticmethod(lambda repo, summary: {
+            'name': repo.name,
+            'description': repo.description,
+            'technologies': ', '.join(repo.technologies),
+            'readme': repo.readme,
+            'readme_sha': repo.readme_sha,
+            'summary': summary,
+        })
+
+    @dataclasses.dataclass
+    class MockProfile:
+        get_repository_metadata = staticmethod(fetch_metadata)
+        log = staticmethod(lambda *_, **__: None)
+
+    store = gitme.output.open_store(str(tmp_path / output_name))
+    store.write(pandas.DataFrame.from_records([
+        {'name': name, 'description': 'Description', 'technologies': 'Python', 'readme': '# Same', 'summary': f'Old summary of {name}'}
+        for name in ["someone/changed", "someone/unchanged", "someone/other"]
+    ]))
+    runner = MockRunner(github_hooks=MockProfile())
+    refresher = gitme.webhooks.WebhookRefresher(runner=runner, store=store)  # type: ignore
+
+    assert refresher.refresh("someone/changed")
+    assert not refresher.refresh("someone/unchanged")
+    assert runner.summarized == ["someone/changed"]
+    assert store.get("someone/changed")['summary'] == "New summary of someone/changed"
+    assert store.get("someone/changed")['readme'] == "# Changed"
+    assert store.get("someone/unchanged")['summary'] == "Old summary of someone/unchanged"
+    assert store.get("someone/other")['summary'] == "Old summary of someone/other"
+
+    runner.readme_column = gitme.output.ReadmeColumn(mode=gitme.output.README_OMITTED)
+    assert refresher.refresh("someone/unchanged")  # No stored SHA, so the omitted README is considered to be changed
+    assert not refresher.refresh("someone/unchanged")  # Unchanged SHA of the README is stored along with the summary
+    assert runner.summarized == ["someone/changed", "someone/unchanged"]